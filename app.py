@@ -1,29 +1,63 @@
 # -*- coding: utf-8 -*-
+import time
+app_import_start = time.perf_counter()
 import math
 import pandas as pd
 import numpy as np
 import datetime as datetime
-import urllib.request as request
 import random
-import requests
-import time
 import json
+import os
+import glob
+import threading
 import dash
-import dash_table
 import dash_core_components as dcc
 import dash_bootstrap_components as dbc
 import dash_html_components as html
 import dash.dependencies as ddp
-import plotly.express as px
 import plotly.graph_objects as go
 import plotly.io as pio
 import plotly.colors as pc
 from textwrap import dedent
 from dateutil.relativedelta import relativedelta
 from pages import *
+from datacache import read_csv_snapshot
+from regions import CategoryEncoding, RegionIndex, RegionRegistry
+from regioncube import RegionCube
+from rolling import trailing_mean, trailing_sum, centered_mean, window_mean
+from derivation import derive, carry_over, unchanged_series
+from regionrates import make_Rt_derivation, compute_cases_7day, cases_7day_derivation
+from datastore import DataSnapshot, SnapshotStore, FileWatcher, FileCache, \
+    file_signature
+from weatherstore import WeatherStore, build_weather_store, read_weather_files
+from dateslice import rows_between, rows_on, values_on
+from sqlitestore import SQLiteStore
+from shardstore import ShardStore
+from dataversion import DataVersions
+from regionseries import RegionSeries
+from corrections import mortality_corrections, apply_corrections, corrections_record
+from logsmooth import LogSmoothedMortality
+from forecast import simulate_deaths
+from lazyimport import lazy_import, import_report, report_on_first_use
 import ssl
 ssl._create_default_https_context = ssl._create_unverified_context
 
+#=== Modules only used by some callbacks are imported on their first use
+#    (see lazyimport.py), to speed up the startup of the workers.  Set to
+#    False to import them at startup.
+defer_heavy_imports = True
+#=== Print the time taken by the imports when the app has been loaded
+print_import_report = True
+#=== Precompute the per-region series of the helpers (see warm_up) in a
+#    background thread at startup, instead of on the first request
+warm_up_derived_data = True
+#=== Also read the weather of all regions into the per-process weather
+#    cache (see get_hr_weather_data) when warming up
+warm_up_weather_cache = False
+
+px = lazy_import('plotly.express', defer_heavy_imports)
+request = lazy_import('urllib.request', defer_heavy_imports)
+
 #=================================================
 #=========  App/Server Initialization  ===========
 #=================================================
@@ -77,8 +111,56 @@ filename_mobility = 'data/mobility.csv'
 #
 filename_googletrends = 'data/google_trends_face_mask_canada.csv'
 
+#============ Binary snapshots of the csv data ===========
+#
+# Parsed copies of the mortality, cases, mobility and trends csv files
+# are kept in data/snapshots/ (see datacache.py) and are rebuilt
+# automatically whenever a csv file changes.  Set to False to always
+# parse the csv files.
+#
+use_data_snapshots = True
+
+#============ Reloading the data ===========
+#
+# The data files above are checked every data_reload_interval seconds,
+# and when one has changed (e.g. rewritten by pull_static_data.py) the
+# data is reloaded in the background and swapped in without restarting
+# the app (see datastore.py).  Set data_reload_interval to None to only
+# load the data at startup.
+#
+data_reload_interval = 60
+
+#============ Storage backend of the per-region series ===========
+#
+#   'memory' = the get_hr_* helpers slice the frames loaded at startup
+#   'sqlite' = they query a local SQLite file (see sqlitestore.py)
+#   'shards' = they load one file per region, on demand, keeping the
+#              last shard_cache_size regions in memory (see shardstore.py)
+#
+#   The store is re-filled from the data files whenever they change.
+#   Vaccination data downloaded from the API is also kept there, and
+#   reused for vax_data_max_age_hours.  With 'memory' and 'sqlite', the
+#   national views (map, cards, cases and R(t) charts) use the frames and
+#   cubes loaded at startup; with 'shards', no national frame is kept
+#   (see load_shard_data) and they are built from one region at a time.
+#
+data_backend = 'memory'
+filename_sqlite_store = 'data/snapshots/series.sqlite'
+shard_store_dir = 'data/snapshots/shards'
+shard_cache_size = 256
+vax_data_max_age_hours = 6
+
 #============ Weather data ===========
 weather_data_dir = "data/weather/all_health_regions_actual_avg_temperature_files/2020-01-01_2023-01-01/"
+#
+# The files in weather_data_dir are packed into a single memory-mapped
+# file (see weatherstore.py) by data/update-scripts/build_weather_store.py,
+# which is run by weather_update_script.sh.  The store is built at first
+# use if it is missing.  Set use_weather_store to False to read the csv
+# files instead.
+#
+filename_weather_store = "data/weather/weather_store.bin"
+use_weather_store = True
 
 #============ Vaccination data ===========
 vax_base_url = "https://api.covid19tracker.ca/reports/regions/"
@@ -110,6 +192,8 @@ filename_healthregion_static_data = 'data/health_regions_static_data.csv'
 #
 filename_healthregion_boundaries = 'data/health_regions_boundaries_smoothed.json'
 filename_healthregion_static_data_map = 'data/health_regions_static_data2.csv'
+#=== Columns of the map static data file used by the choropleth map
+region_map_fields = ['frac80', 'region_pop', 'pwpd', 'anndeath', 'house']
 # old file before "simplifying" boundaries
 #filename_healthregion_boundaries = 'data/health_regions_boundaries.json'
 
@@ -344,6 +428,10 @@ show_logsmoothed_mortality_preforecast = False
 #== Turn the navbar on/off
 navbar_on = True
 
+#=== Load the choropleth map assets (boundary json, map static data) in a
+#    background thread at startup, rather than on the first map request
+preload_map_assets = False
+
 #=== Plot the temperature as a rolling average (or raw)
 plot_weather_14d_rolling = True
 
@@ -367,91 +455,367 @@ trends_mult_factor_for_QC = 2.5
 #==========  Import Data  ===========
 #====================================
 
-#=== Read in mortality data, make data column a date
-df_mort_all = pd.read_csv(filename_mortality)
-df_mort_all["date_death_report"] = \
-    pd.to_datetime(df_mort_all["date_death_report"], format="%d-%m-%Y") 
-#=== Set max and min possible dates for plotting range
-first_mortality_date = df_mort_all.date_death_report.min()
-first_mortality_date_str = first_mortality_date.strftime("%Y-%m-%d")
-last_mortality_date = df_mort_all.date_death_report.max()
-last_mortality_date_str = last_mortality_date.strftime("%Y-%m-%d")
+#=== All the data below is loaded by load_data() into one read-only
+#    DataSnapshot (see datastore.py), held by data_store.  Helpers get the
+#    data with current_data(), so that a reload can swap in new data
+#    without restarting the app.
+#
+#    The csv files are read through read_csv_snapshot, which loads
+#    a binary snapshot of the parsed frame when one exists for the current
+#    version of the csv file (see datacache.py)
+#
 first_possible_date=datetime.datetime.strptime("2020-01-01", "%Y-%m-%d")
 last_possible_date = datetime.datetime.strptime("2023-01-01", "%Y-%m-%d")
 
-#=== Read in case data, make data column a date
-df_cases_all = pd.read_csv(filename_cases) 
-df_cases_all["date_report"] = \
-    pd.to_datetime(df_cases_all["date_report"], format="%d-%m-%Y")
-
-#=== Read in moblity data and make date column a date
-df_mob_all = pd.read_csv(filename_mobility)
-df_mob_all["date"] = \
-    pd.to_datetime(df_mob_all["date"], format="%Y-%m-%d")
+#=== Files read by load_data() (and watched for changes).  The weather
+#    files are listed again at each call, so that a reload sees the files
+#    added to (or removed from) weather_data_dir
+def get_weather_files():
+    return sorted(glob.glob(weather_data_dir + "*.csv"))
+
+def get_data_source_files():
+    return [filename_mortality, filename_cases, filename_mobility,
+            filename_googletrends, filename_healthregion_static_data,
+            filename_healthregion_static_data_map] + get_weather_files()
+
+def load_data():
+    if (data_backend == 'shards'):
+        return load_shard_data()
+    print("START --- load_data \t\t\t", datetime.datetime.now().time())
+    df_mort_all, mortality_corrections_applied, df_cases_all, df_mob_all, \
+        df_trends_all = read_series_data()
+    #=== Set max and min possible dates for plotting range
+    first_mortality_date = df_mort_all.date_death_report.min()
+    last_mortality_date = df_mort_all.date_death_report.max()
+
+    static_data, static_data_map = read_static_data()
+
+    #=== Store the region key columns of all frames as categoricals with
+    #    codes shared across datasets (see regions.py)
+    province_encoding = CategoryEncoding(df_mort_all['province'],
+                                         df_cases_all['province'],
+                                         static_data['province_name'])
+    region_encoding = CategoryEncoding(df_mort_all['health_region'],
+                                       df_cases_all['health_region'],
+                                       static_data['health_region'])
+    sub_region_encoding = CategoryEncoding(df_mob_all['sub_region_1'],
+                                           df_mob_all['sub_region_2'],
+                                           static_data['sub_region_2'])
+    for df, prov_col in [(df_mort_all, 'province'), (df_cases_all, 'province'),
+                         (static_data, 'province_name')]:
+        df[prov_col] = province_encoding.encode(df[prov_col])
+        df['health_region'] = region_encoding.encode(df['health_region'])
+    for col in ['sub_region_1', 'sub_region_2']:
+        df_mob_all[col] = sub_region_encoding.encode(df_mob_all[col])
+    static_data['sub_region_2'] = sub_region_encoding.encode(static_data['sub_region_2'])
+
+    #=== Index the time series of each region (see regions.py), so the
+    #    get_hr_* helpers do not have to mask the national frames
+    mort_index = RegionIndex(df_mort_all, ['province', 'health_region'],
+                             'date_death_report')
+    cases_index = RegionIndex(df_cases_all, ['province', 'health_region'],
+                              'date_report')
+    # mobility is given by sub_region_2 (census division), except for the
+    # territories without regional data, which use sub_region_1
+    mob_index = RegionIndex(df_mob_all, 'sub_region_2', 'date')
+    mob_index_sub_region_1 = RegionIndex(df_mob_all, 'sub_region_1', 'date')
+    # and the static data of each region, by hr_uid (see regions.py)
+    regions = RegionRegistry(static_data, static_data_map, region_map_fields)
+
+    #=== Dense [region, day] arrays of mortality and cases (see regioncube.py),
+    #    with days counted from first_possible_date, for national computations
+    #    (the map) and for slicing one region's values by date
+    mort_cube = RegionCube(mort_index, ['deaths', 'cumulative_deaths'],
+                           first_possible_date)
+    cases_cube = RegionCube(cases_index, ['cases', 'cumulative_cases'],
+                            first_possible_date)
+
+    #=== Fingerprints of each dataset and of each region's data (see
+    #    dataversion.py), for keying caches of derived results
+    data_versions = DataVersions()
+    data_versions.add_index('mortality', mort_index)
+    data_versions.add_records('corrections', corrections_record(mortality_corrections))
+    data_versions.add_index('cases', cases_index)
+    data_versions.add_index('mobility_sub_region_2', mob_index)
+    data_versions.add_index('mobility_sub_region_1', mob_index_sub_region_1)
+    data_versions.add_columns('trends', df_trends_all, 'date')
+    data_versions.add_files('weather', {
+        os.path.splitext(os.path.basename(f))[0]: f for f in get_weather_files()})
+    data_versions.add_table('static', regions.table)
+
+    #=== Refill the per-region series store (if any) from changed files
+    store = get_series_store()
+    if store is not None:
+        update_series_store(store, lambda: (df_mort_all, df_cases_all,
+                                            df_mob_all, df_trends_all),
+                            data_versions.dataset('corrections'))
+
+    print("END   --- load_data \t\t\t", datetime.datetime.now().time())
+    return DataSnapshot(
+        df_mort_all=df_mort_all,
+        df_cases_all=df_cases_all,
+        df_mob_all=df_mob_all,
+        df_trends_all=df_trends_all,
+        first_mortality_date=first_mortality_date,
+        first_mortality_date_str=first_mortality_date.strftime("%Y-%m-%d"),
+        last_mortality_date=last_mortality_date,
+        last_mortality_date_str=last_mortality_date.strftime("%Y-%m-%d"),
+        province_encoding=province_encoding,
+        region_encoding=region_encoding,
+        sub_region_encoding=sub_region_encoding,
+        mort_index=mort_index,
+        cases_index=cases_index,
+        mob_index=mob_index,
+        mob_index_sub_region_1=mob_index_sub_region_1,
+        mortality_corrections_applied=mortality_corrections_applied,
+        regions=regions,
+        mort_cube=mort_cube,
+        cases_cube=cases_cube,
+        data_versions=data_versions,
+        )
 
-#=== Read in trends (facemask) data and make date column a date
-df_trends_all = pd.read_csv(filename_googletrends)
-df_trends_all["date"] = \
-    pd.to_datetime(df_trends_all["date"], format="%Y-%m-%d")
+def read_series_data():
+    """The national frames of the time series: mortality (corrected, with
+    the corrections applied), cases, mobility and trends"""
+    #=== Read in mortality data, make data column a date
+    df_mort_all = read_csv_snapshot(filename_mortality,
+                                    date_columns={"date_death_report": "%d-%m-%Y"},
+                                    use_snapshot=use_data_snapshots)
+    #=== Correct known problems in the mortality data (see corrections.py)
+    mortality_corrections_applied = \
+        apply_corrections(df_mort_all, mortality_corrections,
+                          'date_death_report', 'deaths')
+    for name, nrows in mortality_corrections_applied.items():
+        print("      --- load_data \t\t\t correction " + name + ": "
+              + str(nrows) + " rows")
+
+    #=== Read in case data, make data column a date
+    df_cases_all = read_csv_snapshot(filename_cases,
+                                     date_columns={"date_report": "%d-%m-%Y"},
+                                     use_snapshot=use_data_snapshots)
+
+    #=== Read in moblity data and make date column a date
+    df_mob_all = read_csv_snapshot(filename_mobility,
+                                   date_columns={"date": "%Y-%m-%d"},
+                                   use_snapshot=use_data_snapshots)
+
+    #=== Read in trends (facemask) data and make date column a date
+    df_trends_all = read_csv_snapshot(filename_googletrends,
+                                      date_columns={"date": "%Y-%m-%d"},
+                                      use_snapshot=use_data_snapshots)
+    return (df_mort_all, mortality_corrections_applied, df_cases_all,
+            df_mob_all, df_trends_all)
+
+def read_static_data():
+    """The static data for all health regions, and the static data file
+    of the choropleth map (different spellings, json map labels)"""
+    static_data = pd.read_csv(filename_healthregion_static_data, encoding='Latin-1')
+    static_data_map = pd.read_csv(filename_healthregion_static_data_map,
+                                  encoding='Latin-1')
+    return static_data, static_data_map
+
+def load_shard_data():
+    """load_data() for data_backend 'shards'.
+
+    The time series stay in the per-region files of the shard store: the
+    csv files are read only to re-ingest the datasets whose files have
+    changed, and the snapshot holds no national frames, indexes or cubes,
+    just the static data, the date range of the mortality data and the
+    region fingerprints of the store.  The helpers query one region at a
+    time (see get_region_cube, and get_map_values for the map).
+    """
+    print("START --- load_data (shards) \t\t", datetime.datetime.now().time())
+    store = get_series_store()
+    corrections = corrections_record(mortality_corrections)
+    data_versions = DataVersions()
+    data_versions.add_records('corrections', corrections)
+    #=== Refill the store from the changed files (the csv files are only
+    #    read if a dataset has to be ingested again)
+    def read_frames():
+        df_mort_all, _, df_cases_all, df_mob_all, df_trends_all = read_series_data()
+        return df_mort_all, df_cases_all, df_mob_all, df_trends_all
+    update_series_store(store, read_frames, data_versions.dataset('corrections'))
+
+    static_data, static_data_map = read_static_data()
+    regions = RegionRegistry(static_data, static_data_map, region_map_fields)
+    first_mortality_date, last_mortality_date = store.date_range('mortality')
+
+    #=== Fingerprints of each region's data, from the store
+    for name in ['mortality', 'cases', 'mobility_sub_region_2',
+                 'mobility_sub_region_1', 'trends']:
+        data_versions.add_fingerprints(name, store.region_fingerprints(name))
+    data_versions.add_files('weather', {
+        os.path.splitext(os.path.basename(f))[0]: f for f in get_weather_files()})
+    data_versions.add_table('static', regions.table)
+
+    print("END   --- load_data (shards) \t\t", datetime.datetime.now().time())
+    return DataSnapshot(
+        df_mort_all=None,
+        df_cases_all=None,
+        df_mob_all=None,
+        df_trends_all=None,
+        first_mortality_date=first_mortality_date,
+        first_mortality_date_str=first_mortality_date.strftime("%Y-%m-%d"),
+        last_mortality_date=last_mortality_date,
+        last_mortality_date_str=last_mortality_date.strftime("%Y-%m-%d"),
+        province_encoding=None,
+        region_encoding=None,
+        sub_region_encoding=None,
+        mort_index=None,
+        cases_index=None,
+        mob_index=None,
+        mob_index_sub_region_1=None,
+        mortality_corrections_applied=None,
+        regions=regions,
+        mort_cube=None,
+        cases_cube=None,
+        data_versions=data_versions,
+        )
 
-#=== Read in static data for all health regions
-static_data = pd.read_csv(filename_healthregion_static_data, encoding='Latin-1')
+#=== Store of the per-region series for data_backend (None for 'memory'),
+#    opened once per process
+series_store = None
+series_store_lock = threading.Lock()
+
+def get_series_store():
+    global series_store
+    if (data_backend == 'memory'):
+        return None
+    if series_store is None:
+        with series_store_lock:
+            if series_store is None:
+                if (data_backend == 'sqlite'):
+                    series_store = SQLiteStore(filename_sqlite_store)
+                elif (data_backend == 'shards'):
+                    series_store = ShardStore(shard_store_dir, shard_cache_size)
+                else:
+                    raise ValueError("unknown data_backend " + str(data_backend))
+    return series_store
+
+def update_series_store(store, get_frames, corrections_version=None):
+    """Re-ingest each dataset whose source files (or, for mortality, the
+    corrections applied to it) have changed.  get_frames() returns the
+    national (mortality, cases, mobility, trends) frames; it is called
+    once, and only if one of them has to be ingested."""
+    frames = []
+    def frame(i):
+        if not frames:
+            frames.extend(get_frames())
+        return frames[i]
+    datasets = [
+        # name, source files, function returning (frame, key columns, date column)
+        ('mortality', [filename_mortality],
+         lambda: (frame(0), ['province', 'health_region'], 'date_death_report')),
+        ('cases', [filename_cases],
+         lambda: (frame(1), ['province', 'health_region'], 'date_report')),
+        ('mobility_sub_region_2', [filename_mobility],
+         lambda: (frame(2), 'sub_region_2', 'date')),
+        ('mobility_sub_region_1', [filename_mobility],
+         lambda: (frame(2), 'sub_region_1', 'date')),
+        ('trends', [filename_googletrends],
+         lambda: (frame(3).melt(id_vars='date', var_name='geo_code',
+                                value_name='trend_val'), 'geo_code', 'date')),
+        ('weather', get_weather_files(), get_weather_series_frame),
+        ]
+    for name, sources, get_frame in datasets:
+        signature = json.dumps(file_signature(sources))
+        if (name == 'mortality') and (corrections_version is not None):
+            signature += " corrections=" + corrections_version
+        info = store.dataset_info(name)
+        if (info is None) or (info['signature'] != signature):
+            df, key_columns, date_column = get_frame()
+            store.ingest(name, df, key_columns, date_column, signature)
+
+def get_weather_series_frame():
+    """All the weather files as one frame keyed by weather_key ({prov_id}_{hr_uid})"""
+    frames = []
+    for weather_key, df in read_weather_files(weather_data_dir):
+        df = df[['date', 'temp_mean', 'climate_id']].copy()
+        df['date'] = pd.to_datetime(df['date'])
+        # climate_id is only used to find the last day of station data, and
+        # is read as numbers or as strings depending on the file
+        df['climate_id'] = df['climate_id'].astype(str).where(df['climate_id'].notnull())
+        df['weather_key'] = weather_key
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True), 'weather_key', 'date'
+
+def current_data():
+    """The current DataSnapshot (take it once per computation)"""
+    return data_store.current()
+
+def warm_up(snapshot, previous=None):
+    """Build the derived data of a snapshot (the series precomputed for
+    all regions), and optionally fill the weather cache, so that the
+    first requests do not wait for them.
+
+    After a reload, previous is the snapshot it replaced: the derived
+    data is then updated from that of previous, recomputing only the
+    regions (and days) whose data changed (see derivation.py).
+    """
+    print("START --- warm_up \t\t\t", nowtime())
+    snapshot.derived('mob_series',
+                     lambda data: build_mob_series(data, previous))
+    snapshot.derived('trends_series',
+                     lambda data: build_trends_series(data, previous))
+    if snapshot.mort_cube is not None:
+        # (no national cubes with data_backend 'shards': R(t) and the
+        #  7-day cases are computed for one region at a time)
+        snapshot.derived('Rt_cube',
+                         lambda data: derive(data, 'Rt_cube', Rt_derivation, previous))
+        snapshot.derived('cases_7day',
+                         lambda data: derive(data, 'cases_7day', cases_7day_derivation,
+                                             previous))
+    snapshot.derived('map_values', build_map_values)
+    # (the LogSmoothedMortality objects are built on request, those of
+    #  the regions with unchanged mortality are kept)
+    if previous is not None:
+        mortality_changes = \
+            snapshot.data_versions.changes('mortality', previous.data_versions)
+        snapshot.derived('logsmoothed_mortality', lambda data: carry_over(
+            previous.built('logsmoothed_mortality'), mortality_changes,
+            lambda key: key[:2]))
+    #=== The series store may have been refilled by the reload
+    weather_cache.clear()
+    if warm_up_weather_cache:
+        for uid in snapshot.regions.uids():
+            profile = snapshot.regions.profile_of_uid(uid)
+            try:
+                get_hr_weather_data(profile.province_name, profile.health_region)
+            except (OSError, KeyError, ValueError):
+                continue
+    print("END   --- warm_up \t\t\t", nowtime())
+
+data_store = SnapshotStore(load_data, on_swap=warm_up)
 
 #=== Load things for the choropleth map
 
-#--- Subroutine to adjust mortality data files
-def adjust_region_names_for_json(df):
-    provs = ['Alberta', 'Alberta', 'Alberta',
-             'BC', 'Manitoba',
-             'NL', 'NL', 'NL',
-             'Ontario', 'Ontario', 'Ontario',
-             'Saskatchewan', 'Saskatchewan', 'Saskatchewan', 'Saskatchewan' ]
-    regs = ['Central', 'North', 'South',
-            'Northern', 'Northern',
-            'Central', 'Eastern', 'Western',
-            'Eastern', 'Northwestern', 'Southwestern',
-            'Central', 'Far North', 'North', 'South']
-    abbs = ['AB', 'AB', 'AB',
-            'BC', 'MB',
-            'NL', 'NL', 'NL',
-            'ON', 'ON', 'ON',
-            'SK', 'SK', 'SK', 'SK']
-    dfnew = df.copy()
-    for i in range(len(abbs)):
-        theones = ( (dfnew['health_region'] == regs[i])
-                    & (dfnew['province'] == provs[i]) )
-        dfnew.loc[theones, 'health_region'] = regs[i] + " " + abbs[i]
-    return dfnew
-
-#--- Health region boundary file
-# open and parse the json file
-with open(filename_healthregion_boundaries, 'r') as myfile:
-    map_data = myfile.read()
-geo_json_data = json.loads(map_data)
-
-#--- Separate static data file (fixme: why?)
-static_data2 = pd.read_csv(filename_healthregion_static_data_map, encoding='Latin-1')
-# list of regions for using map json file
-region_list = static_data2["ENG_LABEL"].tolist()
-
-#--- Create separate copy of mortality data
-df_mort2 = df_mort_all.copy()
-df_mort2 = adjust_region_names_for_json(df_mort2)
-col_names = df_mort2.columns.to_list()
-col_names[1] = "ENG_LABEL"
-df_mort2.columns = col_names
-df_mort2["date_death_report"] = pd.to_datetime(df_mort2["date_death_report"], format="%d-%m-%Y")
-index = df_mort2[df_mort2['ENG_LABEL'] == 'Not Reported'].index
-df_mort2.drop(index, inplace=True)
-#--- Create separate copy of cases data
-df_cases2 = df_cases_all.copy()
-df_cases2 = adjust_region_names_for_json(df_cases2)
-col_names = df_cases2.columns.to_list()
-col_names[1] = "ENG_LABEL"
-df_cases2.columns = col_names
-df_cases2["date_report"] = pd.to_datetime(df_cases2["date_report"], format="%d-%m-%Y")
-index = df_cases2[df_cases2['ENG_LABEL'] == 'Not Reported'].index
-df_cases2.drop(index, inplace=True)
+#--- Map-only assets are loaded on first use
+#
+#    The boundary json file is only needed by the choropleth map, so it
+#    is loaded by the first call of get_map_assets() (from
+#    display_choropleth), or in a background thread at startup if
+#    preload_map_assets is set.
+#
+map_assets = None
+map_assets_lock = threading.Lock()
+
+def get_map_assets():
+    """Return the map assets, loading them once (thread-safe)"""
+    global map_assets
+    if map_assets is None:
+        with map_assets_lock:
+            if map_assets is None:
+                map_assets = load_map_assets()
+    return map_assets
+
+def load_map_assets():
+    print("START --- load_map_assets \t\t", nowtime())
+    #--- Health region boundary file
+    # open and parse the json file
+    with open(filename_healthregion_boundaries, 'r') as myfile:
+        geo_json_data = json.load(myfile)
+    print("END   --- load_map_assets \t\t", nowtime())
+    return {'geo_json_data': geo_json_data}
 
 #========================================================
 #====    Menu/slider options and initial values    ======
@@ -759,9 +1123,7 @@ canadian_dashboard = html.Div(
                                                     ),
                                                 dcc.DatePickerSingle(
                                                     id="forecast-start-date",
-                                                    min_date_allowed=first_mortality_date.date(),
-                                                    max_date_allowed=nowdate.date(),
-                                                    initial_visible_month=last_mortality_date.date(), 
+                                                    # (allowed dates: see update_forecast_date_bounds)
                                                     date=forecast_initial_start_date
                                                 ),
                                                 html.Div(
@@ -1263,15 +1625,34 @@ def display_page(pathname):
     if (pathname == "/"):
         return canadian_dashboard
     elif (pathname == "/about"):
-        return about_page
+        return make_about_page()
     elif (pathname == "/faq"):
-        return faq_page2
+        return make_faq_page2()
     elif (pathname == "/intro"):
-        return introduction_page
+        return make_introduction_page()
     
     print("START-END --- display_page \t", nowtime())
     return canadian_dashboard
 
+#=============================#
+#   Forecast Start Date Range #
+#=============================#
+#=== The dates allowed in the forecast start date picker, from the data
+#    of the current snapshot (which a reload may replace) and today
+@app.callback(
+    [
+        ddp.Output("forecast-start-date", "min_date_allowed"),
+        ddp.Output("forecast-start-date", "max_date_allowed"),
+        ddp.Output("forecast-start-date", "initial_visible_month"),
+    ],
+    [ddp.Input("province-dropdown", "value")]
+)
+def update_forecast_date_bounds(province_name):
+    data = current_data()
+    return [data.first_mortality_date.date(),
+            datetime.datetime.now().date(),
+            data.last_mortality_date.date()]
+
 #=================#
 #     FAQ Page    #
 #=================#
@@ -1365,11 +1746,12 @@ def update_static_cards(region_name, province_name, max_vax_percent):
     #=== Calculate all card values
     mob = f"{-last_mob:.0f} %"
     vax = f"{100.0*last_vax_fraction:.0f} %"
-    total_pop = round(get_total_pop(province_name, region_name), 0)
-    sparsity = round(get_pop_sparsity(province_name, region_name), 3)
-    pop_80 = round(get_frac_pop_over_80(province_name, region_name), 3)
-    pwpd = round(get_pwpd(province_name, region_name), 0)
-    avg_house = round(get_avg_house(province_name, region_name), 2)
+    profile = get_region_profile(province_name, region_name)
+    total_pop = round(profile.total_pop, 0)
+    sparsity = round(profile.pop_sparsity, 3)
+    pop_80 = round(profile.frac_pop_over_80, 3)
+    pwpd = round(profile.pwpd, 0)
+    avg_house = round(profile.house, 2)
 
     # todo: sparsity (3 digits)
     # pop_80 = round(get_frac_pop_over_80(province_name, region_name), 2)
@@ -1400,28 +1782,14 @@ def update_dynamic_cards(region_name, province_name):
     print("START --- update_dynamic_cards \t\t", nowtime())
 
     province_name = update_province_name(province_name)
-    total_pop = get_total_pop(province_name, region_name)
 
-    #=== Get COVID-19 mortality for all dates
-    df_mort = get_hr_mortality_df(province_name, region_name)
-    total_covid_deaths = df_mort.deaths.sum()
-
-    #=== Get the (1997-growth-adjusted) annual death
-    annual_deaths = get_annual_death(province_name, region_name)
-
-    #===BPH annual-covid-deaths should be over a one-year period
-    today = datetime.datetime.now()
-    today_str = today.strftime("%Y-%m-%d")
-    lastyear_today = (today - datetime.timedelta(days=365)).strftime("%Y-%m-%d")
-    annual_covid_deaths = \
-        df_mort[df_mort.date_death_report.between(lastyear_today, today_str)]['deaths'].sum()
-    covid_per_annual = str(round(annual_covid_deaths / annual_deaths * 100.0, 3)) + "%"
-    deaths_per_pop = str(round(total_covid_deaths / total_pop * 100.0, 3)) + "%"
-
-    #=== Get all cases
-    cases_df = get_hr_cases_df(province_name, region_name)
-    total_cases = cases_df.cases.sum()
-    cases_per_pop = str(round(total_cases / total_pop * 100.0, 3)) + "%"
+    #=== Per-region totals and ratios, computed once per data load and
+    #    day (the annual covid deaths are over the last 365 days)
+    today_str = datetime.datetime.now().strftime("%Y-%m-%d")
+    aggregates = get_card_aggregates(today_str, province_name, region_name)
+    covid_per_annual = str(round(aggregates['covid_per_annual'] * 100.0, 3)) + "%"
+    deaths_per_pop = str(round(aggregates['deaths_per_pop'] * 100.0, 3)) + "%"
+    cases_per_pop = str(round(aggregates['cases_per_pop'] * 100.0, 3)) + "%"
 
     print("END   --- update_dynamic_cards \t\t", nowtime())
 
@@ -1527,11 +1895,20 @@ def update_cases_charts(n_clicks, region_name, day_to_start_forecast,
 
     province_name = update_province_name(province_name)
 
-    df_cases = get_hr_cases_df(province_name, region_name).copy()
-    df_cases = df_cases[df_cases.date_report.between(daterange[0], daterange[1])]
-
-    df_cases['cases'] = df_cases['cases'].rolling(window=7).mean()
-
+    #=== Slice the 7-day rolling average of cases (see cases_7day_derivation)
+    data = current_data()
+    cases_cube = get_region_cube(data, 'cases', (province_name, region_name))
+    region_row = cases_cube.row((province_name, region_name))
+    days = cases_cube.date_slice(daterange[0], daterange[1])
+    if region_row is None:
+        # (no case data for the region)
+        cases_7day = np.full(days.stop - days.start, np.nan)
+    else:
+        cases_7day = get_region_cases_7day(data, cases_cube, region_row)[days]
+    df_cases = pd.DataFrame({
+        'date_report': cases_cube.dates[days],
+        'cases': cases_7day,
+        })
 
     #===BPH For some reason this works for weather, but not here.  I get an error:
     #
@@ -1645,7 +2022,7 @@ def update_mortality_chart(n_clicks, region_name,
     df_mort = get_hr_mortality_df(province_name, region_name, getall=False,
                                   startdate=daterange[0], enddate=today_str)
     df_mort_plot = df_mort.copy()
-    df_mort_plot['deaths'] = df_mort_plot['deaths'].rolling(window=7).mean()
+    df_mort_plot['deaths'] = trailing_mean(df_mort_plot['deaths'].to_numpy(dtype=np.float64), 7)
     
     print("      --- update_mortality_chart \t", nowtime(), " --- mortality loaded")
     print("      --- update_mortality_chart \t", nowtime(), " --- started plotting deaths")
@@ -1664,7 +2041,8 @@ def update_mortality_chart(n_clicks, region_name,
     testing_logsmoothed = False
     if testing_logsmoothed:
         df_mort_plot2 = df_mort[['date_death_report', 'deaths']].copy()
-        df_mort_plot2['deaths'] = df_mort_plot2['deaths'].rolling(window=7).mean()        
+        df_mort_plot2['deaths'] = \
+            trailing_mean(df_mort_plot2['deaths'].to_numpy(dtype=np.float64), 7)
         df_mort_plot2['logdeaths'] = 0.0
         for index, row in df_mort_plot2.iterrows():
             if row.deaths == 0.0:
@@ -1674,7 +2052,7 @@ def update_mortality_chart(n_clicks, region_name,
         #df_mort_plot2['logdeaths'] = \
         #    df_mort_plot2['logdeaths'].rolling(window=14).mean()
         df_mort_plot2['logdeaths'] = \
-            df_mort_plot2['logdeaths'].rolling(window=14, center=True).mean()
+            centered_mean(df_mort_plot2['logdeaths'].to_numpy(dtype=np.float64), 14)
         df_mort_plot2['logdeaths'] = \
             df_mort_plot2['logdeaths'].interpolate(method='polynomial', order=2)
         df_mort_plot2['deaths'] = np.exp(df_mort_plot2['logdeaths'])
@@ -1701,8 +2079,8 @@ def update_mortality_chart(n_clicks, region_name,
         name='Cumulative Deaths',  
         line=dict(color='black', width=2)      
     ))
-    #=== Calculate R(t) from mortality data
-    df_mort_Rt = calculate_Rt_from_mortality(df_mort)
+    #=== R(t) from mortality data (computed once per data snapshot)
+    df_mort_Rt = get_hr_Rt_df(province_name, region_name, daterange[0], today_str)
     
     #=== Initialize R(t) figure and plot the R(t) from actual mortality data
     rtcurve_fig = go.Figure()
@@ -1769,7 +2147,7 @@ def update_mortality_chart(n_clicks, region_name,
                                          last_vax_fraction, max_vax_fraction)
                                          
             df_forecast = \
-                df_forecast[df_forecast.date.between(new_forecast_startdate, daterange[1])]
+                rows_between(df_forecast, 'date', new_forecast_startdate, daterange[1])
             #=== Add simulated forecast of mortality to the mortality figure
             mortality_fig.add_trace(
                 go.Scatter(
@@ -1795,7 +2173,7 @@ def update_mortality_chart(n_clicks, region_name,
             #=== Add simulated forecast to the cumulative mortality figure
             # get cumulative mortality at start of forecast
             cum_death_at_forecast_start = \
-                df_mort[df_mort.date_death_report.between(new_forecast_startdate, new_forecast_startdate)]\
+                rows_on(df_mort, 'date_death_report', new_forecast_startdate)\
                 ['cumdeaths'].to_list()[0]
             cumulativedeaths_fig.add_trace(
                 go.Scatter(
@@ -1809,7 +2187,7 @@ def update_mortality_chart(n_clicks, region_name,
             df_forecast['R(t)'] = \
                 np.exp( Rt_serial_interval * df_forecast['lambda'] )
             # take moving average
-            df_forecast['R(t)'] = df_forecast['R(t)'].rolling(window=14).mean()            
+            df_forecast['R(t)'] = trailing_mean(df_forecast['R(t)'].to_numpy(dtype=np.float64), 14)
             rtcurve_fig.add_trace(
                 go.Scatter(
                     x = df_forecast['date'].to_list(),
@@ -1921,10 +2299,9 @@ def update_mob_charts(n_clicks, region_name, mob_slider,
     mobility_fig = go.Figure()    
     mobility_fig.add_trace(
         go.Scatter(
-            x=df_mob[df_mob.date.between(daterange[0],
-                                         last_mob_data_date_str)]['date'],
-            y=df_mob[df_mob.date.between(daterange[0],
-                                         last_mob_data_date_str)]['workplaces_percent_change_from_baseline'],
+            x=rows_between(df_mob, 'date', daterange[0], last_mob_data_date_str)['date'],
+            y=rows_between(df_mob, 'date', daterange[0],
+                           last_mob_data_date_str)['workplaces_percent_change_from_baseline'],
             name='Actual Mobility',
             mode = 'lines',
         )
@@ -1932,10 +2309,9 @@ def update_mob_charts(n_clicks, region_name, mob_slider,
     #=== Plot the future mobility
     mobility_fig.add_trace(
         go.Scatter(
-            x=df_mob[df_mob.date.between(last_mob_data_date_str,
-                                         daterange[1])]['date'],
-            y=df_mob[df_mob.date.between(last_mob_data_date_str,
-                                         daterange[1])]['workplaces_percent_change_from_baseline'],
+            x=rows_between(df_mob, 'date', last_mob_data_date_str, daterange[1])['date'],
+            y=rows_between(df_mob, 'date', last_mob_data_date_str,
+                           daterange[1])['workplaces_percent_change_from_baseline'],
             name='Actual Mobility',
             mode = 'lines',
         )
@@ -2020,10 +2396,10 @@ def update_vaccination_charts(n_clicks, region_name, vax_slider, max_vax_percent
     vaccination_fig = go.Figure()    
     vaccination_fig.add_trace(
         go.Scatter(
-            x=df_vax[df_vax.date.between(first_vax_data_date,
-                                               last_vax_data_date)]['date'],
-            y=100*df_vax[df_vax.date.between(first_vax_data_date,
-                                                   last_vax_data_date)]['fraction_vaccinated'],
+            x=rows_between(df_vax, 'date', first_vax_data_date,
+                           last_vax_data_date)['date'],
+            y=100*rows_between(df_vax, 'date', first_vax_data_date,
+                               last_vax_data_date)['fraction_vaccinated'],
             name='Estimated Percent Vaccinated',
             mode = 'lines',            
         )
@@ -2040,10 +2416,9 @@ def update_vaccination_charts(n_clicks, region_name, vax_slider, max_vax_percent
     #=== Plot the extrapolation of fraction_vaccinated
     vaccination_fig.add_trace(
         go.Scatter(
-            x=df_vax[df_vax.date.between(last_vax_data_date_str,
-                                               daterange[1])]['date'],
-            y=100*df_vax[df_vax.date.between(last_vax_data_date_str,
-                                               daterange[1])]['fraction_vaccinated'],
+            x=rows_between(df_vax, 'date', last_vax_data_date_str, daterange[1])['date'],
+            y=100*rows_between(df_vax, 'date', last_vax_data_date_str,
+                               daterange[1])['fraction_vaccinated'],
             name='Estimated Percent Vaccinated',
             mode = 'lines',
             line_color = pc.qualitative.Plotly[1],
@@ -2090,10 +2465,10 @@ def update_weather_chart(n_clicks, region_name, day_to_start_forecast, months_to
     # Get weather dataframe
     df_weather, last_weather_data_date = get_hr_weather_data(province_name, region_name)
     # select out current and future data
-    df_weather = df_weather[df_weather.date.between(daterange[0], daterange[1])].copy()
+    df_weather = rows_between(df_weather, 'date', daterange[0], daterange[1]).copy()
     if plot_weather_14d_rolling:
         df_weather['temp_mean'] = \
-            df_weather['temp_mean'].rolling(window=14).mean()
+            trailing_mean(df_weather['temp_mean'].to_numpy(dtype=np.float64), 14)
     df_weather_current = df_weather[df_weather.date <= last_weather_data_date]
     df_weather_future = df_weather[df_weather.date >= last_weather_data_date]    
 
@@ -2181,20 +2556,20 @@ def update_trends_charts(n_clicks, region_name, facemask_slider,
     trends_fig = go.Figure()    
     trends_fig.add_trace(
         go.Scatter(
-            x=df_trends[df_trends.date.between(daterange[0],
-                                               last_trends_data_date_str)]['date'],
-            y=df_trends[df_trends.date.between(daterange[0],
-                                               last_trends_data_date_str)]['trend_val'],
+            x=rows_between(df_trends, 'date', daterange[0],
+                           last_trends_data_date_str)['date'],
+            y=rows_between(df_trends, 'date', daterange[0],
+                           last_trends_data_date_str)['trend_val'],
             name='Actual Trends',
         )
     )
     #=== Plot the future Trends data
     trends_fig.add_trace(
         go.Scatter(
-            x=df_trends[df_trends.date.between(last_trends_data_date_str,
-                                               daterange[1])]['date'],
-            y=df_trends[df_trends.date.between(last_trends_data_date_str,
-                                               daterange[1])]['trend_val'],
+            x=rows_between(df_trends, 'date', last_trends_data_date_str,
+                           daterange[1])['date'],
+            y=rows_between(df_trends, 'date', last_trends_data_date_str,
+                           daterange[1])['trend_val'],
             name='Predicted Trends',
         )
     )
@@ -2282,9 +2657,10 @@ def display_choropleth(region_name, map_options, n_clicks, province_name):
     print("      --- display_choropleth \t\t", nowtime(), "  --- start choropleth_mapbox")
 
     # fixme: why is this run every time?
-    df_map_data = get_map_data(region_list)
+    assets = get_map_assets()
+    df_map_data = get_map_data()
     
-    fig = px.choropleth_mapbox(df_map_data, geojson=geo_json_data, color=map_options,
+    fig = px.choropleth_mapbox(df_map_data, geojson=assets['geo_json_data'], color=map_options,
                           color_continuous_scale="Deep", range_color=range_color, opacity=0.5,
                           locations="ENG_LABEL", featureidkey="properties.ENG_LABEL",
                           height=700, center=coordinates,
@@ -2400,7 +2776,7 @@ def get_last_trends_mob_vaxrate_for_region(province_name, region_name, max_vax_p
     two_weeks_ago = start_date - datetime.timedelta(days=13)
     two_weeks_ago_str = two_weeks_ago.strftime("%Y-%m-%d")
     two_weeks_vax = \
-        df_vax[df_vax.date.between(two_weeks_ago_str, start_date_str)]\
+        rows_between(df_vax, 'date', two_weeks_ago_str, start_date_str)\
         ['fraction_vaccinated'].to_list()
     last_vax_rate_per_week = (two_weeks_vax[-1] - two_weeks_vax[0])/2.0
 
@@ -2425,27 +2801,18 @@ def get_last_val(type_str, datavar):
     elif (type_str == 'trends'):
         return datavar['trend_val'].to_list()[-1]
 
-def get_val_on_date(type_str, datavar, day):
-    """Get value on a date from various dataframes"""    
-    day_str = day.strftime("%Y-%m-%d")
+def get_vals_on_dates(type_str, datavar, days):
+    """Get values on each of the dates from various dataframes (an array)"""
     #===BPH Updated this function 25May because the df_mob
     #       and df_trends should now contain all future data
     if (type_str == 'mob'):
-        df = datavar[datavar.date.between(day_str,day_str)]\
-            ['workplaces_percent_change_from_baseline']
-        return df.to_list()[0]
+        return values_on(datavar, 'date', 'workplaces_percent_change_from_baseline', days)
     elif (type_str == 'trends'):
-        df = datavar[datavar.date.between(day_str,day_str)]\
-            ['trend_val']
-        return df.to_list()[0]
+        return values_on(datavar, 'date', 'trend_val', days)
     elif (type_str == 'vax'):
-        df = datavar[datavar.date.between(day_str,day_str)]\
-            ['fraction_vaccinated']
-        val = df.to_list()[0]
-        if math.isnan(val):
-            return 0.0
-        else:
-            return val
+        vals = values_on(datavar, 'date', 'fraction_vaccinated', days)
+        vals[np.isnan(vals)] = 0.0
+        return vals
 
 def nowtime():
     """return current timestamp"""
@@ -2468,14 +2835,15 @@ def get_daterange(forecast_startdate, forecast_length_months):
         Use a fixed start date (first date of mortality)
         and just adjust the maxdate depending on forecast 
     """
+    data = current_data()
     # if user manually entered a date that is disallowed, change it
     if (forecast_startdate is None):
-        forecast_startdate = last_mortality_date.strftime("%Y-%m-%d")
+        forecast_startdate = data.last_mortality_date_str
     fc_start = datetime.datetime.strptime(forecast_startdate, "%Y-%m-%d")
     # reset forecast start date to the last mortality date if in the future
     new_forecast_startdate = forecast_startdate
-    if (fc_start > last_mortality_date):
-        fc_start = last_mortality_date
+    if (fc_start > data.last_mortality_date):
+        fc_start = data.last_mortality_date
         new_forecast_startdate = fc_start.strftime("%Y-%m-%d")
     # set end date to either today, or the end of the forecast
     fc_length = datetime.timedelta(days=forecast_length_months*days_in_month)
@@ -2483,139 +2851,111 @@ def get_daterange(forecast_startdate, forecast_length_months):
     maxdate = max(today, fc_start + fc_length)
     if (maxdate > last_possible_date):
         maxdate = last_possible_date
-    return [first_mortality_date_str, maxdate.strftime("%Y-%m-%d")], new_forecast_startdate
+    return [data.first_mortality_date_str, maxdate.strftime("%Y-%m-%d")], new_forecast_startdate
             
 
 #=========================================================
 #===========  Helper Functions: Static Data  =============
 #=========================================================
 
-def get_region_info(province_name, region_name):
-    prov_info = static_data[static_data.province_name == province_name]
-    region_info = prov_info[prov_info.health_region == region_name]
-    return region_info
+def get_region_profile(province_name, region_name):
+    # Gets the RegionProfile (static data record) of the health region
+    return current_data().regions.profile(province_name, region_name)
 
 def get_avg_house(province_name, region_name):
-    return get_region_info(province_name, region_name).house.item()
+    return get_region_profile(province_name, region_name).house
 
 def get_land_area(province_name, region_name):
-    return get_region_info(province_name, region_name).landarea.item()
+    return get_region_profile(province_name, region_name).landarea
 
 def get_total_pop(province_name, region_name):
-    return get_region_info(province_name, region_name).total_pop.item()
+    return get_region_profile(province_name, region_name).total_pop
 
 def get_prov_pop(province_name, region_name):
-    return get_region_info(province_name, region_name).prov_pop.item()
+    return get_region_profile(province_name, region_name).prov_pop
 
 def get_annual_death(province_name, region_name):
-    ann_death_1997 = get_region_info(province_name, region_name).anndeath.item()
+    ann_death_1997 = get_region_profile(province_name, region_name).anndeath
     return population_factor_1997_to_today * ann_death_1997
 
 def get_frac_pop_over_80(province_name, region_name):
-    frac_over_80 = get_region_info(province_name, region_name).pop80.item()
-    return frac_over_80 / get_total_pop(province_name, region_name)
+    return get_region_profile(province_name, region_name).frac_pop_over_80
 
 def get_pwpd(province_name, region_name):
-    return get_region_info(province_name, region_name).pwpd.item()
+    return get_region_profile(province_name, region_name).pwpd
 
 def get_pop_sparsity(province_name, region_name):	
-    return get_region_info(province_name, region_name).pop_sparsity.item()
+    return get_region_profile(province_name, region_name).pop_sparsity
 
 def get_provinceid(province_name, region_name):
     # Gets the province abbreviation for the health region
-    weat_info_province = static_data[static_data.province_name == province_name]
-    return weat_info_province.prov_id[weat_info_province.health_region == region_name].item()
+    return get_region_profile(province_name, region_name).prov_id
 
 def get_hruid(province_name, region_name):
     # Gets the hr_uid for the health region
-    weat_info_province = static_data[static_data.province_name == province_name]
-    return weat_info_province.hr_uid[weat_info_province.health_region == region_name].item()
+    return get_region_profile(province_name, region_name).hr_uid
 
 #=========================================================
 #===========  Helper Functions: Simulations  =============
 #=========================================================
-def get_logsmoothed_initial_mortality(the_date, df):
-    dfnew = df[['date', 'deaths']].copy()
-    # get the 7-day rolling average data
-    dfnew['deaths'] = dfnew['deaths'].rolling(window=7).mean()
-    # Create a smooth version of that data by logging and
-    # interpolating over the places where deaths=0.
+def get_logsmoothed_initial_mortality(the_date, province_name, region_name,
+                                      df_mortality, with_frame=False):
+    # The log-smoothed value of the mortality up to the_date,
     #
-    # Note, however that this will not interpolate to the end
-    # of the dateframe if they contain zeros
-    dfnew['logdeaths'] = 0.0
-    for index, row in dfnew.iterrows():
-        if row.deaths == 0.0:
-            # no data from zero-mortality days 
-            dfnew.at[index, 'logdeaths'] = np.nan
-        else:
-            # otherwise get log(deaths)
-            dfnew.at[index, 'logdeaths'] = np.log(row.deaths)
-    # doing a centered rolling average here, so might want to move the
-    # forecast data backwards by a week so as not to depend on future data
-    dfnew['logdeaths'] = \
-        dfnew['logdeaths'].rolling(window=15, center=True).mean()
-        #dfnew['logdeaths'].rolling(window=15, center=True, min_periods=8).mean()    
-    try:
-        dfnew['logdeaths'] = \
-            dfnew['logdeaths'].interpolate(method='polynomial', order=2)
-        # replace deaths with exp(interpolated(smoothed(log(deaths))))
-        dfnew['deaths'] = np.exp(dfnew['logdeaths'])
-        the_date_ind = \
-            pd.to_numeric(
-                dfnew.index[dfnew.date.between(the_date, the_date)]
-            )[0]
-        the_val = dfnew.at[the_date_ind, 'deaths']
-        the_new_date_ind = dfnew['deaths'].last_valid_index()
-    except:
-        the_val = np.nan
-        the_new_date_ind = None
-        dfnew = None
-    if math.isnan(the_val):
-        # Because of the centered rolling average, the requested date
-        # *will* return nan here... but then if the dataset is full,
-        # it will return a date 7 days earlier
-        if the_new_date_ind is None:
-            # if no valid data, then forecast cannot be done
-            print("      --- update_mortality_chart \t\tfell back to original IC method (1).")
-            #return [-1, None, dfnew]
-            return [-1, None, None]
-        else:
-            the_new_date_str = \
-                dfnew.date.dt.strftime("%Y-%m-%d").loc[the_new_date_ind]
-            return [dfnew.at[the_new_date_ind, 'deaths'],
-                    the_new_date_str,
-                    dfnew]
-    else:
-        #=== This shouldn't ever happen, but I guess if it does
-        print("      --- update_mortality_chart \t\tfell back to original IC method (2).")
+    #      logsmoothed(deaths) = exp(interpolated(smoothed(log(deaths)))),
+    #
+    # is not defined on the_date itself (centered rolling average), so the
+    # last defined value is returned with its date (see logsmooth.py), and
+    # the interpolated log-smoothed frame if with_frame is set.
+    logsmoothed = get_logsmoothed_mortality(province_name, region_name, df_mortality)
+    initial = logsmoothed.initial_value(the_date)
+    if initial is None:
+        # if no valid data, then forecast cannot be done
+        print("      --- update_mortality_chart \t\tfell back to original IC method (1).")
         return [-1, None, None]
+    the_val, the_new_date_str = initial
+    dfnew = logsmoothed.frame(the_date) if with_frame else None
+    return [the_val, the_new_date_str, dfnew]
+
+def get_logsmoothed_mortality(province_name, region_name, df_mortality):
+    """LogSmoothedMortality of a region's mortality frame, computed once
+    per data load (and per first/last date of the frame)"""
+    cache = current_data().derived('logsmoothed_mortality', lambda data: {})
+    dates = df_mortality['date_death_report']
+    key = (province_name, region_name, len(df_mortality),
+           dates.iloc[0] if len(dates) else None,
+           dates.iloc[-1] if len(dates) else None)
+    logsmoothed = cache.get(key)
+    if logsmoothed is None:
+        logsmoothed = LogSmoothedMortality(dates.to_numpy(),
+                                           df_mortality['deaths'].to_numpy())
+        cache[key] = logsmoothed
+    return logsmoothed
 
 def get_forecasted_mortality(province_name, region_name,
                              forecast_startdate_str, months_to_forecast, 
                              df_mortality, df_mobility, df_vax, df_weather, df_trends,
                              last_vax_fraction, max_vax_fraction):
     #=== Calculate some static values
-    total_pop = get_total_pop(province_name, region_name)
+    profile = get_region_profile(province_name, region_name)
     # Annual death is the static (1997-adjusted) value, not updated by COVID deaths
-    annual_death = get_annual_death(province_name, region_name)
+    annual_death = population_factor_1997_to_today * profile.anndeath
     # Average number of people/household
-    N_household = get_avg_house(province_name, region_name)
-    # Population-weighted population density (PWPD)
-    #  and pwpd_80 = PWPD * (fraction of pop over 80)
-    pwpd = get_pwpd(province_name, region_name)
-    pwpd_80 = pwpd * get_frac_pop_over_80(province_name, region_name)
-    # Population sparsity value
-    land_area = get_land_area(province_name, region_name)
-    pop_sparsity = math.log( (total_pop/land_area) / pwpd ) / math.log(0.25**2/land_area)
+    N_household = profile.house
+    # pwpd_80 = population-weighted population density (PWPD)
+    #   * (fraction of pop over 80)
+    pwpd_80 = profile.pwpd_80
+    # Population sparsity value (see RegionProfile)
+    pop_sparsity = profile.sparsity_exponent
     
     #=== Get mortality df up to (and including) the forecast_startdate_str
     #    using a copy of the already loaded region-specific mortality df.
     #
     #    The copy will be updated with the simulation data and eventually returned
+    first_mortality_date = current_data().first_mortality_date
     df_mort_new = \
-        df_mortality[df_mortality.date_death_report\
-                     .between(first_mortality_date, forecast_startdate_str)]\
+        rows_between(df_mortality, 'date_death_report',
+                     first_mortality_date, forecast_startdate_str)\
                      [['date_death_report', 'deaths']].copy()
     # simplify date column name
     df_mort_cols = ['date', 'deaths']
@@ -2636,16 +2976,17 @@ def get_forecasted_mortality(province_name, region_name,
             #   forecast date, where:
             #      logsmoothed(deaths) = exp(interpolated(smoothed(log(deaths))))
             val, new_date_str, df_mort_logsmooth = \
-                get_logsmoothed_initial_mortality(forecast_startdate_str,
-                                                  df_mort_new)
+                get_logsmoothed_initial_mortality(
+                    forecast_startdate_str, province_name, region_name,
+                    df_mortality, with_frame=show_logsmoothed_mortality_preforecast)
             if (val > 0):
                 #=== keep if it worked and reset the start date 
                 new_forecast_date_str = new_date_str
                 initial_mortality_on_forecast_startdate = val
                 forecast_startdate_str = new_forecast_date_str
                 df_mort_new = \
-                    df_mortality[df_mortality.date_death_report\
-                                 .between(first_mortality_date, forecast_startdate_str)]\
+                    rows_between(df_mortality, 'date_death_report',
+                                 first_mortality_date, forecast_startdate_str)\
                                  [['date_death_report', 'deaths']].copy()
                 # simplify date column name
                 df_mort_cols = ['date', 'deaths']
@@ -2655,9 +2996,6 @@ def get_forecasted_mortality(province_name, region_name,
                 #=== otherwise, fall back to the other method
                 #    ... will likely give azero-valued simulation
                 thetype = 'use_7day_rolling_avg'
-    #=== Calculate total actual COVID deaths through this day
-    total_deaths = df_mort_new['deaths'].sum()
-
     #=== Extend the mortality dataframe's dates to last day of forecast
     firstdate = df_mort_new.date.min()
     forecast_startdate = datetime.datetime.strptime(forecast_startdate_str, '%Y-%m-%d')
@@ -2686,151 +3024,107 @@ def get_forecasted_mortality(province_name, region_name,
                          scale = df_mort_new['zeros'] + 1.0)
     # produce correlated standard random normal values over 14d period
     df_mort_new['correlated_normal'] = \
-        df_mort_new['std_normal'].rolling(window=14).sum() / math.sqrt(14.0)
+        trailing_sum(df_mort_new['std_normal'].to_numpy(), 14) / math.sqrt(14.0)
     df_mort_new['correlated_normal'].fillna(df_mort_new['std_normal'], inplace=True)
     #=== Set mortality values for future dates to zero
     df_mort_new.at[df_mort_new.index > start_index, 'deaths'] = 0.0
     #=== Make a new column for lambda (exp growth rate)
     df_mort_new['lambda'] = 0.0
 
-    #=== Create some time offset values
-    two_weeks = datetime.timedelta(days=14)
-    four_weeks = datetime.timedelta(days=28)
-    fortytwo_days = datetime.timedelta(days=42)
-    two_months = datetime.timedelta(days=60)    
-    
-    #=== Loop over dates of the forecast period
-    for index, row in df_mort_new.iterrows():
-        #=== ignore dates before the forecast period
-        if (index > start_index):
-            #=== Get current date in the forecast
-            date_in_forecast = row.date
-            date_in_forecast_str = date_in_forecast.strftime('%Y-%m-%d')
-            # used to calculated predicted vaccination in the future
-            days_since_today =  (date_in_forecast - datetime.datetime.now()).days
-            
-            #=== xHerd is Total Covid Death/Annual Death
-            total_deaths = \
-                df_mort_new[df_mort_new.date < date_in_forecast]['deaths'].sum()
-            xHerd = total_deaths / annual_death
-            #=== xHerd2 is the total deaths prior to two-months-ago
-            total_deaths_prior_to_two_months_ago = \
-                df_mort_new[df_mort_new.date
-                            < (date_in_forecast - two_months)]['deaths'].sum()                
-            xHerd2 = total_deaths_prior_to_two_months_ago / annual_death
-            covid_death_frac_past_two_months = xHerd - xHerd2
-            covid_death_frac_prior_to_two_months_ago = xHerd2
-            
-            #=== Google facemask trends (six weeks ago)
-            xTrends1 = get_val_on_date('trends', df_trends,
-                                       date_in_forecast - fortytwo_days)
-            facemask_trends_42d_ago = xTrends1
-            
-            #=== Mobility (two and four weeks ago)
-            xMob1 = get_val_on_date('mob', df_mobility,
-                                    date_in_forecast - two_weeks)
-            xMob2 = get_val_on_date('mob', df_mobility,
-                                    date_in_forecast - four_weeks)
-            mobility_two_weeks_ago = xMob1
-            mobility_four_weeks_ago = xMob2            
-            
-            #=== Weather value is 14d average centered three weeks prior (21d)
-            xTemp = get_weather_avg_for_day(df_weather, date_in_forecast, 14, 21)
-            avg_temp_three_weeks_ago = xTemp
-
-            #=== Get fraction_vaccinated value (two and four weeks ago)
-            vax_percent_two_weeks_ago = get_val_on_date('vax', df_vax, date_in_forecast - two_weeks)
-            vax_percent_four_weeks_ago = get_val_on_date('vax', df_vax, date_in_forecast - four_weeks)
-            #=== Forbid vaccination percentage greater than 100%
-            #       (but warn user that it is happening)
-            if (vax_percent_two_weeks_ago > 1):
-                vax_percent_two_weeks_ago = 1.0
-                print("    ***Warning***  vax_percent_two_weeks_ago > 1")
-            if (vax_percent_four_weeks_ago > 1):
-                vax_percent_four_weeks_ago = 1.0
-                print("    ***Warning***  vax_percent_four_weeks_ago > 1")
-            
-            #=== Calculate the growth rate (lambda) from the
-            #    PWPD_80, the depletion of susceptibles by vaccination,
-            #    and the infection rate constant
-            sqrt_PWPD_80 = pwpd_80**0.5
-            sqrt_proportion_unvax = \
-                (1 - maximum_vaccine_efficacy * vax_percent_four_weeks_ago)**0.5
-            sqrt_mortality_effect = \
-                math.exp(0.5 * (C_deathA * covid_death_frac_past_two_months
-                                + C_deathB * covid_death_frac_prior_to_two_months_ago))
-            # Temperature term depends on type chosen
-            if (model_temperature_dependence_type == 'cubic'):
-                temp_term = \
-                    C_temp_cubic_A * (avg_temp_three_weeks_ago - offset_temp_cubic)**2 \
-                    + C_temp_cubic_B * (avg_temp_three_weeks_ago - offset_temp_cubic)**3
-            elif (model_temperature_dependence_type == 'tanh'):
-                temp_term = C_temp_tanh \
-                    * ( np.tanh((avg_temp_three_weeks_ago - offset_temp_tanh)/2) - 1 )
-            # Dependence on rate constant is product of driver dependencies
-            log_k_A = (
-                C_logkA0
-                + C_mobA * mobility_two_weeks_ago
-                + C_mobB * mobility_four_weeks_ago
-                + temp_term
-                + C_trends * facemask_trends_42d_ago
-            )
-            # Sparsity term depends on type chosen (although "new" is supposed to be
-            # the one that actually makes sense, and "oldbad" was a mistake)
-            if (model_sparsity_function_type == 'new'):
-                k_B = 1.0 \
-                    / (
-                        math.sqrt(math.pi) 
-                        * ( 0.25**(2.0*pop_sparsity) * pwpd_80 )**(1/(2.0 - 2.0*pop_sparsity))
-                    )
-            elif (model_sparsity_function_type == 'oldbad'):
-                k_B = (
-                    8.0 / pwpd_80
-                    * (2.0 - pop_sparsity / 2.0)
-                    )**(1.0/(2.0 - pop_sparsity / 2.0))
-            sqrt_k = (math.exp(log_k_A) * k_B )**0.5
-            # Dependence on inverse infectious period
-            inv_tauI = (
-                C_inv_tauI_0
-                + C_inv_tauI_logAD * (math.log(annual_death, 10)
-                                      - math.log(offset_annual_death, 10))
-                + C_inv_tauI_HN * (N_household - offset_N_household)
-            )
-            #=== Calculate the growth rate (lambda) as:
-            #
-            #     lambda = sqrt(k PWD_80 unvax_frac)
-            #               + lambda0
-            #               + C_vaxrate * [vax2wk - vax4wk]
-            #               + C_AD * [log10(AD) - 3.65 ]
-            #               + C_HN * [N_household - 2.7]
-            #
-            lambda_val = (
-                sqrt_k * sqrt_PWPD_80 * sqrt_proportion_unvax * sqrt_mortality_effect
-                - inv_tauI
-                + C_vaxrate * (vax_percent_two_weeks_ago - vax_percent_four_weeks_ago)
+    #=== Days of the forecast period (the frame has one row per day)
+    forecast_rows = np.arange(start_index + 1, len(df_mort_new))
+    forecast_dates = pd.DatetimeIndex(df_mort_new['date'].iloc[forecast_rows])
+
+    #=== The drivers of every forecast day, lagged as the model uses them
+    #
+    # Google facemask trends (six weeks ago)
+    facemask_trends_42d_ago = \
+        get_vals_on_dates('trends', df_trends, forecast_dates - pd.Timedelta(days=42))
+    # Mobility (two and four weeks ago)
+    mobility_two_weeks_ago = \
+        get_vals_on_dates('mob', df_mobility, forecast_dates - pd.Timedelta(days=14))
+    mobility_four_weeks_ago = \
+        get_vals_on_dates('mob', df_mobility, forecast_dates - pd.Timedelta(days=28))
+    # Weather value is 14d average centered three weeks prior (21d)
+    avg_temp_three_weeks_ago = \
+        get_weather_avg_for_days(df_weather, forecast_dates, 14, 21)
+    # Fraction_vaccinated value (two and four weeks ago)
+    vax_percent_two_weeks_ago = \
+        get_vals_on_dates('vax', df_vax, forecast_dates - pd.Timedelta(days=14))
+    vax_percent_four_weeks_ago = \
+        get_vals_on_dates('vax', df_vax, forecast_dates - pd.Timedelta(days=28))
+    #=== Forbid vaccination percentage greater than 100%
+    #       (but warn user that it is happening)
+    for vax_name, vax_percent in [('vax_percent_two_weeks_ago', vax_percent_two_weeks_ago),
+                                  ('vax_percent_four_weeks_ago', vax_percent_four_weeks_ago)]:
+        over = (vax_percent > 1)
+        if over.any():
+            vax_percent[over] = 1.0
+            print("    ***Warning***  " + vax_name + " > 1 (on "
+                  + str(int(over.sum())) + " days)")
+
+    #=== Calculate the parts of the growth rate (lambda) that do not
+    #    depend on the simulated deaths, from the PWPD_80, the depletion
+    #    of susceptibles by vaccination, and the infection rate constant
+    sqrt_PWPD_80 = pwpd_80**0.5
+    sqrt_proportion_unvax = \
+        (1 - maximum_vaccine_efficacy * vax_percent_four_weeks_ago)**0.5
+    # Temperature term depends on type chosen
+    if (model_temperature_dependence_type == 'cubic'):
+        temp_term = \
+            C_temp_cubic_A * (avg_temp_three_weeks_ago - offset_temp_cubic)**2 \
+            + C_temp_cubic_B * (avg_temp_three_weeks_ago - offset_temp_cubic)**3
+    elif (model_temperature_dependence_type == 'tanh'):
+        temp_term = C_temp_tanh \
+            * ( np.tanh((avg_temp_three_weeks_ago - offset_temp_tanh)/2) - 1 )
+    # Dependence on rate constant is product of driver dependencies
+    log_k_A = (
+        C_logkA0
+        + C_mobA * mobility_two_weeks_ago
+        + C_mobB * mobility_four_weeks_ago
+        + temp_term
+        + C_trends * facemask_trends_42d_ago
+    )
+    # Sparsity term depends on type chosen (although "new" is supposed to be
+    # the one that actually makes sense, and "oldbad" was a mistake)
+    if (model_sparsity_function_type == 'new'):
+        k_B = 1.0 \
+            / (
+                math.sqrt(math.pi) 
+                * ( 0.25**(2.0*pop_sparsity) * pwpd_80 )**(1/(2.0 - 2.0*pop_sparsity))
             )
-            #=== Apply a Gaussian random error to lambda value
-            # Past two weeks of death are those since two weeks ago
-            #        (future values are zero)
-            deaths_past_two_weeks = \
-                df_mort_new[df_mort_new.date
-                            > (date_in_forecast - two_weeks)]['deaths'].sum()
-            sigma = math.sqrt(0.093 / (14.0 + deaths_past_two_weeks))
-            if (simulation_error_type == 'normal'):
-                lambda_err = sigma*df_mort_new.at[index, 'std_normal']
-            elif (simulation_error_type == '14d_correlated_normal'):
-                lambda_err = sigma*df_mort_new.at[index, 'correlated_normal']
-            lambda_val += lambda_err
-            
-            #=== Save lambda value
-            df_mort_new.at[index, 'lambda'] = lambda_val
-            
-            #=== Calculate the new death value
-            new_deaths = math.exp(lambda_val) * df_mort_new.at[index-1, 'deaths']
-            df_mort_new.at[index, 'deaths'] = new_deaths
-            
-            # print data to user
-            #print(row.date, new_deaths)
+    elif (model_sparsity_function_type == 'oldbad'):
+        k_B = (
+            8.0 / pwpd_80
+            * (2.0 - pop_sparsity / 2.0)
+            )**(1.0/(2.0 - pop_sparsity / 2.0))
+    sqrt_k = (np.exp(log_k_A) * k_B )**0.5
+    # Dependence on inverse infectious period
+    inv_tauI = (
+        C_inv_tauI_0
+        + C_inv_tauI_logAD * (math.log(annual_death, 10)
+                              - math.log(offset_annual_death, 10))
+        + C_inv_tauI_HN * (N_household - offset_N_household)
+    )
+    growth_without_mortality_effect = \
+        sqrt_k * sqrt_PWPD_80 * sqrt_proportion_unvax
+    vax_rate_term = \
+        C_vaxrate * (vax_percent_two_weeks_ago - vax_percent_four_weeks_ago)
+    # Gaussian random error of each day (scaled by sigma below)
+    if (simulation_error_type == 'normal'):
+        lambda_errors = df_mort_new['std_normal'].to_numpy()[forecast_rows]
+    elif (simulation_error_type == '14d_correlated_normal'):
+        lambda_errors = df_mort_new['correlated_normal'].to_numpy()[forecast_rows]
+
+    #=== Run the forecast one day at a time from the start value (see
+    #    forecast.py): the herd terms and the error width depend on the
+    #    simulated deaths
+    deaths, lambdas = simulate_deaths(
+        df_mort_new['deaths'].to_numpy(), start_index,
+        growth_without_mortality_effect, inv_tauI, vax_rate_term,
+        lambda_errors, annual_death, C_deathA, C_deathB)
+    df_mort_new['deaths'] = deaths
+    df_mort_new['lambda'] = lambdas
     # return dataframe with forecast, and (if doing "logsmoothed")
     # the updated forecast startdate, along with the logsmoothed df
     return [df_mort_new, forecast_startdate_str, df_mort_logsmooth]
@@ -2842,76 +3136,62 @@ def get_forecasted_mortality(province_name, region_name,
 
 def get_hr_mortality_df(province_name, region_name, getall=True,
                         startdate=None, enddate=None):
-    dfp = df_mort_all[df_mort_all.province == province_name]
-    dfr = dfp[dfp.health_region == region_name].copy()
-    if (region_name == "Toronto"):
-        #=== Get rid of this Toronto data dump:
-        #
-        #             date       deaths
-        #          29Sep2020     1
-        #          30Sep2020     2
-        #           1Oct2020     1
-        #           2Oct2020     80
-        #           3Oct2020     37
-        #           4Oct2020     3
-        #           5Oct2020     3
-        #           6Oct2020     2
-        #
-        #    According to these articles:
-        #
-        #     https://www.cbc.ca/news/canada/toronto/
-        #                  covid-19-coronavirus-ontario-october-2-1.5747709
-        #     https://www.cbc.ca/news/canada/toronto/
-        #                  ontario-covid-19-cases-october-3-update-1.5749382
-        #     https://www.cbc.ca/news/canada/toronto/
-        #                  ontario-covid-19-cases-october-4-update-1.5749841
-        #
-        #    The spike was due to a "data review and data cleaning
-        #    initiative" by Toronto Public Health, and the old cases were
-        #    from the "spring or summer" of 2020.  The breakdown was:
-        #
-        #        oct 1: 3 new
-        #        oct 2: 2 new 74 old
-        #        oct 3: 4 new 37 old
-        #        oct 4: 4 new 3 old
-        #
-        # reset october 2nd and 3rd values to correct
-        therowindex = dfr.index[dfr.date_death_report.between("2020-10-02", "2020-10-02")]
-        dfr.at[therowindex, 'deaths'] = 2
-        therowindex = dfr.index[dfr.date_death_report.between("2020-10-03", "2020-10-03")]
-        dfr.at[therowindex, 'deaths'] = 4
-        # distribute remaining 111 cases over prior days, proportional
-        # to their existing mortality counts
-        old_deaths = 111.0
-        # must change type to float to add fractional amounts
-        dfr.deaths = dfr.deaths.astype('float64')
-        df_prior = dfr[dfr.date_death_report.between(first_mortality_date, "2020-10-01")]
-        total_deaths_prior = df_prior.deaths.sum()
-        for index, row in df_prior.iterrows():
-            dfr.at[index, 'deaths'] = \
-                dfr.at[index, 'deaths'] \
-                + old_deaths * (dfr.at[index, 'deaths'] / total_deaths_prior)
+    data = current_data()
+    store = get_series_store()
+    if store is not None:
+        dfr = store.query('mortality', (province_name, region_name))
+    else:
+        dfr = data.mort_index.get((province_name, region_name)).copy()
+    # (known problems of the data, like the Toronto data dump of
+    #  October 2020, are corrected when it is loaded, see corrections.py)
     if getall:
         return dfr
     else:
         if ( (startdate is None) | (enddate is None) ):
             print("***Error: must set start and end dates for getall=False (get_hr_mortality_df)")
             exit(0)
-        return dfr[dfr.date_death_report.between(startdate, enddate)]
+        return rows_between(dfr, 'date_death_report', startdate, enddate)
 
 def get_hr_cases_df(province_name, region_name, getall=True, startdate=None, enddate=None):
-    dfp = df_cases_all[df_cases_all.province == province_name]
-    dfr = dfp[dfp.health_region == region_name]
+    store = get_series_store()
+    if store is not None:
+        # only the requested dates are read from the store
+        dfr = store.query('cases', (province_name, region_name),
+                          None if getall else startdate,
+                          None if getall else enddate)
+    else:
+        dfr = current_data().cases_index.get((province_name, region_name)).copy()
     if getall:
         return dfr
     else:
         if ( (startdate is None) | (enddate is None) ):
             print("***Error: must set start and end dates for getall=False (get_hr_cases_df)")
             exit(0)
-        return dfr[dfr.date_report.between(startdate, enddate)]
+        return rows_between(dfr, 'date_report', startdate, enddate)
+
+#=== Value columns of the mortality and cases cubes
+region_cube_columns = {'mortality': ['deaths', 'cumulative_deaths'],
+                       'cases': ['cases', 'cumulative_cases']}
+
+def get_region_cube(data, dataset, region_key):
+    """RegionCube of 'mortality' or 'cases' with the row of a region: the
+    national cube of the snapshot, or for data_backend 'shards' (no
+    national cubes) a cube of just that region, read from the series
+    store, on the same day axis (first_possible_date to the last date of
+    the dataset).  Use cube.row(region_key): None if the region has no data.
+    """
+    cube = data.mort_cube if (dataset == 'mortality') else data.cases_cube
+    if cube is not None:
+        return cube
+    store = get_series_store()
+    info = store.dataset_info(dataset)
+    df = store.query(dataset, region_key)
+    return RegionCube(RegionIndex(df, info['key_columns'], info['date_column']),
+                      region_cube_columns[dataset], first_possible_date,
+                      store.date_range(dataset)[1])
 
 def get_mortality_rolling_avg_at_end(df):
-    last_rolling_avg = df.deaths.rolling(window=7).mean().to_list()[-1]
+    last_rolling_avg = float(trailing_mean(df.deaths.to_numpy(dtype=np.float64), 7)[-1])
     return last_rolling_avg        
 
 def randomize_initial_mortality_value(df_mort_new, forecast_startdate_str):
@@ -2928,30 +3208,65 @@ def randomize_initial_mortality_value(df_mort_new, forecast_startdate_str):
 #===========   Helper Functions: Cases       =============
 #=========================================================
 
+def get_cases_7day(data):
+    """[region, day] array of the 7-day rolling average of cases of a
+    snapshot (on the day axis of its cases cube)"""
+    return data.derived('cases_7day', lambda data: derive(data, 'cases_7day',
+                                                          cases_7day_derivation))
+
+def get_region_cases_7day(data, cases_cube, row):
+    """[day] array of the 7-day rolling average of cases of a row of a
+    cube from get_region_cube"""
+    if data.cases_cube is None:
+        # (a one-region cube of the series store)
+        return compute_cases_7day(cases_cube, np.array([row]), 0)[0]
+    return get_cases_7day(data)[row]
 
 #=========================================================
 #===========   Helper Functions: Mobility    =============
 #=========================================================
 
 def get_hr_mob_df(province_name, region_name, getall=True, startdate=None, enddate=None):
-    if (province_name == "NWT"):
-        df_mob = df_mob_all[df_mob_all["sub_region_1"] == "Northwest Territories"].copy()
-        polyorder=1
-    elif (province_name == "Yukon"):
-        df_mob = df_mob_all[df_mob_all["sub_region_1"] == "Yukon"].copy()
-        polyorder=1        
+    data = current_data()
+    mob_column, mob_key, polyorder = \
+        get_mob_region(get_region_profile(province_name, region_name))
+    #=== The finished series is precomputed (see build_mob_series)
+    df_mob = data.derived('mob_series', build_mob_series).frame((mob_column, mob_key))
+    if df_mob is None:
+        df_mob = compute_mob_df(data, mob_column, mob_key, polyorder)
+    if getall:
+        return df_mob
+    else:
+        if ( (startdate is None) | (enddate is None) ):
+            print("***Error: must set start and end dates for getall=False (get_hr_mob_df)")
+            exit(0)
+        return rows_between(df_mob, 'date', startdate, enddate)
+
+def get_mob_region(profile):
+    """(key column, key, interpolation order) of a health region's mobility"""
+    if (profile.province_name == "NWT"):
+        return 'sub_region_1', "Northwest Territories", 1
+    elif (profile.province_name == "Yukon"):
+        return 'sub_region_1', "Yukon", 1
+    else:
+        return 'sub_region_2', profile.sub_region_2, 2
+
+def compute_mob_df(data, mob_column, mob_key, polyorder):
+    """Finished mobility series of a region of a snapshot: 7-day rolling
+    mean on every day from the first to the last day of data, interpolated"""
+    store = get_series_store()
+    if store is not None:
+        df_mob = store.query('mobility_' + mob_column, mob_key)
+    elif (mob_column == 'sub_region_1'):
+        df_mob = data.mob_index_sub_region_1.get(mob_key).copy()
     else:
-        sub_region_name = \
-            static_data[(static_data["province_name"] == province_name)
-                        & (static_data["health_region"] == region_name)]\
-                        ["sub_region_2"].item()
-        df_mob = df_mob_all[df_mob_all["sub_region_2"] == sub_region_name].copy()
-        polyorder=2
+        df_mob = data.mob_index.get(mob_key).copy()
     val_string = 'workplaces_percent_change_from_baseline'
     df_mob = df_mob[['date', val_string]]
     #=== Get the 7-day rolling average of mobility always
     #    (to avoid getting nan in rolling mean of sparse data, use min_periods=1)
-    df_mob[val_string] = df_mob[val_string].rolling(window=7, min_periods=1).mean()
+    df_mob[val_string] = \
+        trailing_mean(df_mob[val_string].to_numpy(dtype=np.float64), 7, min_periods=1)
     #=== Extend to fill in missing dates from google mobility file
     startdate = df_mob.date.min()
     enddate = df_mob.date.max()
@@ -2959,19 +3274,96 @@ def get_hr_mob_df(province_name, region_name, getall=True, startdate=None, endda
     #=== Interpolate the mobility data to fill in blanks
     df_mob[val_string] = \
         df_mob[val_string].interpolate(method='polynomial', order=polyorder)
-    if getall:
-        return df_mob
-    else:
-        if ( (startdate is None) | (enddate is None) ):
-            print("***Error: must set start and end dates for getall=False (get_hr_mob_df)")
-            exit(0)
-        return df_mob[df_mob.date.between(startdate, enddate)]
+    return df_mob
+
+def build_mob_series(data, previous=None):
+    """RegionSeries of the finished mobility series of all health regions
+    of a snapshot, keyed by (mobility key column, key) (those of the
+    previous snapshot are kept for the regions whose data did not change)"""
+    print("START --- build_mob_series \t\t", nowtime())
+    frames = unchanged_series(data, previous, 'mob_series',
+                              lambda key: ('mobility_' + key[0], key[1]),
+                              depends_on=['static'])
+    kept = set(frames)
+    for uid in data.regions.uids():
+        mob_column, mob_key, polyorder = \
+            get_mob_region(data.regions.profile_of_uid(uid))
+        key = (mob_column, mob_key)
+        if key in frames:
+            continue
+        try:
+            frames[key] = compute_mob_df(data, mob_column, mob_key, polyorder)
+        except (ValueError, TypeError):
+            # no (usable) data: left to get_hr_mob_df, as before
+            continue
+    print("END   --- build_mob_series \t\t", nowtime(),
+          "(" + str(len(kept)) + " kept, " + str(len(frames) - len(kept)) + " computed)")
+    return RegionSeries('workplaces_percent_change_from_baseline', frames)
 
 #=========================================================
 #===========   Helper Functions: Weather     =============
 #=========================================================
 
+#=== The weather store is opened on first use, and reopened whenever the
+#    store file is replaced (the old mapping stays valid for callers
+#    still using it)
+weather_store = None
+weather_store_signature = None
+weather_store_lock = threading.Lock()
+
+def get_weather_store():
+    """Return the open weather store (None if it cannot be used)"""
+    global weather_store, weather_store_signature
+    if not use_weather_store:
+        return None
+    signature = file_signature([filename_weather_store])
+    if (signature != weather_store_signature):
+        with weather_store_lock:
+            signature = file_signature([filename_weather_store])
+            if (signature != weather_store_signature):
+                weather_store = open_weather_store()
+                weather_store_signature = file_signature([filename_weather_store])
+    return weather_store
+
+def open_weather_store():
+    try:
+        if not os.path.exists(filename_weather_store):
+            print("      --- open_weather_store \t\t", nowtime(), " --- building store")
+            build_weather_store(weather_data_dir, filename_weather_store)
+        return WeatherStore(filename_weather_store)
+    except (OSError, ValueError) as err:
+        print("      --- open_weather_store \t\tcannot use weather store ("
+              + str(err) + "), reading csv files")
+        return None
+
+#=== The weather of each region (date and temp_mean arrays, and last date
+#    of actual data) is cached per process, and rebuilt when the region's
+#    weather file or the weather store changes (or on data reload)
+weather_cache = FileCache()
+
 def get_hr_weather_data(province_name, region_name):
+    weather_key = get_provinceid(province_name, region_name) + "_" \
+        + str(get_hruid(province_name, region_name))
+    dates, temp_mean, last_weather_data_date = \
+        weather_cache.get(weather_key,
+                          [weather_data_dir + weather_key + ".csv",
+                           filename_weather_store],
+                          lambda: read_hr_weather_arrays(weather_key))
+    df_weather = pd.DataFrame({'date': dates, 'temp_mean': temp_mean},
+                              columns=['date', 'temp_mean'])
+    return df_weather, last_weather_data_date
+
+def read_hr_weather_arrays(weather_key):
+    """(dates, temp_mean) read-only arrays and last date of actual data
+    of a region's weather"""
+    df_weather, last_weather_data_date = read_hr_weather_data(weather_key)
+    dates = df_weather['date'].to_numpy()
+    temp_mean = df_weather['temp_mean'].to_numpy(dtype=np.float64, copy=True)
+    dates.setflags(write=False)
+    temp_mean.setflags(write=False)
+    return dates, temp_mean, last_weather_data_date
+
+def read_hr_weather_data(weather_key):
     # Get weather dataframe
     #
     #  File contains data from 2020-01-01 -- 2023-01-01.  Data in temp_mean
@@ -2983,10 +3375,20 @@ def get_hr_weather_data(province_name, region_name):
     #             theta, temp_mean_avg, temp_min_avg, temp_max_avg]
     #
     #
-    # create file name
-    prov_id = get_provinceid(province_name, region_name)
-    hr_uid = get_hruid(province_name, region_name)
-    weatherfile = prov_id + "_" + str(hr_uid) + ".csv"
+    #=== Query the series store, if used
+    series = get_series_store()
+    if series is not None:
+        df_weather = series.query('weather', weather_key)
+        if len(df_weather) > 0:
+            last_weather_data_date = \
+                df_weather.at[df_weather['climate_id'].last_valid_index(), 'date']
+            return (df_weather[['date', 'temp_mean']],
+                    last_weather_data_date.strftime("%Y-%m-%d"))
+    #=== Slice the (already interpolated) data from the weather store
+    store = get_weather_store()
+    if (store is not None) and (weather_key in store):
+        return store.frame(weather_key), store.last_data_date(weather_key)
+    weatherfile = weather_key + ".csv"
     # read in data
     df_weather = pd.read_csv(weather_data_dir + weatherfile)
     last_weather_data_date_ind = df_weather['climate_id'].last_valid_index()
@@ -2999,16 +3401,20 @@ def get_hr_weather_data(province_name, region_name):
     df_weather['date'] = pd.to_datetime(df_weather['date'])
     return df_weather, last_weather_data_date
 
-def get_weather_avg_for_day(df_weather, day, avg_window_days, avg_window_center_days_prior):
-    # filter dataframe on averaging window
-    window_centerdate = day - datetime.timedelta(days=avg_window_center_days_prior)
-    window_halfwidth = datetime.timedelta(days = avg_window_days/2.0)
-    window_start = window_centerdate - window_halfwidth
-    window_end = window_centerdate + window_halfwidth    
-    df = df_weather[df_weather.date.between(window_start, window_end)]
-
-    # return average temperature
-    return df['temp_mean'].mean()
+def get_weather_avg_for_days(df_weather, days, avg_window_days, avg_window_center_days_prior):
+    """Average temperature over a window of avg_window_days (+1) days
+    centered avg_window_center_days_prior days before each of the days
+    (a DatetimeIndex of consecutive days), as an array"""
+    if (len(days) == 0):
+        return np.zeros(0)
+    halfwidth = int(avg_window_days / 2.0)
+    lo = avg_window_center_days_prior + halfwidth
+    hi = avg_window_center_days_prior - halfwidth
+    # temperature on every day from the start of the first window
+    temp = values_on(df_weather, 'date', 'temp_mean',
+                     pd.date_range(days[0] - pd.Timedelta(days=lo), days[-1]),
+                     missing=np.nan)
+    return window_mean(temp, -lo, -hi)[lo:]
 
 #=========================================================
 #===========  Helper Functions: Vaccination  =============
@@ -3031,16 +3437,9 @@ def check_vax_data_type(province_name):
         return 'regional'
 
 def get_uid(province_name, region_name):
-    uid = get_region_info(province_name, region_name).hr_uid.item()
-    return uid
+    return get_region_profile(province_name, region_name).hr_uid
 
-def get_hr_vax_data(province_name, region_name, max_vax_percent):
-    #=== Check whether regional data available (or only provincial)
-    vax_data_type = check_vax_data_type(province_name)
-    if (vax_data_type == "provincial"):
-        api = vax_base_url_prov + str(get_provinceid(province_name, region_name))
-    else:
-        api = vax_base_url + str(int(get_uid(province_name, region_name)))
+def download_vax_data(api):
     #=== Download the data into a json files
     with request.urlopen(str(api)) as response:
         source = response.read()
@@ -3053,7 +3452,28 @@ def get_hr_vax_data(province_name, region_name, max_vax_percent):
     #               change_vaccinated, total_cases, ...
     #               total_vaccinations, total_vaccinated]
     #
-    df = pd.json_normalize(api_data, max_level=1)
+    return pd.json_normalize(api_data, max_level=1)
+
+def get_hr_vax_data(province_name, region_name, max_vax_percent):
+    #=== Check whether regional data available (or only provincial)
+    vax_data_type = check_vax_data_type(province_name)
+    if (vax_data_type == "provincial"):
+        api = vax_base_url_prov + str(get_provinceid(province_name, region_name))
+    else:
+        api = vax_base_url + str(int(get_uid(province_name, region_name)))
+    #=== Use the copy kept in the series store if it is recent enough
+    df = None
+    store = get_series_store()
+    if store is not None:
+        updated_at = store.region_updated_at('vaccination', api)
+        if ( (updated_at is not None)
+             and (datetime.datetime.now() - updated_at
+                  < datetime.timedelta(hours=vax_data_max_age_hours)) ):
+            df = store.query('vaccination', api)
+    if df is None:
+        df = download_vax_data(api)
+        if store is not None:
+            store.replace_region('vaccination', api, df, 'api', 'date')
     #df.to_csv('junk.csv', index=False)
     #=== Get the fraction of the population with at least one dose
     #
@@ -3086,7 +3506,7 @@ def get_hr_vax_data(province_name, region_name, max_vax_percent):
     # find rate of vaccinations in first two weeks
     two_weeks_later = startdate + datetime.timedelta(days=13)
     two_weeks_vax = \
-        df[df.date.between(startdate, two_weeks_later)]\
+        rows_between(df, 'date', startdate, two_weeks_later)\
         [val_string].to_list()
     # len(two_weeks_vax) should be 14 (days) but possible there is less data
     starting_vax_rate_per_day = \
@@ -3114,14 +3534,34 @@ def get_hr_vax_data(province_name, region_name, max_vax_percent):
 #=========================================================
 
 def get_geocode(province_name, region_name):
-    geo_code = get_region_info(province_name, region_name).geo_code.item()
-    return str(geo_code)
+    return str(get_region_profile(province_name, region_name).geo_code)
 
 def get_hr_trends_df(province_name, region_name, getall=True,
                      startdate=None, enddate=None):
-    #===BPH get both date and the trends data
     geocode = get_geocode(province_name, region_name)
-    df_trends = df_trends_all[['date', geocode]].copy()
+    #=== The finished series (one per province) is precomputed
+    #    (see build_trends_series)
+    df_trends = current_data().derived('trends_series', build_trends_series)\
+        .frame((province_name, geocode))
+    if df_trends is None:
+        df_trends = compute_trends_df(province_name, geocode)
+    if getall:
+        return df_trends
+    else:
+        if ( (startdate is None) | (enddate is None) ):
+            print("***Error: must set start and end dates for getall=False (get_hr_mortality_df)")
+            exit(0)
+        return rows_between(df_trends, 'date', startdate, enddate)
+
+def compute_trends_df(province_name, geocode):
+    """Finished trends series of a province: scaled for Quebec, ramped up
+    around 15Apr2020 and 7-day rolling mean"""
+    #===BPH get both date and the trends data
+    store = get_series_store()
+    if store is not None:
+        df_trends = store.query('trends', geocode)[['date', 'trend_val']]
+    else:
+        df_trends = current_data().df_trends_all[['date', geocode]].copy()
     # rename columns
     trends_cols = ['date', 'trend_val']
     df_trends.columns = trends_cols
@@ -3137,100 +3577,198 @@ def get_hr_trends_df(province_name, region_name, getall=True,
     # remove the days since 15Apr
     df_trends = df_trends[trends_cols]
     #=== Get the 7-day rolling average of trends, always
-    df_trends['trend_val'] = df_trends['trend_val'].rolling(window=7).mean()
-    if getall:
-        return df_trends
-    else:
-        if ( (startdate is None) | (enddate is None) ):
-            print("***Error: must set start and end dates for getall=False (get_hr_mortality_df)")
-            exit(0)
-        return df_trends[df_trends.date.between(startdate, enddate)]
+    df_trends['trend_val'] = trailing_mean(df_trends['trend_val'].to_numpy(dtype=np.float64), 7)
+    return df_trends
+
+def build_trends_series(data, previous=None):
+    """RegionSeries of the finished trends series of all provinces of a
+    snapshot, keyed by (province, geocode) (those of the previous snapshot
+    are kept for the geocodes whose data did not change)"""
+    frames = unchanged_series(data, previous, 'trends_series',
+                              lambda key: ('trends', key[1]),
+                              depends_on=['static'])
+    for uid in data.regions.uids():
+        profile = data.regions.profile_of_uid(uid)
+        key = (profile.province_name, str(profile.geo_code))
+        if key in frames:
+            continue
+        try:
+            frames[key] = compute_trends_df(*key)
+        except (KeyError, ValueError):
+            # no trends for the geocode: left to get_hr_trends_df, as before
+            continue
+    return RegionSeries('trend_val', frames)
 
 #=========================================================
 #===========  Helper Functions: R(t) graph     ===========
 #=========================================================
 
-def calculate_Rt_from_mortality(df_mort):
-    #=== Calculate R(t) from mortality data:
-    #
-    #    * for exp growth with fixed serial interval, tau:
-    #
-    #           n(tau) = n0 * R
-    #           n(2*tau) = (n0 * R) * R
-    #           n(N*tau) = n0 R^N
-    #           n(t) = n0 R^(t/tau)
-    #                = n0 exp[t/tau ln(R)]
-    #                = n0 exp[lambda*t]     w/ lambda = ln(R)/tau
-    #
-    #              ---> R = exp(tau*lambda)
-    #
-    #    * Get D_14 = 14-day rolling average of mortality
-    #
-    #    * Assuming
-    #
-    #          D_14(t) = const * exp[ lambda * t ]
-    #
-    #      we have (natural log)
-    #
-    #          lambda(t) = d[log(D_14)]/dt
-    #
-    #      which can be calculated using numpy.gradient
-    #
-    #    * Calculate
-    #
-    #          R(t) = exp[ tau * lambda(t) ] 
-    #   
-    #    * Take 14-day rolling average of the resulting R(t)
-    #
-    df_mort_Rt = df_mort.copy()
-    #print(df_mort_Rt)
-    df_mort_Rt['D14'] = \
-        df_mort_Rt['deaths'].rolling(window=14).mean() + Rt_make_D14_nonzero_offset
-    df_mort_Rt['log_D14'] = np.log(df_mort_Rt['D14'])
-    if Rt_smooth_lambda14_first:
-        df_mort_Rt['lambda_14'] = np.gradient(df_mort_Rt['log_D14'])
-        df_mort_Rt['lambda_14'] = df_mort_Rt['lambda_14'].rolling(window=14).mean()
-        df_mort_Rt['Rt'] = np.exp( Rt_serial_interval
-                                   * df_mort_Rt['lambda_14'] )
+#=== R(t) of the mortality cube with the options above (see regionrates.py)
+Rt_derivation = make_Rt_derivation(Rt_serial_interval, Rt_make_D14_nonzero_offset,
+                                   Rt_smooth_lambda14_first)
+
+def get_hr_Rt_df(province_name, region_name, startdate, enddate):
+    """DataFrame [date_death_report, Rt] of a region between two dates
+    (inclusive), sliced from the R(t) of the current snapshot"""
+    data = current_data()
+    mort_cube = get_region_cube(data, 'mortality', (province_name, region_name))
+    row = mort_cube.row((province_name, region_name))
+    days = mort_cube.date_slice(startdate, enddate)
+    if row is None:
+        Rt = np.full(days.stop - days.start, np.nan)
+    elif data.mort_cube is None:
+        # (a one-region cube of the series store)
+        Rt = Rt_derivation.compute(mort_cube, np.array([row]), 0)[0, days]
     else:
-        df_mort_Rt['lambda_14'] = np.gradient(df_mort_Rt['log_D14'])
-        df_mort_Rt['Rt'] = np.exp( Rt_serial_interval
-                                   * df_mort_Rt['lambda_14'] )
-        df_mort_Rt['Rt'] = df_mort_Rt['Rt'].rolling(window=14).mean()
+        Rt = data.derived('Rt_cube', lambda data: derive(data, 'Rt_cube',
+                                                         Rt_derivation))[row, days]
+    return pd.DataFrame({'date_death_report': mort_cube.dates[days], 'Rt': Rt},
+                        columns=['date_death_report', 'Rt'])
+
+#=========================================================
+#===========  Helper Functions: Region aggregates  =======
+#=========================================================
 
-    return df_mort_Rt
+def build_card_aggregates(data, today_str, profiles=None):
+    """DataFrame of per-region totals and ratios, indexed by
+    (province, health_region), for the given region profiles (default:
+    all regions of the static data).
 
-# -------------- MAP FUNCTIONS --------------
+    Columns: total_pop, annual_deaths (1997-growth-adjusted),
+    total_deaths, total_cases, deaths_last_year (the 365 days up to
+    today_str), deaths_per_pop, cases_per_pop and covid_per_annual
+    (deaths_last_year / annual_deaths).
+    """
+    if profiles is None:
+        profiles = [data.regions.profile_of_uid(uid) for uid in data.regions.uids()]
+    keys = [(profile.province_name, profile.health_region) for profile in profiles]
+    def region_sums(dataset, column, startdate=None, enddate=None):
+        # (0 for a region without data)
+        cube = data.mort_cube if (dataset == 'mortality') else data.cases_cube
+        if cube is None:
+            # (data_backend 'shards': one region at a time)
+            sums = []
+            for key in keys:
+                cube = get_region_cube(data, dataset, key)
+                sums.append(0.0 if cube.row(key) is None
+                            else cube.region_total(column, key, startdate, enddate))
+            return sums
+        arr = cube.values[column]
+        if startdate is not None:
+            arr = arr[:, cube.date_slice(startdate, enddate)]
+        sums = np.nansum(arr, axis=1)
+        return [0.0 if cube.row(key) is None else sums[cube.row(key)] for key in keys]
+    lastyear_today = ( pd.Timestamp(today_str)
+                       - pd.Timedelta(days=365) ).strftime("%Y-%m-%d")
+    df = pd.DataFrame({
+        'total_pop': [profile.total_pop for profile in profiles],
+        'annual_deaths': [population_factor_1997_to_today * profile.anndeath
+                          for profile in profiles],
+        'total_deaths': region_sums('mortality', 'deaths'),
+        'total_cases': region_sums('cases', 'cases'),
+        'deaths_last_year': region_sums('mortality', 'deaths',
+                                        lastyear_today, today_str),
+    }, index=pd.MultiIndex.from_tuples(keys, names=['province', 'health_region']))
+    df['deaths_per_pop'] = df['total_deaths'] / df['total_pop']
+    df['cases_per_pop'] = df['total_cases'] / df['total_pop']
+    df['covid_per_annual'] = df['deaths_last_year'] / df['annual_deaths']
+    return df
 
-def get_map_data(region_list):
+def get_card_aggregates(today_str, province_name, region_name):
+    """The row of a region in the region aggregates table of the current
+    snapshot for a day.  The table is built once per data load and day
+    (for data_backend 'shards', one region at a time, on first use)."""
+    data = current_data()
+    key = (province_name, region_name)
+    cache = data.derived('card_aggregates', lambda data: {})
+    aggregates = cache.get(today_str)
+    if aggregates is None:
+        if (data.mort_cube is None):
+            aggregates = {}
+        else:
+            aggregates = build_card_aggregates(data, today_str)
+        # only the current day is kept
+        cache.clear()
+        cache[today_str] = aggregates
+    if isinstance(aggregates, dict):
+        if key not in aggregates:
+            aggregates[key] = build_card_aggregates(
+                data, today_str, [data.regions.profile(*key)]).loc[key]
+        return aggregates[key]
+    return aggregates.loc[key]
 
-    df_deaths = df_mort2.copy()
-    df_deaths['deaths'] = df_deaths['deaths'].rolling(window=7).mean()
-    df_deaths = df_deaths[df_deaths['date_death_report'] == max(df_mort2["date_death_report"])]
-    cumulative_deaths_data = df_deaths.cumulative_deaths[df_deaths.ENG_LABEL == region_list].tolist()
+# -------------- MAP FUNCTIONS --------------
 
-    print("      --- display_choropleth \t\t", nowtime(), "  --- got deaths")
+def get_map_values(data):
+    """{'cumulative_deaths', 'cumulative_cases', 'daily_cases': list over
+    the map regions} of a snapshot (see build_map_values), built once"""
+    return data.derived('map_values', build_map_values)
+
+def build_map_values(data):
+    """The values shown on the map for each map region (in the order of
+    data.regions.map_labels, NaN for a region without data): cumulative
+    deaths on the last day of mortality data, cumulative cases and 7-day
+    average cases on the last day of case data.  Taken one region at a
+    time from get_region_cube, so that no national cube is needed with
+    data_backend 'shards'."""
+    print("START --- build_map_values \t\t", nowtime())
+    values = {'cumulative_deaths': [], 'cumulative_cases': [], 'daily_cases': []}
+    for label in data.regions.map_labels:
+        key = data.regions.region_key(data.regions.uid_of_label(label))
+        mort_cube = get_region_cube(data, 'mortality', key)
+        row = mort_cube.row(key)
+        values['cumulative_deaths'].append(
+            last_day_value(mort_cube, row, 'cumulative_deaths'))
+        cases_cube = get_region_cube(data, 'cases', key)
+        row = cases_cube.row(key)
+        values['cumulative_cases'].append(
+            last_day_value(cases_cube, row, 'cumulative_cases'))
+        values['daily_cases'].append(last_day_value(
+            cases_cube, row, None if row is None
+            else get_region_cases_7day(data, cases_cube, row)))
+    print("END   --- build_map_values \t\t", nowtime())
+    return values
+
+def last_day_value(cube, row, column_or_series):
+    """Value of a cube row (a column, or a [day] array of the row) on the
+    last day of the cube (NaN if the row is None)"""
+    if (row is None) or (cube.ndays == 0):
+        return np.nan
+    if isinstance(column_or_series, str):
+        column_or_series = cube.values[column_or_series][row]
+    return float(column_or_series[-1])
+
+def get_map_data():
+
+    data = current_data()
+
+    #=== The map regions (in the order of the map static data file) and
+    #    their map static data
+    region_list = data.regions.map_labels
+    uids = [data.regions.uid_of_label(label) for label in region_list]
+    map_data = data.regions.table.loc[uids]
+
+    #=== Cumulative deaths on the last day of mortality data, cumulative
+    #    cases and 7-day average cases on the last day of case data
+    map_values = get_map_values(data)
+    cumulative_deaths_data = map_values['cumulative_deaths']
+    cumulative_cases_data = map_values['cumulative_cases']
+    daily_cases_data = map_values['daily_cases']
 
-    df_cases = df_cases2.copy()
-    df_cases['cases'] = df_cases['cases'].rolling(window=7).mean()
-    df_cases = df_cases[df_cases['date_report'] == max(df_cases2["date_report"])]
-    cumulative_cases_data = df_cases.cumulative_cases[df_cases.ENG_LABEL == region_list].tolist()
-    daily_cases_data = df_cases.cases[df_cases.ENG_LABEL == region_list].tolist()
-    
     print("      --- display_choropleth \t\t", nowtime(), "  --- got cases")
 
-    frac80_data = static_data2.frac80[static_data2.ENG_LABEL == region_list].tolist()
+    frac80_data = map_data.map_frac80.tolist()
     frac80_data = [i * 100 for i in frac80_data]
     
-    region_pop_data = static_data2.region_pop[static_data2.ENG_LABEL == region_list].tolist()
+    region_pop_data = map_data.map_region_pop.tolist()
     
-    pwpd_data = static_data2.pwpd[static_data2.ENG_LABEL == region_list].tolist()
+    pwpd_data = map_data.map_pwpd.tolist()
     
-    pop_sparsity_data = static_data2.region_pop[static_data2.ENG_LABEL == region_list].tolist()
+    pop_sparsity_data = map_data.map_region_pop.tolist()
     
     print("      --- display_choropleth \t\t", nowtime(), "  --- got popdata")
 
-    anndeath_data = static_data2.anndeath[static_data2.ENG_LABEL == region_list].tolist()
+    anndeath_data = map_data.map_anndeath.tolist()
     anndeath_data = [i * 1.3 for i in anndeath_data]
     
     cumulative_per_annual_data = [int(c) / int(a) for c,a in zip(cumulative_deaths_data, anndeath_data)]
@@ -3241,7 +3779,7 @@ def get_map_data(region_list):
     daily_cases_per_pop_data = [float(c) / float(r) for c,r in zip(daily_cases_data, region_pop_data)]
     daily_cases_per_100k_data = [i * 100000 for i in daily_cases_per_pop_data]
     
-    avg_per_house_data = static_data2.house[static_data2.ENG_LABEL == region_list].tolist()
+    avg_per_house_data = map_data.map_house.tolist()
 
     print("      --- display_choropleth \t\t", nowtime(), "  --- got demodata")
     
@@ -3274,6 +3812,31 @@ def get_map_data(region_list):
 
 #=================== MAIN PROGRAM =======================
 
+#=== Start loading the map assets in the background if requested
+if preload_map_assets:
+    threading.Thread(target=get_map_assets, daemon=True).start()
+
+#=== Precompute the derived data of the loaded data in the background
+#    (after a reload, warm_up is called on the new data)
+if warm_up_derived_data:
+    threading.Thread(target=warm_up, args=(current_data(),), daemon=True).start()
+
+#=== Watch the data files and reload the data when they change
+if data_reload_interval is not None:
+    data_watcher = FileWatcher(get_data_source_files, data_store.reload,
+                               data_reload_interval)
+    data_watcher.start()
+
+#=== Report the startup (import) time, and the imports that were deferred
+if print_import_report:
+    def print_import_report_lines(lines):
+        for line in lines:
+            print("      --- import_report \t\t", line)
+    app_import_seconds = time.perf_counter() - app_import_start
+    print_import_report_lines(import_report(app_import_seconds))
+    # and again when a deferred module is first used, with its load time
+    report_on_first_use(print_import_report_lines, app_import_seconds)
+
 #=== Start the server
 if __name__ == "__main__":
     app.run_server(debug=True)
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+#
+# Declarative corrections of known problems in the source data.
+#
+# A correction used to be code in a get_hr_* helper, run on every call
+# for the region.  Here each correction is an entry of a table, applied
+# (vectorized) once to the national frame when the data is loaded, so
+# the helpers, the cubes and the series store all see the corrected
+# values.  A new correction is a new entry in the table.
+#
+# An entry is a dict with
+#
+#     'name'          identifier (printed at load, part of the data version)
+#     'key'           {column: value} selecting the region's rows
+#     'set'           {date: value}, values replaced on those dates
+#     'redistribute'  {'amount': a, 'startdate': s, 'enddate': e}, the
+#                     amount a is added to the rows with s <= date <= e
+#                     (s None for the first date), proportional to their
+#                     (corrected) values, or evenly if they sum to 0
+#
+# The rules are applied in that order.  A redistribution makes the value
+# column float.
+#
+import json
+import numpy as np
+import pandas as pd
+
+#=== Corrections of the mortality data (date_death_report, deaths)
+mortality_corrections = [
+    #=== Toronto data dump:
+    #
+    #             date       deaths
+    #          29Sep2020     1
+    #          30Sep2020     2
+    #           1Oct2020     1
+    #           2Oct2020     80
+    #           3Oct2020     37
+    #           4Oct2020     3
+    #           5Oct2020     3
+    #           6Oct2020     2
+    #
+    #    According to these articles:
+    #
+    #     https://www.cbc.ca/news/canada/toronto/
+    #                  covid-19-coronavirus-ontario-october-2-1.5747709
+    #     https://www.cbc.ca/news/canada/toronto/
+    #                  ontario-covid-19-cases-october-3-update-1.5749382
+    #     https://www.cbc.ca/news/canada/toronto/
+    #                  ontario-covid-19-cases-october-4-update-1.5749841
+    #
+    #    The spike was due to a "data review and data cleaning
+    #    initiative" by Toronto Public Health, and the old cases were
+    #    from the "spring or summer" of 2020.  The breakdown was:
+    #
+    #        oct 1: 3 new
+    #        oct 2: 2 new 74 old
+    #        oct 3: 4 new 37 old
+    #        oct 4: 4 new 3 old
+    #
+    #    so reset october 2nd and 3rd values to the new deaths, and
+    #    distribute the remaining 111 deaths over prior days, proportional
+    #    to their existing mortality counts.
+    {'name': 'toronto-2020-10-data-dump',
+     'key': {'health_region': 'Toronto'},
+     'set': {'2020-10-02': 2, '2020-10-03': 4},
+     'redistribute': {'amount': 111.0, 'startdate': None, 'enddate': '2020-10-01'}},
+]
+
+
+def apply_corrections(df, corrections, date_column, value_column):
+    """Apply a table of corrections to a frame (in place).
+
+    Returns {name: number of rows changed} of the corrections that
+    matched rows of the frame.
+    """
+    applied = {}
+    for correction in corrections:
+        in_region = np.ones(len(df), dtype=bool)
+        for col, value in correction['key'].items():
+            in_region &= (df[col] == value).to_numpy()
+        if not in_region.any():
+            continue
+        dates = df[date_column].to_numpy()
+        changed = np.zeros(len(df), dtype=bool)
+        #=== Replace values on given dates
+        for date, value in correction.get('set', {}).items():
+            rows = in_region & (dates == np.datetime64(pd.Timestamp(date)))
+            df.loc[rows, value_column] = value
+            changed |= rows
+        #=== Redistribute an amount over a date range
+        redistribute = correction.get('redistribute')
+        if redistribute is not None:
+            rows = in_region.copy()
+            if redistribute.get('startdate') is not None:
+                rows &= (dates >= np.datetime64(pd.Timestamp(redistribute['startdate'])))
+            rows &= (dates <= np.datetime64(pd.Timestamp(redistribute['enddate'])))
+            if not rows.any():
+                raise ValueError("correction " + correction['name']
+                                 + ": no rows to redistribute the amount over")
+            values = df[value_column].to_numpy(dtype=np.float64, copy=True)
+            total = values[rows].sum()
+            if (total == 0):
+                # nothing to be proportional to: the same share for every row
+                share = np.full(int(rows.sum()), 1.0 / rows.sum())
+            else:
+                share = values[rows] / total
+            values[rows] = values[rows] + redistribute['amount'] * share
+            df[value_column] = values
+            changed |= rows
+        applied[correction['name']] = int(changed.sum())
+    return applied
+
+def corrections_record(corrections):
+    """{name: json text} of a table of corrections (for DataVersions)"""
+    return {correction['name']: json.dumps(correction, sort_keys=True)
+            for correction in corrections}
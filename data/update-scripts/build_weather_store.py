@@ -0,0 +1,19 @@
+# Packs the per-region temperature files used by the dashboard into the
+# single memory-mapped weather store read by the app (see weatherstore.py).
+#
+# Run after the temperature files are regenerated (weather_update_script.sh
+# does this).  The app picks up the new store file on its next weather lookup.
+import os
+import sys
+
+appDir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, appDir)
+
+from weatherstore import build_weather_store
+
+weatherDir = os.path.join(appDir, "data/weather/all_health_regions_actual_avg_temperature_files/2020-01-01_2023-01-01/")
+storeFilePath = os.path.join(appDir, "data/weather/weather_store.bin")
+
+header = build_weather_store(weatherDir, storeFilePath)
+print("wrote " + storeFilePath + ": " + str(len(header['regions'])) + " regions, "
+      + str(header['ndays']) + " days from " + header['first_date'])
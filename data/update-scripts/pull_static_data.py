@@ -11,8 +11,12 @@ def downloadAndCleanFile(url, newFilePath, replaceMappings):
   r = requests.get(url, allow_redirects=True)
   oldFile = r.text
   newFile = replaceMultiple(oldFile, replaceMappings)
-  with open(newFilePath, "w") as writeFile:
+  # write a temporary file and move it into place, so the running app
+  # (which watches these files) never reads a half-written file
+  tmpFilePath = newFilePath + ".tmp"
+  with open(tmpFilePath, "w") as writeFile:
     writeFile.write(newFile)
+  os.replace(tmpFilePath, newFilePath)
 
 mortalityUrl = 'https://raw.githubusercontent.com/ccodwg/Covid19Canada/master/timeseries_hr/mortality_timeseries_hr.csv'
 mortalityFilePath = "/var/www/html/COVIDDashboard/data/mortality.csv"
@@ -31,4 +35,5 @@ replaceMappings = [
 downloadAndCleanFile(mortalityUrl, mortalityFilePath, replaceMappings)
 downloadAndCleanFile(casesUrl, casesFilePath, replaceMappings)
 
-os.system("systemctl restart mylocalcovid")
+# No restart needed: the app notices the new files and reloads its data
+# in the background (see data_reload_interval in app.py)
@@ -3,7 +3,8 @@
 #       the last couple of days, taking into account that the month might change),
 #       and then
 #   (2) re-does the full interpolation and averaging of the raw data to create the
-#       static temperature files used in the dashboard.
+#       static temperature files used in the dashboard, and then
+#   (3) packs those files into the weather store read by the dashboard.
 #
 # The first step takes about 1 minute to run (on Ben's computer), and the second
 # step takes about 6 minutes to run.
@@ -16,4 +17,5 @@
 cd ../weather
 
 $(which python3) get_actual_avg_weather_all_health_regions.py update_raw_data_two_months && \
-    $(which python3) get_actual_avg_weather_all_health_regions.py create_actual_avg_all 
+    $(which python3) get_actual_avg_weather_all_health_regions.py create_actual_avg_all && \
+    $(which python3) ../update-scripts/build_weather_store.py
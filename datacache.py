@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+#
+# Binary snapshots of the CSV files that are read when the app starts.
+#
+# Every gunicorn worker that imports app.py used to re-parse the
+# mortality, cases, mobility and trends CSV files (and re-run
+# pd.to_datetime on their date columns).  Here each parsed frame is
+# written once to a typed, column-per-array numpy archive (.npz) in
+# snapshot_dir, and later starts just load those arrays.
+#
+#   * numeric and datetime columns are stored as-is
+#   * string (and categorical) columns are stored as integer codes + a
+#     table of categories
+#   * a small json sidecar records the size, mtime and sha1 of the
+#     source CSV, so the snapshot is rebuilt whenever the CSV changes
+#
+# If the snapshot is missing, stale or unreadable we fall back to the
+# CSV (and try to write a fresh snapshot for the next start).
+#
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+
+#=== Where snapshots are written (relative to the app directory)
+snapshot_dir = 'data/snapshots'
+#=== Bump this if the layout of the .npz files changes
+snapshot_format_version = 1
+#=== Also compare the sha1 of the CSV (not just size and mtime).
+#    Costs one read of the raw file, which is still much cheaper than
+#    parsing it, and lets a "touched" but unchanged CSV keep its snapshot.
+snapshot_verify_hash = True
+
+
+def read_csv_snapshot(filename, date_columns=None, encoding=None,
+                      use_snapshot=True):
+    """Load a CSV as a DataFrame, going through a binary snapshot if possible.
+
+    date_columns is a dict {column: strftime format} of columns that are
+    converted with pd.to_datetime after reading the CSV.
+    """
+    if date_columns is None:
+        date_columns = {}
+    if not use_snapshot:
+        return _read_csv(filename, date_columns, encoding)
+    snapshot_file, meta_file = get_snapshot_filenames(filename)
+    source_info = _get_source_info(filename)
+    #=== Try the snapshot first
+    meta = _read_meta(meta_file)
+    if _meta_matches_source(meta, filename, source_info, date_columns):
+        try:
+            df = _load_npz(snapshot_file)
+            if (meta.get('mtime_ns') != source_info['mtime_ns']):
+                # same contents, newer mtime: just refresh the sidecar
+                _write_meta(meta_file, filename, source_info, date_columns)
+            return df
+        except Exception as err:
+            print("      --- read_csv_snapshot \t\tbad snapshot for "
+                  + filename + " (" + str(err) + "), re-reading csv")
+    #=== Otherwise read the CSV and (re)write the snapshot
+    df = _read_csv(filename, date_columns, encoding)
+    write_snapshot(df, filename, date_columns, source_info)
+    return df
+
+def write_snapshot(df, filename, date_columns, source_info=None):
+    """Write the snapshot (and sidecar) of an already parsed CSV file"""
+    snapshot_file, meta_file = get_snapshot_filenames(filename)
+    if source_info is None:
+        source_info = _get_source_info(filename)
+    try:
+        if not write_frame_npz(df, snapshot_file):
+            print("      --- write_snapshot \t\tcannot snapshot " + filename
+                  + " (non-string object column)")
+            return False
+        _write_meta(meta_file, filename, source_info, date_columns)
+    except OSError as err:
+        print("      --- write_snapshot \t\tcould not write snapshot for "
+              + filename + " (" + str(err) + ")")
+        return False
+    return True
+
+def write_frame_npz(df, npz_file):
+    """Write a DataFrame as typed arrays to an .npz file.
+
+    Returns False if the frame has object columns that are not strings.
+    The file is written under a temporary name and moved into place, so
+    that readers never see a half-written file.
+    """
+    arrays = _frame_to_arrays(df)
+    if arrays is None:
+        return False
+    dirname = os.path.dirname(npz_file)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+    tmp_file = npz_file + ".tmp." + str(os.getpid())
+    with open(tmp_file, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_file, npz_file)
+    return True
+
+def read_frame_npz(npz_file):
+    """Read a DataFrame written by write_frame_npz"""
+    return _load_npz(npz_file)
+
+def get_snapshot_filenames(filename):
+    """Return the (snapshot, sidecar) file names for a CSV file"""
+    base = os.path.splitext(os.path.basename(filename))[0]
+    snapshot_file = os.path.join(snapshot_dir, base + '.npz')
+    meta_file = os.path.join(snapshot_dir, base + '.meta.json')
+    return snapshot_file, meta_file
+
+def file_sha1(filename, blocksize=1 << 20):
+    """sha1 hex digest of a file's contents"""
+    h = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(blocksize), b''):
+            h.update(block)
+    return h.hexdigest()
+
+#--- helpers
+
+def _read_csv(filename, date_columns, encoding):
+    if encoding is None:
+        df = pd.read_csv(filename)
+    else:
+        df = pd.read_csv(filename, encoding=encoding)
+    for col, fmt in date_columns.items():
+        df[col] = pd.to_datetime(df[col], format=fmt)
+    return df
+
+def _get_source_info(filename):
+    st = os.stat(filename)
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha1': None}
+
+def _read_meta(meta_file):
+    try:
+        with open(meta_file, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_meta(meta_file, filename, source_info, date_columns):
+    if source_info['sha1'] is None:
+        source_info['sha1'] = file_sha1(filename)
+    meta = {
+        'format_version': snapshot_format_version,
+        'source': os.path.basename(filename),
+        'size': source_info['size'],
+        'mtime_ns': source_info['mtime_ns'],
+        'sha1': source_info['sha1'],
+        'date_columns': date_columns,
+    }
+    tmp_file = meta_file + ".tmp." + str(os.getpid())
+    with open(tmp_file, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_file, meta_file)
+
+def _meta_matches_source(meta, filename, source_info, date_columns):
+    if meta is None:
+        return False
+    if ( (meta.get('format_version') != snapshot_format_version)
+         or (meta.get('date_columns') != date_columns)
+         or (meta.get('size') != source_info['size']) ):
+        return False
+    if (meta.get('mtime_ns') == source_info['mtime_ns']) and not snapshot_verify_hash:
+        return True
+    # mtime changed (or we always check): compare the contents
+    source_info['sha1'] = file_sha1(filename)
+    return (meta.get('sha1') == source_info['sha1'])
+
+def _frame_to_arrays(df):
+    """Split a DataFrame into typed numpy arrays (no pickled objects)"""
+    arrays = {}
+    kinds = []
+    for i, col in enumerate(df.columns):
+        values = df[col]
+        key = 'c' + str(i)
+        if pd.api.types.is_string_dtype(values.dtype) \
+           or isinstance(values.dtype, pd.api.types.CategoricalDtype):
+            notnull = values[values.notnull()]
+            if not all(isinstance(v, str) for v in notnull):
+                return None
+            cat = pd.Categorical(values)
+            arrays[key + '_codes'] = np.asarray(cat.codes, dtype=np.int32)
+            arrays[key + '_categories'] = \
+                np.asarray(cat.categories.to_list(), dtype=str)
+            kinds.append('string')
+        else:
+            arrays[key + '_values'] = values.to_numpy()
+            kinds.append('values')
+    meta = {'columns': [str(c) for c in df.columns], 'kinds': kinds}
+    arrays['meta'] = np.array(json.dumps(meta))
+    return arrays
+
+def _load_npz(snapshot_file):
+    data = {}
+    with np.load(snapshot_file, allow_pickle=False) as npz:
+        meta = json.loads(str(npz['meta']))
+        for i, (col, kind) in enumerate(zip(meta['columns'], meta['kinds'])):
+            key = 'c' + str(i)
+            if (kind == 'string'):
+                cat = pd.Categorical.from_codes(
+                    npz[key + '_codes'],
+                    npz[key + '_categories'].astype(object))
+                data[col] = np.asarray(cat, dtype=object)
+            else:
+                data[col] = npz[key + '_values']
+    return pd.DataFrame(data, columns=meta['columns'])
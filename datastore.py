@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+#
+# The data read by the callbacks, held as one immutable snapshot that
+# can be replaced while the app is running.
+#
+# pull_static_data.py used to restart the service after downloading new
+# mortality/case files, which dropped in-flight requests and put every
+# worker through a cold start.  Instead, all the frames and the
+# structures built on them (encodings, indexes, cubes, dates) are loaded
+# into a DataSnapshot, and a SnapshotStore holds the current one.  A
+# reload builds a complete new snapshot (in a background thread) and
+# then swaps it in with a single assignment, so a caller that takes the
+# snapshot once with store.current() sees either the old data or the
+# new data, never a mix of the two.
+#
+# Results derived from a snapshot (e.g. series precomputed for every
+# region) are kept with it by snapshot.derived(), so they are computed
+# once per load and dropped with the snapshot (after a reload, they can
+# be updated from those of the previous snapshot, see derivation.py).
+#
+# A FileWatcher thread polls the size and mtime of the source files and
+# triggers a reload when any of them change.  A FileCache keeps values
+# computed from files (e.g. the weather of a region) until the files
+# change.
+#
+import os
+import time
+import datetime
+import threading
+
+
+class DataSnapshot(object):
+    """Read-only bundle of loaded data, given as keyword arguments.
+
+    The attributes cannot be reassigned.  The frames and arrays they
+    refer to are shared by all requests, so they must not be modified
+    in place either (the get_hr_* helpers return copies).
+    """
+
+    def __init__(self, **data):
+        for name, value in data.items():
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, 'loaded_at', datetime.datetime.now())
+        object.__setattr__(self, '_derived', {})
+        object.__setattr__(self, '_derived_lock', threading.RLock())
+
+    def derived(self, name, build):
+        """The value derived from this snapshot by build(snapshot), built
+        on first use (once, thread-safe) and then kept with the snapshot"""
+        try:
+            return self._derived[name]
+        except KeyError:
+            pass
+        with self._derived_lock:
+            if name not in self._derived:
+                self._derived[name] = build(self)
+            return self._derived[name]
+
+    def built(self, name):
+        """The derived value name if it has been built (else None)"""
+        return self._derived.get(name)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("DataSnapshot is read-only")
+
+    def __delattr__(self, name):
+        raise AttributeError("DataSnapshot is read-only")
+
+
+class SnapshotStore(object):
+    """Holds the current DataSnapshot and replaces it on reload.
+
+    loader is a function returning a new DataSnapshot; it is called once
+    here and again by every reload.  on_swap (optional) is called with
+    the new snapshot and the one it replaced, right after the swap.
+    """
+
+    def __init__(self, loader, on_swap=None):
+        self._loader = loader
+        self._on_swap = on_swap
+        self._reload_lock = threading.Lock()
+        self._snapshot = loader()
+        self.generation = 1
+
+    def current(self):
+        return self._snapshot
+
+    def reload(self):
+        """Load a new snapshot and swap it in.
+
+        Returns False (and keeps the current snapshot) if the load fails
+        or if another reload is already running.
+        """
+        if not self._reload_lock.acquire(False):
+            return False
+        try:
+            print("START --- SnapshotStore.reload \t\t", time.ctime())
+            try:
+                snapshot = self._loader()
+            except Exception as err:
+                print("      --- SnapshotStore.reload \t\tload failed ("
+                      + str(err) + "), keeping current data")
+                return False
+            previous = self._snapshot
+            self._snapshot = snapshot
+            self.generation += 1
+            if self._on_swap is not None:
+                # (the new snapshot is already in use: a failure here must
+                #  not end the thread that called reload, e.g. a FileWatcher)
+                try:
+                    self._on_swap(snapshot, previous)
+                except Exception as err:
+                    print("      --- SnapshotStore.reload \t\ton_swap failed ("
+                          + str(err) + ")")
+            print("END   --- SnapshotStore.reload \t\t", time.ctime())
+            return True
+        finally:
+            self._reload_lock.release()
+
+    def reload_in_background(self):
+        """Start reload() in a daemon thread and return the thread"""
+        thread = threading.Thread(target=self.reload, name='data-reload')
+        thread.daemon = True
+        thread.start()
+        return thread
+
+
+class FileWatcher(threading.Thread):
+    """Daemon thread calling callback() when any of the files change.
+
+    The files are checked every interval seconds.  A change counts as
+    handled only if callback() returns True, otherwise it is retried at
+    the next check (e.g. if a file was still being written and could
+    not be parsed).  filenames is a list, or a function returning the
+    list, called at each check (so that files added to a directory are
+    seen).
+    """
+
+    def __init__(self, filenames, callback, interval=60):
+        threading.Thread.__init__(self, name='data-file-watcher')
+        self.daemon = True
+        self.filenames = filenames if callable(filenames) else list(filenames)
+        self.callback = callback
+        self.interval = interval
+        self._signature = file_signature(self._filenames())
+        self._stop_event = threading.Event()
+
+    def _filenames(self):
+        return self.filenames() if callable(self.filenames) else self.filenames
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            signature = file_signature(self._filenames())
+            if (signature != self._signature) and self.callback():
+                self._signature = signature
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class FileCache(object):
+    """Per-process cache of values computed from files.
+
+    An entry is rebuilt when the signature (size, mtime) of one of its
+    files has changed since it was built.  Values are shared by all
+    callers, so they must not be modified.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, filenames, build):
+        """The value of key, built by build() if missing or out of date"""
+        signature = file_signature(filenames)
+        entry = self._entries.get(key)
+        if (entry is not None) and (entry[0] == signature):
+            return entry[1]
+        value = build()
+        with self._lock:
+            self._entries[key] = (signature, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def file_signature(filenames):
+    """Tuple of (size, mtime_ns) of each file (None for a missing file)"""
+    signature = []
+    for filename in filenames:
+        try:
+            st = os.stat(filename)
+            signature.append((st.st_size, st.st_mtime_ns))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
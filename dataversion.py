@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+#
+# Fingerprints of the loaded data, to tell what a reload changed.
+#
+# A DataVersions registry is filled when the data is loaded (or
+# reloaded) and holds, for every dataset, a fingerprint of each
+# region's rows and one of the whole dataset.  Comparing the registries
+# of two loads gives the regions whose data changed, so that the data
+# derived from a snapshot is only recomputed for those (see
+# derivation.py).
+#
+# Fingerprints are short hex strings (truncated sha1).  A region's
+# fingerprint is computed from pandas row hashes of its date-sorted rows,
+# a file's from the file contents.  The row hashes and dates are kept,
+# so that changes() can tell, after a reload, which regions changed and
+# from which date (see derivation.py).
+#
+import hashlib
+import numpy as np
+import pandas as pd
+from datacache import file_sha1
+
+fingerprint_length = 16
+
+
+class DataVersions(object):
+    """Registry of dataset and per-region fingerprints.
+
+    Region keys are those of the dataset (e.g. (province, health_region)
+    for mortality, a sub-region name for mobility).
+    """
+
+    def __init__(self):
+        self._datasets = {}
+        self._regions = {}
+        # name -> {region key: (dates, row hashes)} (datasets with dated rows)
+        self._rows = {}
+
+    def datasets(self):
+        return sorted(self._datasets)
+
+    def dataset(self, name):
+        """Fingerprint of a whole dataset (None if not registered)"""
+        return self._datasets.get(name)
+
+    def region(self, name, key):
+        """Fingerprint of one region of a dataset (None if it has no data)"""
+        return self._regions.get(name, {}).get(key)
+
+    def changes(self, name, previous):
+        """Regions of a dataset whose data differs from previous (the
+        DataVersions of an earlier load).
+
+        Returns {region key: first date (Timestamp) whose rows differ},
+        with None as the date when it is not known (a region that was
+        added or removed, a dataset without dated rows).  Returns None if
+        the dataset is not in previous (everything has to be redone).
+        """
+        if (previous is None) or (previous.dataset(name) is None):
+            return None
+        if (self.dataset(name) == previous.dataset(name)):
+            return {}
+        regions = self._regions.get(name, {})
+        previous_regions = previous._regions.get(name, {})
+        rows = self._rows.get(name, {})
+        previous_rows = previous._rows.get(name, {})
+        changed = {}
+        for key in set(regions) | set(previous_regions):
+            if (regions.get(key) != previous_regions.get(key)):
+                changed[key] = _first_difference(rows.get(key), previous_rows.get(key))
+        return changed
+
+    #--- registering datasets
+
+    def add_index(self, name, region_index, columns=None):
+        """Register a dataset from a RegionIndex.
+
+        The given columns (by default all but the key columns) of each
+        region's rows are hashed.
+        """
+        if columns is None:
+            keys = [region_index.keys] if isinstance(region_index.keys, str) \
+                else list(region_index.keys)
+            columns = [c for c in region_index.df.columns if c not in keys]
+        row_hashes = pd.util.hash_pandas_object(region_index.df[columns],
+                                                index=False).to_numpy()
+        dates = region_index.df[region_index.date_column].to_numpy() \
+            if region_index.date_column is not None else None
+        regions = {}
+        rows = {}
+        for key in region_index.region_keys():
+            region_rows = region_index.rows(key)
+            regions[key] = _hash_bytes(row_hashes[region_rows].tobytes())
+            if dates is not None:
+                rows[key] = (dates[region_rows], row_hashes[region_rows])
+        self._set(name, regions, rows)
+
+    def add_columns(self, name, df, date_column):
+        """Register a wide dataset with one region per column (e.g. trends)"""
+        date_hashes = pd.util.hash_pandas_object(df[date_column], index=False).to_numpy()
+        dates = df[date_column].to_numpy()
+        regions = {}
+        rows = {}
+        for col in df.columns:
+            if (col == date_column):
+                continue
+            col_hashes = pd.util.hash_pandas_object(df[col], index=False).to_numpy()
+            regions[col] = _hash_bytes(date_hashes.tobytes() + col_hashes.tobytes())
+            rows[col] = (dates, col_hashes)
+        self._set(name, regions, rows)
+
+    def add_table(self, name, df):
+        """Register a dataset with one region per row, keyed by the index
+        (e.g. the static data, by hr_uid)"""
+        row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        self._set(name, {key: _hash_bytes(row_hashes[i:i + 1].tobytes())
+                         for i, key in enumerate(df.index)})
+
+    def add_files(self, name, filenames):
+        """Register a dataset with one file per region ({key: filename})"""
+        self._set(name, {key: file_sha1(filename)[:fingerprint_length]
+                         for key, filename in filenames.items()})
+
+    def add_fingerprints(self, name, fingerprints):
+        """Register a dataset from fingerprints computed elsewhere ({key:
+        fingerprint}, e.g. those of the series store).  Without the rows,
+        changes() gives no dates for the changed regions."""
+        self._set(name, {key: str(fingerprint)
+                         for key, fingerprint in fingerprints.items()})
+
+    def add_records(self, name, records):
+        """Register a dataset of text records ({key: text}, e.g. the
+        corrections applied to the data)"""
+        self._set(name, {key: _hash_bytes(text.encode('utf-8'))
+                         for key, text in records.items()})
+
+    def _set(self, name, regions, rows=None):
+        self._regions[name] = regions
+        self._rows[name] = rows or {}
+        h = hashlib.sha1()
+        for key in sorted(regions, key=str):
+            h.update((str(key) + '=' + regions[key] + ';').encode('utf-8'))
+        self._datasets[name] = h.hexdigest()[:fingerprint_length]
+
+
+def _first_difference(rows, previous_rows):
+    """First date at which two (dates, row hashes) differ (None if one of
+    them is missing)"""
+    if (rows is None) or (previous_rows is None):
+        return None
+    dates, hashes = rows
+    previous_dates, previous_hashes = previous_rows
+    n = min(len(dates), len(previous_dates))
+    differ = (dates[:n] != previous_dates[:n]) | (hashes[:n] != previous_hashes[:n])
+    if differ.any():
+        i = int(np.argmax(differ))
+        return pd.Timestamp(min(dates[i], previous_dates[i]))
+    # one is the other with rows added (or removed) at the end
+    if (len(dates) > n):
+        return pd.Timestamp(dates[n])
+    if (len(previous_dates) > n):
+        return pd.Timestamp(previous_dates[n])
+    return None
+
+def _hash_bytes(data):
+    return hashlib.sha1(data).hexdigest()[:fingerprint_length]
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+#
+# Date-window selection on date-sorted frames by binary search.
+#
+# Selecting a window with df[df.date.between(a, b)] compares every row
+# of the frame (after converting a and b to timestamps) and then copies
+# the selected rows.  The per-region frames of the app (mortality, cases,
+# mobility, trends, weather, vaccination and the forecasts built from
+# them) are all sorted by date, so a window is a contiguous block of
+# rows: its ends are found with np.searchsorted on the int64 view of the
+# date column, and the rows are returned as an iloc slice, without a copy.
+#
+# Same inclusive bounds as Series.between.  The frame MUST be sorted by
+# the date column.
+#
+import numpy as np
+import pandas as pd
+
+
+def date_bounds(dates, startdate, enddate):
+    """(start, stop) positions of [startdate, enddate] in a sorted date array"""
+    dates = np.asarray(dates)
+    if (dates.dtype.kind != 'M'):
+        dates = dates.astype('datetime64[ns]')
+    bounds = np.array([pd.Timestamp(startdate).to_datetime64(),
+                       pd.Timestamp(enddate).to_datetime64()]).astype(dates.dtype)
+    days = dates.view(np.int64)
+    bounds = bounds.view(np.int64)
+    start = int(np.searchsorted(days, bounds[0], 'left'))
+    stop = int(np.searchsorted(days, bounds[1], 'right'))
+    return start, max(start, stop)
+
+def rows_between(df, date_column, startdate, enddate):
+    """Rows of df with startdate <= date <= enddate (an iloc slice of df)"""
+    start, stop = date_bounds(df[date_column].to_numpy(), startdate, enddate)
+    return df.iloc[start:stop]
+
+def rows_on(df, date_column, date):
+    """Rows of df on a date (an iloc slice of df)"""
+    return rows_between(df, date_column, date, date)
+
+def values_on(df, date_column, value_column, dates, missing=None):
+    """Values of value_column on each of the dates (from the first row on
+    the date), as a float array.
+
+    A date without rows gets the value missing, or raises IndexError if
+    missing is None (as rows_on(...)[value_column].to_list()[0] does).
+    """
+    days = _ns_dates(df[date_column].to_numpy())
+    wanted = _ns_dates(dates)
+    pos = np.searchsorted(days, wanted, 'left')
+    found = pos < len(days)
+    found[found] = (days[pos[found]] == wanted[found])
+    if (missing is None) and not found.all():
+        raise IndexError("no " + value_column + " value on "
+                         + str(pd.Timestamp(wanted[~found][0])))
+    values = np.full(len(wanted), np.nan if (missing is None) else missing)
+    values[found] = df[value_column].to_numpy(dtype=np.float64)[pos[found]]
+    return values
+
+def _ns_dates(dates):
+    """int64 nanoseconds of an array of dates"""
+    return np.asarray(dates).astype('datetime64[ns]').view(np.int64)
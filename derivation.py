@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+#
+# Incremental rebuild of the derived data after a reload.
+#
+# A refresh of the source files usually changes the last few days of
+# some of the regions only, but the data derived from a snapshot (the
+# R(t) and 7-day average arrays, the finished series of every region)
+# was built again from scratch for the new snapshot.  Here the derived
+# data of the new snapshot is built from that of the previous one:
+#
+#   * the changes of each dataset come from the DataVersions of the two
+#     snapshots (per-region fingerprints, and the first date whose row
+#     hashes differ, see dataversion.py);
+#
+#   * a CubeDerivation is a [region, day] array computed region by region
+#     from a RegionCube with windows of bounded length: the rows of the
+#     unchanged regions are copied, and a changed region is recomputed
+#     from its first changed day only (its values before are copied);
+#
+#   * a per-region result (a finished series, a cached object) is kept
+#     for the regions whose data did not change (unchanged_series,
+#     carry_over).
+#
+# Everything is rebuilt from scratch if there is no previous snapshot,
+# if the previous one had not built the value, or if the changes are not
+# known.
+#
+import numpy as np
+
+
+class CubeDerivation(object):
+    """A [region, day] array derived from a RegionCube of the snapshot.
+
+    compute(cube, rows, start) returns the derived values of the cube
+    rows `rows` (an array of row numbers) on the days start..end of the
+    cube.  It must read the cube values from day start - lookback on
+    only, and a change of the values on day c must leave the derived
+    values before day c - lookahead unchanged.  dataset is the name of
+    the cube's data in the DataVersions.
+    """
+
+    def __init__(self, cube_name, dataset, compute, lookback, lookahead=0):
+        self.cube_name = cube_name
+        self.dataset = dataset
+        self.compute = compute
+        self.lookback = lookback
+        self.lookahead = lookahead
+
+    def build(self, data):
+        """The array for all regions of a snapshot"""
+        cube = getattr(data, self.cube_name)
+        return _read_only(self.compute(cube, np.arange(len(cube.region_keys)), 0))
+
+    def update(self, data, previous_data, previous):
+        """The array of a snapshot, from the array previous built for the
+        snapshot previous_data (build() if that cannot be done)"""
+        cube = getattr(data, self.cube_name)
+        previous_cube = getattr(previous_data, self.cube_name)
+        changes = data.data_versions.changes(self.dataset,
+                                             previous_data.data_versions)
+        if (changes is None) or (cube.first_date != previous_cube.first_date) \
+           or (cube.ndays < previous_cube.ndays):
+            return self.build(data)
+        #=== Day from which each region is recomputed (ndays: not at all)
+        start = np.full(len(cube.region_keys), cube.ndays, dtype=np.int64)
+        # new days at the end of the cube are a change of every region
+        if (cube.ndays > previous_cube.ndays):
+            start[:] = previous_cube.ndays
+        values = np.full((len(cube.region_keys), cube.ndays), np.nan)
+        for row, key in enumerate(cube.region_keys):
+            previous_row = previous_cube.row(key)
+            if previous_row is None:
+                start[row] = 0
+                continue
+            if key in changes:
+                date = changes[key]
+                start[row] = 0 if (date is None) else min(start[row], cube.day(date))
+            if (start[row] < cube.ndays):
+                start[row] = max(start[row] - self.lookahead, 0)
+            values[row, :start[row]] = previous[previous_row, :start[row]]
+        #=== Recompute the regions in groups with the same start day
+        for day in np.unique(start):
+            if (day >= cube.ndays):
+                continue
+            rows = np.flatnonzero(start == day)
+            values[rows, day:] = self.compute(cube, rows, int(day))
+        return _read_only(values)
+
+
+def derive(data, name, derivation, previous_data=None):
+    """The array of a CubeDerivation for a snapshot, updated from the one
+    of previous_data (kept there as derived value name) if it was built"""
+    previous = None if (previous_data is None) else previous_data.built(name)
+    if previous is None:
+        return derivation.build(data)
+    return derivation.update(data, previous_data, previous)
+
+def carry_over(previous, changes, region_key):
+    """The entries of a dict of per-region results of the previous
+    snapshot whose region (region_key(entry key)) did not change ({} if
+    the changes are not known)"""
+    if (previous is None) or (changes is None):
+        return {}
+    # (a copy of the items: requests may still be adding entries)
+    return {key: value for key, value in list(previous.items())
+            if region_key(key) not in changes}
+
+def unchanged_series(data, previous_data, name, dataset_of, depends_on=()):
+    """{key: frame} of the regions of the RegionSeries kept as derived
+    value name of previous_data whose data did not change.
+
+    dataset_of(key) is the (dataset, region key) of the data of a key.
+    Nothing is kept if one of the datasets depends_on changed at all.
+    """
+    series = None if (previous_data is None) else previous_data.built(name)
+    if series is None:
+        return {}
+    versions = data.data_versions
+    previous_versions = previous_data.data_versions
+    for dataset in depends_on:
+        if (versions.changes(dataset, previous_versions) != {}):
+            return {}
+    changes = {}
+    frames = {}
+    for key in series.keys():
+        dataset, region_key = dataset_of(key)
+        if dataset not in changes:
+            changes[dataset] = versions.changes(dataset, previous_versions)
+        if (changes[dataset] is not None) and (region_key not in changes[dataset]):
+            frames[key] = series.frame(key)
+    return frames
+
+def _read_only(values):
+    values.setflags(write=False)
+    return values
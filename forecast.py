@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+#
+# The death recursion of the mortality forecast.
+#
+# get_forecasted_mortality (app.py) computes the drivers of every
+# forecast day (mobility, temperature, facemask trends, vaccination) as
+# arrays before the simulation.  What is left depends on the simulated
+# deaths themselves: the herd terms (COVID deaths so far, and before two
+# months ago, over the annual deaths) and the width of the random error
+# (deaths of the past two weeks).  simulate_deaths runs that recursion
+# one day at a time, keeping a running total of the deaths before each
+# day instead of summing the frame again on every day.
+#
+import math
+import numpy as np
+
+
+def simulate_deaths(deaths, start_index, growth_without_mortality_effect,
+                    inv_tauI, vax_rate_term, lambda_errors, annual_death,
+                    C_deathA, C_deathB):
+    """Deaths and growth rates (lambda) of a forecast.
+
+    deaths is the daily deaths of one row per day, up to the forecast
+    start (row start_index, the initial value); days without data are
+    NaN and count as zero in the sums.  The other arrays have one value
+    per forecast day (the rows after start_index): the growth before the
+    mortality effect, the vaccination rate term and the standard random
+    error of lambda.  Returns (deaths, lambdas), arrays over all rows
+    (lambda is 0 before the forecast).
+    """
+    deaths = np.array(deaths, dtype=np.float64)
+    lambdas = np.zeros(len(deaths))
+    #=== Total deaths before each row, filled in as the forecast goes
+    deaths_before = np.zeros(len(deaths) + 1)
+    deaths_before[1:start_index + 2] = np.cumsum(np.nan_to_num(deaths[:start_index + 1]))
+    for j, index in enumerate(range(start_index + 1, len(deaths))):
+        #=== xHerd is Total Covid Death/Annual Death
+        xHerd = deaths_before[index] / annual_death
+        #=== xHerd2 is the total deaths prior to two-months-ago (60 days)
+        xHerd2 = deaths_before[max(index - 60, 0)] / annual_death
+        covid_death_frac_past_two_months = xHerd - xHerd2
+        covid_death_frac_prior_to_two_months_ago = xHerd2
+        sqrt_mortality_effect = \
+            math.exp(0.5 * (C_deathA * covid_death_frac_past_two_months
+                            + C_deathB * covid_death_frac_prior_to_two_months_ago))
+        #=== Calculate the growth rate (lambda) as:
+        #
+        #     lambda = sqrt(k PWD_80 unvax_frac)
+        #               + lambda0
+        #               + C_vaxrate * [vax2wk - vax4wk]
+        #               + C_AD * [log10(AD) - 3.65 ]
+        #               + C_HN * [N_household - 2.7]
+        #
+        lambda_val = (
+            growth_without_mortality_effect[j] * sqrt_mortality_effect
+            - inv_tauI
+            + vax_rate_term[j]
+        )
+        #=== Apply a Gaussian random error to lambda value
+        # Past two weeks of death are those since two weeks ago
+        #        (future values are zero)
+        deaths_past_two_weeks = deaths_before[index] - deaths_before[max(index - 13, 0)]
+        sigma = math.sqrt(0.093 / (14.0 + deaths_past_two_weeks))
+        lambda_val += sigma*lambda_errors[j]
+
+        #=== Save lambda value
+        lambdas[index] = lambda_val
+
+        #=== Calculate the new death value
+        deaths[index] = math.exp(lambda_val) * deaths[index-1]
+        deaths_before[index + 1] = deaths_before[index] \
+            + (0.0 if math.isnan(deaths[index]) else deaths[index])
+    return deaths, lambdas
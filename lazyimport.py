@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+#
+# Deferred imports of heavy modules, and a report of import times.
+#
+# Every gunicorn worker imports app.py, and with it modules that only a
+# few callbacks use (plotly.express for two figures, urllib.request for
+# the vaccination download, ...).  lazy_import() returns a stand-in
+# for such a module that imports it on first attribute access, so the
+# cost is paid by the first request that needs it instead of at worker
+# startup.  The time taken by each (deferred or eager) import is
+# recorded, and import_report() lists them: the load time of a deferred
+# module is the startup time saved by deferring it.  That time is only
+# known once the module is used, so report_on_first_use() has the report
+# printed again each time a deferred module is loaded.
+#
+import time
+import importlib
+import threading
+
+#=== name -> [deferred (bool), seconds to import (None if not loaded yet)]
+import_times = {}
+_lock = threading.Lock()
+#=== (print_lines, startup_seconds) set by report_on_first_use
+_first_use_report = None
+
+
+class LazyModule(object):
+    """Stand-in for a module, imported on first attribute access"""
+
+    def __init__(self, name):
+        object.__setattr__(self, '_lazy_name', name)
+        object.__setattr__(self, '_lazy_module', None)
+
+    def _load(self):
+        module = self._lazy_module
+        if module is None:
+            with _lock:
+                module = self._lazy_module
+                if module is None:
+                    module = _import(self._lazy_name, True)
+                    object.__setattr__(self, '_lazy_module', module)
+                    loaded = True
+                else:
+                    loaded = False
+            if loaded and (_first_use_report is not None):
+                print_lines, startup_seconds = _first_use_report
+                print_lines(import_report(startup_seconds))
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = "loaded" if (self._lazy_module is not None) else "not loaded"
+        return "<lazy module '" + self._lazy_name + "' (" + state + ")>"
+
+
+def lazy_import(name, defer=True):
+    """The module (a LazyModule if defer, else imported now and timed)"""
+    if defer:
+        with _lock:
+            import_times.setdefault(name, [True, None])
+        return LazyModule(name)
+    return _import(name, False)
+
+def import_report(startup_seconds=None):
+    """Lines of text listing the recorded import times"""
+    lines = []
+    if startup_seconds is not None:
+        lines.append("startup (import of the app): %.3f s" % startup_seconds)
+    saved = 0.0
+    for name in sorted(import_times):
+        deferred, seconds = import_times[name]
+        if seconds is None:
+            lines.append("  %-28s deferred, not loaded yet" % name)
+        elif deferred:
+            saved += seconds
+            lines.append("  %-28s deferred, loaded on first use in %.3f s" % (name, seconds))
+        else:
+            lines.append("  %-28s imported at startup in %.3f s" % (name, seconds))
+    lines.append("startup time saved by the deferred imports loaded so far: %.3f s" % saved)
+    if any(seconds is None for deferred, seconds in import_times.values()):
+        lines.append("(the time saved by a deferred import is known on its first use)")
+    return lines
+
+def report_on_first_use(print_lines, startup_seconds=None):
+    """Call print_lines(import_report(startup_seconds)) each time a
+    deferred module is loaded"""
+    global _first_use_report
+    _first_use_report = (print_lines, startup_seconds)
+
+#--- helpers
+
+def _import(name, deferred):
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    import_times[name] = [deferred, time.perf_counter() - start]
+    return module
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+#
+# Log-smoothed mortality of a region, for all forecast start dates.
+#
+# The initial value of a forecast simulation is the "log-smoothed"
+# mortality on the forecast start date:
+#
+#     exp( centered 15-day mean of log(7-day mean of deaths) )
+#
+# (with zero-death days left out of the log), computed on the mortality
+# up to the start date.  Because of the centered mean, the value on the
+# start date itself is never defined, and the last defined value (7
+# days earlier, or before if there were zero-death days) is used, and
+# the forecast start date is moved back to its date.
+#
+# Both rolling means are computed in one forward pass over the days, so
+# the values up to 7 days before a start date are the same whether the
+# series is cut at the start date or not.  A LogSmoothedMortality is
+# therefore computed once on a region's whole mortality series, and the
+# value and date for any start date are array lookups.  Only the gaps
+# (zero-death days) of the series cut at a start date, filled by a
+# polynomial interpolation over all its points, depend on the cut; the
+# interpolated frame is built on request (it is only plotted).
+#
+import numpy as np
+import pandas as pd
+from rolling import trailing_mean, centered_mean
+
+#=== Windows (days) of the rolling means
+logsmooth_deaths_window = 7
+logsmooth_log_window = 15
+#=== A quadratic interpolation needs at least 3 points
+logsmooth_interpolation_order = 2
+
+
+class LogSmoothedMortality(object):
+    """Log-smoothed mortality of one region's date-sorted deaths series"""
+
+    def __init__(self, dates, deaths):
+        self.dates = pd.DatetimeIndex(dates)
+        rolling_deaths = trailing_mean(np.asarray(deaths, dtype=np.float64),
+                                       logsmooth_deaths_window)
+        # no data from zero-mortality days
+        with np.errstate(divide='ignore', invalid='ignore'):
+            logdeaths = np.where(rolling_deaths == 0.0, np.nan, np.log(rolling_deaths))
+        self.logdeaths = centered_mean(logdeaths, logsmooth_log_window)
+        #=== Number of defined values, and position of the last one, up to
+        #    each position
+        valid = ~np.isnan(self.logdeaths)
+        self._valid_count = np.cumsum(valid)
+        self._last_valid = np.maximum.accumulate(
+            np.where(valid, np.arange(len(valid)), -1))
+        self._day_of = {date: i for i, date in enumerate(self.dates)}
+
+    def initial_value(self, the_date):
+        """(value, date string) of the last defined log-smoothed value of
+        the series cut at the_date (None if there is none)"""
+        last = self._last_defined(the_date)
+        if last is None:
+            return None
+        return (float(np.exp(self.logdeaths[last])),
+                self.dates[last].strftime("%Y-%m-%d"))
+
+    def frame(self, the_date):
+        """DataFrame [date, deaths, logdeaths] of the log-smoothed series
+        cut at the_date, with the gaps interpolated (None if undefined)"""
+        if self._last_defined(the_date) is None:
+            return None
+        cut = self._day_of[pd.Timestamp(the_date)] + 1
+        cut_logdeaths = self.logdeaths[:cut].copy()
+        cut_logdeaths[max(cut - logsmooth_log_window // 2, 0):] = np.nan
+        df = pd.DataFrame({'date': self.dates[:cut],
+                           'logdeaths': cut_logdeaths})
+        df['logdeaths'] = df['logdeaths'].interpolate(
+            method='polynomial', order=logsmooth_interpolation_order)
+        df['deaths'] = np.exp(df['logdeaths'])
+        return df[['date', 'deaths', 'logdeaths']]
+
+    def _last_defined(self, the_date):
+        """Position of the last defined value of the series cut at the_date
+        (None if the date is not in the series, or if the interpolation of
+        the cut series cannot be done)"""
+        day = self._day_of.get(pd.Timestamp(the_date))
+        if day is None:
+            return None
+        # the last logsmooth_log_window//2 values of the cut series are undefined
+        last_day = day - logsmooth_log_window // 2
+        if (last_day < 0) \
+           or (self._valid_count[last_day] < logsmooth_interpolation_order + 1):
+            return None
+        return int(self._last_valid[last_day])
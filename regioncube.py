@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+#
+# Dense [region, day] arrays of the national mortality and case data.
+#
+# The long-format frames (one row per region per day) make every
+# national computation a groupby or a filter, and rolling windows over
+# the concatenated frame run across region boundaries.  A RegionCube
+# holds each value column as a float array of shape [region, day],
+# where day is an integer offset from a fixed first date (the app uses
+# first_possible_date), with NaN wherever a region has no data.
+#
+import numpy as np
+import pandas as pd
+from rolling import trailing_mean
+
+
+class RegionCube(object):
+    """Dense [region, day] float arrays built from a RegionIndex.
+
+    Regions are the keys of the index (e.g. (province, health_region)),
+    in the order of region_keys.  Days run from first_date to last_date
+    (default: the last date in the data).  Derived arrays (rolling means, cumulative sums)
+    are computed once and kept, so the cube must be treated as read-only.
+    """
+
+    def __init__(self, region_index, value_columns, first_date, last_date=None):
+        df = region_index.df
+        self.first_date = pd.Timestamp(first_date)
+        self.region_keys = region_index.region_keys()
+        self.region_rows = {key: i for i, key in enumerate(self.region_keys)}
+        #=== Integer day offset of every row
+        days = ( (df[region_index.date_column] - self.first_date)
+                 .dt.days.to_numpy() )
+        if last_date is not None:
+            self.ndays = max((pd.Timestamp(last_date) - self.first_date).days + 1, 0)
+        else:
+            self.ndays = int(days.max()) + 1 if len(days) else 0
+        #=== Region row of every row in the frame
+        row_of = np.full(len(df), -1, dtype=np.int64)
+        for i, key in enumerate(self.region_keys):
+            row_of[region_index.rows(key)] = i
+        keep = (row_of >= 0) & (days >= 0) & (days < self.ndays)
+        #=== Scatter the values into the dense arrays
+        self.values = {}
+        for col in value_columns:
+            arr = np.full((len(self.region_keys), self.ndays), np.nan)
+            arr[row_of[keep], days[keep]] = \
+                df[col].to_numpy(dtype=np.float64)[keep]
+            self.values[col] = arr
+        self._derived = {}
+
+    #--- days and regions
+
+    @property
+    def dates(self):
+        """DatetimeIndex of the day axis"""
+        return pd.date_range(self.first_date, periods=self.ndays)
+
+    @property
+    def last_date(self):
+        return self.first_date + pd.Timedelta(days=self.ndays - 1)
+
+    def day(self, date):
+        """Integer day offset of a date (string, datetime or Timestamp)"""
+        return (pd.Timestamp(date) - self.first_date).days
+
+    def date_slice(self, startdate, enddate):
+        """Slice of the day axis covering [startdate, enddate] (inclusive)"""
+        start = max(self.day(startdate), 0)
+        end = min(self.day(enddate), self.ndays - 1)
+        return slice(start, max(end + 1, start))
+
+    def row(self, region_key):
+        """Row of a region in the arrays (None if unknown)"""
+        return self.region_rows.get(region_key)
+
+    #--- values and vectorized helpers
+
+    def series(self, column, region_key):
+        """[day] array of a column for one region (a view, do not modify)"""
+        return self._array(column)[self.region_rows[region_key]]
+
+    def rolling_mean(self, column, window, min_periods=None):
+        """Trailing rolling mean along the day axis for all regions.
+
+        Same convention as pandas .rolling(window, min_periods).mean():
+        NaN unless at least min_periods (default: window) of the values
+        in the window are valid.
+        """
+        key = ('rolling_mean', column, window, min_periods)
+        if key not in self._derived:
+            self._derived[key] = trailing_mean(self._array(column), window, min_periods)
+        return self._derived[key]
+
+    def cumsum(self, column):
+        """Cumulative sum along the day axis (NaN treated as zero, but
+        NaN before a region's first valid value)"""
+        key = ('cumsum', column)
+        if key not in self._derived:
+            x = self._array(column)
+            valid = np.isfinite(x)
+            total = np.cumsum(np.where(valid, x, 0.0), axis=1)
+            total[np.cumsum(valid, axis=1) == 0] = np.nan
+            self._derived[key] = total
+        return self._derived[key]
+
+    def on_date(self, column_or_array, date):
+        """Values across all regions on a date (column name or [region, day] array)"""
+        arr = self._array(column_or_array)
+        day = self.day(date)
+        if (day < 0) or (day >= self.ndays):
+            return np.full(len(self.region_keys), np.nan)
+        return arr[:, day]
+
+    def region_total(self, column, region_key, startdate=None, enddate=None):
+        """Sum of a column over a date range for one region"""
+        x = self.series(column, region_key)
+        if (startdate is not None) or (enddate is not None):
+            x = x[self.date_slice(startdate or self.first_date,
+                                  enddate or self.last_date)]
+        return np.nansum(x)
+
+    def _array(self, column_or_array):
+        if isinstance(column_or_array, str):
+            return self.values[column_or_array]
+        return column_or_array
+
+
+def gradient(x, has_data=None):
+    """numpy.gradient along axis 1 of a [region, day] array, with each
+    region's series ending on its last day with data.
+
+    Central differences inside (NaN next to a NaN), and a one-sided
+    difference on a region's last day with data (as numpy.gradient of
+    the region's own series gives at its end) even when the array goes
+    on after it.  has_data is a [region, day] boolean array of the days
+    with data (default: where x is valid).
+    """
+    grad = np.full(x.shape, np.nan)
+    if x.shape[1] < 2:
+        return grad
+    grad[:, 1:-1] = (x[:, 2:] - x[:, :-2]) / 2.0
+    backward = x[:, 1:] - x[:, :-1]
+    grad[:, 0] = backward[:, 0]
+    grad[:, -1] = backward[:, -1]
+    #=== Regions whose last day with data is before the end of the array
+    if has_data is None:
+        has_data = np.isfinite(x)
+    last = x.shape[1] - 1 - np.argmax(has_data[:, ::-1], axis=1)
+    rows = np.flatnonzero(has_data.any(axis=1) & (last > 0) & (last < x.shape[1] - 1))
+    grad[rows, last[rows]] = backward[rows, last[rows] - 1]
+    return grad
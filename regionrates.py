@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+#
+# R(t) and 7-day average of cases of the regions of a RegionCube.
+#
+# Both are [region, day] arrays derived from each data snapshot (see
+# derivation.py), computed with windows of bounded length: compute(cube,
+# rows, start) gives the values of the given rows of the cube from day
+# start on, reading the cube values from day start - lookback on only.
+#
+import numpy as np
+from derivation import CubeDerivation
+from regioncube import gradient
+from rolling import trailing_mean
+
+#=== R(t) on a day depends on the deaths of the 27 days before (two
+#    14-day windows and the gradient) and of the day after (the gradient)
+Rt_lookback_days = 27
+
+
+def compute_Rt(mort_cube, rows, start, serial_interval, D14_offset,
+               smooth_lambda14_first=True):
+    #=== Calculate R(t) from mortality data:
+    #
+    #    * for exp growth with fixed serial interval, tau:
+    #
+    #           n(tau) = n0 * R
+    #           n(2*tau) = (n0 * R) * R
+    #           n(N*tau) = n0 R^N
+    #           n(t) = n0 R^(t/tau)
+    #                = n0 exp[t/tau ln(R)]
+    #                = n0 exp[lambda*t]     w/ lambda = ln(R)/tau
+    #
+    #              ---> R = exp(tau*lambda)
+    #
+    #    * Get D_14 = 14-day rolling average of mortality (plus D14_offset,
+    #      to avoid taking the log of 0)
+    #
+    #    * Assuming
+    #
+    #          D_14(t) = const * exp[ lambda * t ]
+    #
+    #      we have (natural log)
+    #
+    #          lambda(t) = d[log(D_14)]/dt
+    #
+    #      which can be calculated using numpy.gradient
+    #
+    #    * Calculate
+    #
+    #          R(t) = exp[ tau * lambda(t) ]
+    #
+    #    * Take 14-day rolling average of the resulting R(t)
+    #
+    #    (or take the rolling average of lambda before exponentiating, if
+    #    smooth_lambda14_first is set).  The app does this once per data
+    #    snapshot for all regions at once, as a [region, day] array on the
+    #    day axis of the mortality cube, over each region's whole series:
+    #    the charts slice it.  Here it is computed for the given rows of
+    #    the cube, from day start on.
+    #
+    lo = max(start - Rt_lookback_days, 0)
+    deaths = mort_cube.values['deaths'][rows, lo:]
+    D14 = trailing_mean(deaths, 14) + D14_offset
+    # (D14 < 0 after negative corrections in the data gives NaN)
+    with np.errstate(invalid='ignore'):
+        log_D14 = np.log(D14)
+    lambda_14 = gradient(log_D14, np.isfinite(deaths))
+    if smooth_lambda14_first:
+        Rt = np.exp( serial_interval * trailing_mean(lambda_14, 14) )
+    else:
+        Rt = trailing_mean(np.exp( serial_interval * lambda_14 ), 14)
+    return Rt[:, start - lo:]
+
+def make_Rt_derivation(serial_interval, D14_offset, smooth_lambda14_first=True):
+    """CubeDerivation of R(t) of the mortality cube (see compute_Rt)"""
+    def compute(mort_cube, rows, start):
+        return compute_Rt(mort_cube, rows, start, serial_interval, D14_offset,
+                          smooth_lambda14_first)
+    return CubeDerivation('mort_cube', 'mortality', compute,
+                          Rt_lookback_days, lookahead=1)
+
+
+def compute_cases_7day(cases_cube, rows, start):
+    """7-day rolling average of the cases of the given rows of the cases
+    cube, from day start on"""
+    lo = max(start - 6, 0)
+    return trailing_mean(cases_cube.values['cases'][rows, lo:], 7)[:, start - lo:]
+
+cases_7day_derivation = CubeDerivation('cases_cube', 'cases', compute_cases_7day, 6)
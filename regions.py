@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+#
+# Region-keyed lookup structures for the national data frames.
+#
+# The get_hr_* helpers in app.py used to select a region's rows with
+# boolean masks over the whole national frame (province first, then
+# health region) on every callback.  A RegionIndex is built once, when
+# the data is loaded, and maps each region key to its rows, already
+# sorted by date, so a lookup is a dictionary access plus the copy.
+#
+# The region key columns (province, health region, mobility sub-region)
+# are stored as pandas categoricals whose categories come from a
+# CategoryEncoding shared by all the frames, so a name has the same
+# integer code in every dataset and lookups compare integers.
+#
+# The static data of the health regions (both static data files) is
+# held by a RegionRegistry keyed by hr_uid, with a RegionProfile record
+# of each region for the static getters.
+#
+import math
+import numpy as np
+import pandas as pd
+
+#=== Columns of the static data carried by a RegionProfile
+region_profile_fields = ['province_name', 'prov_id', 'health_region', 'hr_uid',
+                         'sub_region_2', 'geo_code', 'ENG_LABEL', 'landarea',
+                         'total_pop', 'prov_pop', 'pwpd', 'pop_sparsity', 'pop80',
+                         'house', 'anndeath']
+#=== Values derived from them (see RegionProfile)
+region_profile_derived_fields = ['frac_pop_over_80', 'pwpd_80', 'sparsity_exponent']
+
+
+class CategoryEncoding(object):
+    """Shared table of integer codes for the values of a key column.
+
+    Built from the union of the (non-null) values of one or more
+    columns/lists; encode() converts a column to a categorical with
+    exactly these categories, so codes agree across frames.
+    """
+
+    def __init__(self, *value_lists):
+        names = set()
+        for values in value_lists:
+            names.update(v for v in pd.unique(np.asarray(values, dtype=object))
+                         if isinstance(v, str))
+        self.names = sorted(names)
+        self.dtype = pd.api.types.CategoricalDtype(self.names)
+        self._codes = {name: i for i, name in enumerate(self.names)}
+
+    def __len__(self):
+        return len(self.names)
+
+    def code(self, name):
+        """Integer code of a name (-1 if unknown)"""
+        return self._codes.get(name, -1)
+
+    def name(self, code):
+        return self.names[code]
+
+    def encode(self, values):
+        """Column (Series) converted to the shared categorical dtype"""
+        return values.astype(self.dtype)
+
+
+class RegionIndex(object):
+    """Map a region key to its date-sorted rows in a national DataFrame.
+
+    keys is a column name or a list of column names, e.g.
+    ['province', 'health_region'] (lookups then use tuples).  Rows are
+    grouped on the integer codes of the key columns (the categorical
+    codes when the columns are categorical, otherwise codes from
+    pd.factorize).  Rows of a region that are contiguous in the frame
+    are stored as a slice (the usual case for the mortality and case
+    files), otherwise as an array of row positions.  Without a
+    date_column the rows keep their order in the frame.
+    """
+
+    def __init__(self, df, keys, date_column=None):
+        self.df = df
+        self.keys = keys
+        self.date_column = date_column
+        self._single = isinstance(keys, str)
+        columns = [keys] if self._single else list(keys)
+        #=== Integer codes of each key column
+        codes = []
+        self._names = []
+        self._code_of = []
+        for col in columns:
+            values = df[col]
+            if isinstance(values.dtype, pd.api.types.CategoricalDtype):
+                col_codes = values.cat.codes.to_numpy().astype(np.int64)
+                names = list(values.cat.categories)
+            else:
+                col_codes, names = pd.factorize(values)
+                col_codes = col_codes.astype(np.int64)
+                names = list(names)
+            codes.append(col_codes)
+            self._names.append(names)
+            self._code_of.append({name: i for i, name in enumerate(names)})
+        #=== Sort rows by (combined key code, date), dropping null keys
+        combined = np.zeros(len(df), dtype=np.int64)
+        valid = np.ones(len(df), dtype=bool)
+        for col_codes, names in zip(codes, self._names):
+            combined = combined * len(names) + col_codes
+            valid &= (col_codes >= 0)
+        if date_column is None:
+            order = np.arange(len(df))
+        else:
+            dates = df[date_column].to_numpy().astype('datetime64[ns]').view(np.int64)
+            order = np.lexsort((dates, combined))
+        order = order[valid[order]]
+        #=== Store the block of rows of each region
+        self._rows = {}
+        if len(order) == 0:
+            return
+        if date_column is None:
+            order = order[np.argsort(combined[order], kind='mergesort')]
+        sorted_keys = combined[order]
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(sorted_keys)) + 1))
+        stops = np.concatenate((starts[1:], [len(order)]))
+        for start, stop in zip(starts, stops):
+            positions = order[start:stop]
+            key_codes = tuple(int(c[positions[0]]) for c in codes)
+            if (positions[-1] - positions[0] + 1 == len(positions)) \
+               and np.all(np.diff(positions) == 1):
+                self._rows[key_codes] = slice(int(positions[0]), int(positions[-1]) + 1)
+            else:
+                self._rows[key_codes] = positions
+
+    def __contains__(self, key):
+        return self.encode(key) in self._rows
+
+    def __len__(self):
+        return len(self._rows)
+
+    def encode(self, key):
+        """Tuple of integer codes of a region key (None if a name is unknown)"""
+        names = (key,) if self._single else key
+        key_codes = []
+        for name, code_of in zip(names, self._code_of):
+            code = code_of.get(name)
+            if code is None:
+                return None
+            key_codes.append(code)
+        return tuple(key_codes)
+
+    def decode(self, key_codes):
+        """Region key (names) of a tuple of integer codes"""
+        names = tuple(names[c] for names, c in zip(self._names, key_codes))
+        return names[0] if self._single else names
+
+    def region_keys(self):
+        """All region keys in the index"""
+        return [self.decode(key_codes) for key_codes in self._rows]
+
+    def rows(self, key):
+        """Slice (or position array) of the region's rows, None if unknown"""
+        return self._rows.get(self.encode(key))
+
+    def rows_for_codes(self, key_codes):
+        """Same as rows(), for a tuple of integer codes"""
+        return self._rows.get(tuple(key_codes))
+
+    def get(self, key):
+        """Date-sorted rows of a region (an empty frame if it is unknown)"""
+        rows = self.rows(key)
+        if rows is None:
+            return self.df.iloc[0:0]
+        return self.df.iloc[rows]
+
+
+class RegionRegistry(object):
+    """All health regions, keyed by hr_uid, with their static data.
+
+    Built once from the two static data files:
+
+      * static_data (health_regions_static_data.csv), which spells the
+        province and health region names as in the mortality/case data
+        and has the demographic fields used by the model, and
+      * static_data_map (health_regions_static_data2.csv), used by the
+        choropleth map, which spells some regions differently (accents,
+        "Winnepeg"), has the json map label (ENG_LABEL) and its own
+        version of the demographic fields.
+
+    table has one row per region of static_data, indexed by hr_uid, with
+    all its columns plus ENG_LABEL and the map_fields of static_data_map
+    (prefixed with "map_").  Regions are matched across the two files on
+    (province, name) first and on hr_uid for the rest (hr_uid alone is
+    not used because it is swapped for NWT/Nunavut in the map file).
+    """
+
+    def __init__(self, static_data, static_data_map, map_fields):
+        table = static_data.copy()
+        #=== The map row of each region
+        keys = static_data[['province_name', 'health_region', 'hr_uid']]
+        map_columns = ['ENG_LABEL'] + list(map_fields)
+        matched = keys.merge(
+            static_data_map[['province_name', 'health_region'] + map_columns],
+            on=['province_name', 'health_region'], how='left')
+        missing = matched['ENG_LABEL'].isnull().to_numpy()
+        if missing.any():
+            by_uid = keys[missing].merge(
+                static_data_map[['hr_uid'] + map_columns].drop_duplicates('hr_uid'),
+                on='hr_uid', how='left')
+            for col in map_columns:
+                matched.loc[missing, col] = by_uid[col].to_numpy()
+        table['ENG_LABEL'] = matched['ENG_LABEL'].to_numpy()
+        for field in map_fields:
+            table['map_' + field] = matched[field].to_numpy()
+        self.table = table.set_index('hr_uid', drop=False)
+        self.table.index.name = None
+        #=== Lookups of hr_uid by name and by map label, and of row positions
+        self._uid_of_name = {}
+        self._uid_of_label = {}
+        self._position = {}
+        for i, (uid, prov, reg, label) in enumerate(zip(
+                self.table['hr_uid'], self.table['province_name'],
+                self.table['health_region'], self.table['ENG_LABEL'])):
+            self._uid_of_name[(prov, reg)] = uid
+            if isinstance(label, str):
+                self._uid_of_label[label] = uid
+            self._position[uid] = i
+        #=== A RegionProfile of each region
+        columns = [self.table[field].tolist() for field in region_profile_fields]
+        self._profiles = {}
+        for values in zip(*columns):
+            profile = RegionProfile(**dict(zip(region_profile_fields, values)))
+            self._profiles[profile.hr_uid] = profile
+        #=== Map labels in the order of the map file (for the choropleth)
+        self.map_labels = [label for label in static_data_map['ENG_LABEL']
+                           if label in self._uid_of_label]
+
+    def __len__(self):
+        return len(self.table)
+
+    def __contains__(self, uid):
+        return uid in self._position
+
+    def uids(self):
+        return list(self.table.index)
+
+    def uid(self, province_name, region_name):
+        """hr_uid of a region given by (data) names (None if unknown)"""
+        return self._uid_of_name.get((province_name, region_name))
+
+    def uid_of_label(self, label):
+        """hr_uid of a region given by its map label (None if unknown)"""
+        return self._uid_of_label.get(label)
+
+    def region_key(self, uid):
+        """(province, health_region) of a region, spelled as in the data"""
+        row = self._position[uid]
+        return (self.table['province_name'].iat[row],
+                self.table['health_region'].iat[row])
+
+    def profile(self, province_name, region_name):
+        """RegionProfile of a region given by (data) names"""
+        profile = self._profiles.get(self.uid(province_name, region_name))
+        if profile is None:
+            raise KeyError("unknown health region: " + str(province_name)
+                           + ", " + str(region_name))
+        return profile
+
+    def profile_of_uid(self, uid):
+        return self._profiles[uid]
+
+    def row(self, uid):
+        """One-row frame of a region (an empty frame if it is unknown)"""
+        position = self._position.get(uid)
+        if position is None:
+            return self.table.iloc[0:0]
+        return self.table.iloc[position:position + 1]
+
+
+class RegionProfile(object):
+    """Immutable record of the static data of one health region.
+
+    Has an attribute for each of region_profile_fields (python scalars,
+    as given by .item() on the static data), and the derived values
+
+      * frac_pop_over_80 = pop80 / total_pop,
+      * pwpd_80 = pwpd * frac_pop_over_80, the PWPD of the population
+        over 80, and
+      * sparsity_exponent = log[ (total_pop/landarea) / pwpd ]
+                            / log[ 0.25**2/landarea ],
+        the population sparsity used by the model (nan if undefined).
+    """
+
+    __slots__ = region_profile_fields + region_profile_derived_fields
+
+    def __init__(self, **fields):
+        for name in region_profile_fields:
+            object.__setattr__(self, name, fields[name])
+        frac_pop_over_80 = self.pop80 / self.total_pop
+        try:
+            sparsity_exponent = math.log( (self.total_pop/self.landarea) / self.pwpd ) \
+                / math.log(0.25**2/self.landarea)
+        except (ValueError, ZeroDivisionError):
+            sparsity_exponent = float('nan')
+        object.__setattr__(self, 'frac_pop_over_80', frac_pop_over_80)
+        object.__setattr__(self, 'pwpd_80', self.pwpd * frac_pop_over_80)
+        object.__setattr__(self, 'sparsity_exponent', sparsity_exponent)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("RegionProfile is read-only")
+
+    def __delattr__(self, name):
+        raise AttributeError("RegionProfile is read-only")
+
+    def __repr__(self):
+        return "RegionProfile(" + str(self.hr_uid) + ", " + str(self.province_name) \
+            + ", " + str(self.health_region) + ")"
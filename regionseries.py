@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+#
+# Finished (processed) per-region daily series, precomputed at load.
+#
+# Some helpers return a series that is the result of several steps on
+# the raw data (e.g. get_hr_mob_df: rolling mean, reindexing to every
+# day, polynomial interpolation), and are called several times per
+# region switch.  A RegionSeries is built once when the data is loaded,
+# from the finished series of every region, and holds them as one
+# [region, day] float array on a common day axis, with the span of days
+# of each region; a lookup just wraps that span in a small DataFrame.
+#
+import numpy as np
+import pandas as pd
+
+
+class RegionSeries(object):
+    """Finished daily series of one value column for many regions.
+
+    Built from {region key: DataFrame [date, value_column]}, each with
+    one row per consecutive day (a frame with gaps in its dates is left
+    out).  The arrays are read-only; frame() returns a new DataFrame of
+    a region's span.
+    """
+
+    def __init__(self, value_column, frames):
+        self.value_column = value_column
+        frames = {key: df for key, df in frames.items()
+                  if (len(df) > 0) and _consecutive_days(df['date'])}
+        if frames:
+            self.first_date = min(df['date'].iloc[0] for df in frames.values())
+            last_date = max(df['date'].iloc[-1] for df in frames.values())
+            ndays = (last_date - self.first_date).days + 1
+        else:
+            self.first_date = pd.Timestamp(0)
+            ndays = 0
+        self.dates = pd.date_range(self.first_date, periods=ndays)
+        self.values = np.full((len(frames), ndays), np.nan)
+        self._spans = {}
+        for row, (key, df) in enumerate(frames.items()):
+            start = (df['date'].iloc[0] - self.first_date).days
+            stop = start + len(df)
+            self.values[row, start:stop] = df[value_column].to_numpy(dtype=np.float64)
+            self._spans[key] = (row, start, stop)
+        self.values.setflags(write=False)
+
+    def __len__(self):
+        return len(self._spans)
+
+    def __contains__(self, key):
+        return key in self._spans
+
+    def keys(self):
+        return list(self._spans)
+
+    def values_of(self, key):
+        """[day] array of a region's span (a read-only view)"""
+        row, start, stop = self._spans[key]
+        return self.values[row, start:stop]
+
+    def frame(self, key):
+        """DataFrame [date, value_column] of a region (None if unknown)"""
+        span = self._spans.get(key)
+        if span is None:
+            return None
+        row, start, stop = span
+        return pd.DataFrame({'date': self.dates[start:stop],
+                             self.value_column: self.values[row, start:stop]},
+                            columns=['date', self.value_column])
+
+
+def _consecutive_days(dates):
+    days = dates.to_numpy().astype('datetime64[D]').astype(np.int64)
+    return bool(np.all(np.diff(days) == 1))
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+#
+# Vectorized rolling windows over daily series.
+#
+# The helpers and callbacks used to call pandas .rolling() on small
+# per-region frames (trailing 7- and 14-day means, centered means), and
+# to filter a frame on a date window and average it for every day.  The
+# operators here work along the last axis of an array of daily values:
+# a [day] series of one region or a [region, day] array of all regions,
+# computed for all days at once from cumulative sums of the valid values
+# and of their number.  NaN values are missing values, and the window of
+# a day is clipped at both ends of the series, as in pandas: a result is
+# NaN unless at least min_periods of the values in its window are valid.
+#
+#     window_mean(x, lo, hi)       mean over days t+lo .. t+hi
+#     trailing_mean(x, window)     .rolling(window).mean()
+#     centered_mean(x, window)     .rolling(window, center=True).mean()
+#     trailing_sum(x, window)      .rolling(window).sum()
+#     lagged(x, lag)               value on day t-lag (NaN before the start)
+#
+import numpy as np
+
+
+def window_sum(x, lo, hi, min_periods=1):
+    """Sum of the valid values of x on the days t+lo .. t+hi of every
+    day t (lo <= hi, offsets in days, negative for days before)"""
+    total, count = _window_totals(x, lo, hi)
+    total[count < max(min_periods, 1)] = np.nan
+    return total
+
+def window_mean(x, lo, hi, min_periods=1):
+    """Mean of the valid values of x on the days t+lo .. t+hi of every
+    day t (lo <= hi, offsets in days, negative for days before)"""
+    total, count = _window_totals(x, lo, hi)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+    mean[count < max(min_periods, 1)] = np.nan
+    return mean
+
+def trailing_mean(x, window, min_periods=None):
+    """Mean over the window days up to each day (pandas .rolling(window,
+    min_periods).mean(), min_periods defaulting to window)"""
+    return window_mean(x, 1 - window, 0, window if min_periods is None else min_periods)
+
+def trailing_sum(x, window, min_periods=None):
+    """Sum over the window days up to each day (pandas .rolling(window,
+    min_periods).sum(), min_periods defaulting to window)"""
+    return window_sum(x, 1 - window, 0, window if min_periods is None else min_periods)
+
+def centered_mean(x, window, min_periods=None):
+    """Mean over the window days centered on each day (pandas
+    .rolling(window, min_periods, center=True).mean(): for an even
+    window, one more day before than after)"""
+    lo = -(window // 2)
+    return window_mean(x, lo, lo + window - 1,
+                       window if min_periods is None else min_periods)
+
+def lagged(x, lag):
+    """Values of x on day t-lag for every day t (NaN outside the series;
+    a negative lag looks ahead)"""
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full(x.shape, np.nan)
+    ndays = x.shape[-1]
+    if (lag >= 0) and (lag < ndays):
+        out[..., lag:] = x[..., :ndays - lag]
+    elif (lag < 0) and (-lag < ndays):
+        out[..., :ndays + lag] = x[..., -lag:]
+    return out
+
+#--- helpers
+
+def _window_totals(x, lo, hi):
+    """Sum and number of the valid values in the window of every day"""
+    x = np.asarray(x, dtype=np.float64)
+    valid = np.isfinite(x)
+    csum = _cumsum_with_zero(np.where(valid, x, 0.0))
+    ccount = _cumsum_with_zero(valid.astype(np.float64))
+    ndays = x.shape[-1]
+    idx = np.arange(ndays)
+    start = np.clip(idx + lo, 0, ndays)
+    stop = np.clip(idx + hi + 1, 0, ndays)
+    stop = np.maximum(stop, start)
+    total = csum[..., stop] - csum[..., start]
+    count = ccount[..., stop] - ccount[..., start]
+    return total, count
+
+def _cumsum_with_zero(x):
+    """Cumulative sum along the last axis with a leading zero"""
+    out = np.zeros(x.shape[:-1] + (x.shape[-1] + 1,))
+    np.cumsum(x, axis=-1, out=out[..., 1:])
+    return out
@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+#
+# Per-region shard files of the time series, loaded on demand.
+#
+# Optional backend for the get_hr_* helpers (data_backend = 'shards' in
+# app.py), meant for many more regions than the Canadian health regions:
+# each region of each dataset is a small .npz file (typed arrays, see
+# datacache.write_frame_npz), and a query loads just that file.  Loaded
+# regions ("region bundles") are kept in a bounded LRU cache, so memory
+# use depends on the cache size and not on the number of regions.
+#
+# Layout of the store directory:
+#
+#     <dataset>/index.json           current version, columns, date range,
+#                                    region files and fingerprints
+#     <dataset>/<version>/<n>.npz    one file per region
+#
+# With the date range and the region fingerprints of index.json, the app
+# can load a data snapshot without reading the series at all (see
+# load_shard_data in app.py).
+#
+# A dataset is re-ingested into a new version directory and index.json is
+# then replaced, so readers switch versions atomically.  The previous
+# version is kept (a process may still be reading it, index.json names
+# it too) and the versions index.json does not name are removed.  The
+# ingest, the cleanup and the index write (and the update of a single
+# region) hold an exclusive lock on <dataset>/.lock, so that the workers
+# of a server starting together ingest a dataset once and never remove
+# each other's new version or region entries.  Same
+# interface as sqlitestore.SQLiteStore, plus date_range() and
+# region_fingerprints().
+#
+import os
+import json
+import fcntl
+import contextlib
+import shutil
+import hashlib
+import datetime
+import threading
+import collections
+import numpy as np
+import pandas as pd
+from datacache import write_frame_npz, read_frame_npz
+from regions import RegionIndex
+
+
+class ShardStore(object):
+    """Per-region series in one file per region, with an LRU of loaded regions.
+
+    A region key is a tuple of names for datasets with several key
+    columns, otherwise a name.
+    """
+
+    def __init__(self, directory, cache_size=256):
+        self.directory = directory
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._bundles = collections.OrderedDict()
+        self._indexes = {}
+
+    #--- reading
+
+    def query(self, dataset, key, startdate=None, enddate=None):
+        """Date-sorted rows of one region, optionally in [startdate, enddate].
+
+        Returns a new DataFrame with the dataset's columns (the key
+        columns filled with the key), or None if the dataset has not
+        been ingested.  An unknown region gives an empty frame.
+        """
+        index = self._index(dataset)
+        if index is None:
+            return None
+        df = self._bundle(dataset, index, _encode_key(key))
+        if df is None:
+            df = pd.DataFrame({c: [] for c in index['columns']
+                               if c not in index['key_columns']})
+            df[index['date_column']] = pd.to_datetime(df[index['date_column']])
+        #=== Rows in the date range (dates are sorted)
+        dates = df[index['date_column']].to_numpy()
+        start = 0
+        stop = len(df)
+        if startdate is not None:
+            start = np.searchsorted(dates, np.datetime64(pd.Timestamp(startdate)), 'left')
+        if enddate is not None:
+            stop = np.searchsorted(dates, np.datetime64(pd.Timestamp(enddate)), 'right')
+        df = df.iloc[start:max(stop, start)].reset_index(drop=True)
+        key_names = [key] if (len(index['key_columns']) == 1) else list(key)
+        for col, name in zip(index['key_columns'], key_names):
+            df[col] = name
+        # (columns added by replace_region after the region was written
+        #  have no values)
+        return df.reindex(columns=index['columns'])
+
+    def dataset_info(self, dataset):
+        """Dict of the key/date/all columns and signature of a dataset (None if absent)"""
+        index = self._index(dataset)
+        if index is None:
+            return None
+        return {name: index[name] for name in
+                ['signature', 'key_columns', 'date_column', 'columns']}
+
+    def date_range(self, dataset):
+        """(first, last) date (Timestamps) of the rows of a dataset (None
+        if it has not been ingested, or has no rows)"""
+        index = self._index(dataset)
+        if (index is None) or (index.get('first_date') is None):
+            return None
+        return pd.Timestamp(index['first_date']), pd.Timestamp(index['last_date'])
+
+    def region_fingerprints(self, dataset):
+        """{region key: fingerprint of its rows} of an ingested dataset
+        (None if it has not been ingested)"""
+        index = self._index(dataset)
+        if index is None:
+            return None
+        multiple = (len(index['key_columns']) > 1)
+        fingerprints = {}
+        for key_string, region in index['regions'].items():
+            names = json.loads(key_string)
+            fingerprints[tuple(names) if multiple else names[0]] = region.get('fingerprint')
+        return fingerprints
+
+    def region_updated_at(self, dataset, key):
+        """When the file of a region was last written (None if never)"""
+        index = self._index(dataset)
+        if index is None:
+            return None
+        region = index['regions'].get(_encode_key(key))
+        if (region is None) or (region.get('updated_at') is None):
+            return None
+        return datetime.datetime.strptime(region['updated_at'], "%Y-%m-%d %H:%M:%S")
+
+    #--- writing
+
+    def ingest(self, dataset, df, key_columns, date_column, signature):
+        """Replace a whole dataset with the rows of df.
+
+        key_columns is a column name or a list of column names.  Nothing
+        is done (and False returned) if the dataset was already ingested
+        with the same signature.
+        """
+        if isinstance(key_columns, str):
+            key_columns = [key_columns]
+        index = self._index(dataset)
+        if (index is not None) and (index['signature'] == signature):
+            return False
+        with self._dataset_lock(dataset):
+            #=== Another process may have ingested it while we waited
+            index = self._index(dataset)
+            if (index is not None) and (index['signature'] == signature):
+                return False
+            previous_version = None if (index is None) else index['version']
+            self._ingest(dataset, df, key_columns, date_column, signature,
+                         previous_version)
+        return True
+
+    def _ingest(self, dataset, df, key_columns, date_column, signature,
+                previous_version):
+        """Write a new version of a dataset (with the dataset lock held)"""
+        version = 'v' + hashlib.sha1(
+            (str(signature) + str(os.getpid()) + str(datetime.datetime.now()))
+            .encode('utf-8')).hexdigest()[:12]
+        value_df = df.drop(columns=key_columns)
+        # (hashes of the rows, for the fingerprint of each region)
+        row_hashes = pd.util.hash_pandas_object(value_df, index=False).to_numpy()
+        #=== One file per region, rows sorted by date
+        region_index = RegionIndex(df, key_columns if (len(key_columns) > 1)
+                                   else key_columns[0], date_column)
+        regions = {}
+        for i, key in enumerate(region_index.region_keys()):
+            region_file = str(i) + '.npz'
+            region_rows = region_index.rows(key)
+            rows = value_df.iloc[region_rows].reset_index(drop=True)
+            if not write_frame_npz(rows, os.path.join(self.directory, dataset,
+                                                      version, region_file)):
+                raise ValueError("cannot write " + dataset + " shard of "
+                                 + str(key) + " (non-string object column)")
+            regions[_encode_key(key)] = {
+                'file': region_file,
+                'updated_at': None,
+                'fingerprint': hashlib.sha1(row_hashes[region_rows].tobytes())
+                               .hexdigest()[:16]}
+        dates = df[date_column]
+        index = {'version': version,
+                 'signature': signature,
+                 'first_date': _date_string(dates.min()),
+                 'last_date': _date_string(dates.max()),
+                 'key_columns': key_columns,
+                 'date_column': date_column,
+                 'columns': [str(c) for c in df.columns],
+                 'regions': regions,
+                 'previous_version': previous_version}
+        self._write_index(dataset, index)
+        self._remove_old_versions(dataset, index)
+
+    def replace_region(self, dataset, key, df, key_columns, date_column):
+        """Replace the file of one region (creating the dataset if needed).
+
+        Used for data fetched one region at a time (vaccination).  The
+        index is read, updated and written with the dataset lock held, so
+        that concurrent writes of different regions keep each other's
+        entries.
+        """
+        if isinstance(key_columns, str):
+            key_columns = [key_columns]
+        with self._dataset_lock(dataset):
+            index = self._index(dataset)
+            if index is None:
+                index = {'version': 'v0',
+                         'signature': None,
+                         'key_columns': key_columns,
+                         'date_column': date_column,
+                         'columns': [str(c) for c in df.columns],
+                         'regions': {}}
+            else:
+                index = dict(index, regions=dict(index['regions']),
+                             columns=list(index['columns']))
+                index['columns'] += [str(c) for c in df.columns
+                                     if c not in index['columns']]
+            key_string = _encode_key(key)
+            region_file = hashlib.sha1(key_string.encode('utf-8')).hexdigest()[:16] + '.npz'
+            value_df = df[[c for c in df.columns if c not in key_columns]].copy()
+            value_df[date_column] = pd.to_datetime(value_df[date_column])
+            value_df = value_df.sort_values(date_column, kind='mergesort') \
+                .reset_index(drop=True)
+            if not write_frame_npz(value_df, os.path.join(self.directory, dataset,
+                                                          index['version'], region_file)):
+                return False
+            row_hashes = pd.util.hash_pandas_object(value_df, index=False).to_numpy()
+            index['regions'][key_string] = {
+                'file': region_file,
+                'updated_at': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                'fingerprint': hashlib.sha1(row_hashes.tobytes()).hexdigest()[:16]}
+            self._write_index(dataset, index)
+        return True
+
+    #--- helpers
+
+    def _index(self, dataset):
+        """The dataset's index.json (re-read when the file changes)"""
+        index_file = os.path.join(self.directory, dataset, 'index.json')
+        try:
+            st = os.stat(index_file)
+        except OSError:
+            return None
+        signature = (st.st_size, st.st_mtime_ns)
+        with self._lock:
+            cached = self._indexes.get(dataset)
+        if (cached is None) or (cached[0] != signature):
+            with open(index_file, 'r') as f:
+                cached = (signature, json.load(f))
+            with self._lock:
+                self._indexes[dataset] = cached
+        return cached[1]
+
+    def _write_index(self, dataset, index):
+        index_file = os.path.join(self.directory, dataset, 'index.json')
+        os.makedirs(os.path.dirname(index_file), exist_ok=True)
+        tmp_file = index_file + ".tmp." + str(os.getpid())
+        with open(tmp_file, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp_file, index_file)
+
+    def _remove_old_versions(self, dataset, index):
+        """Remove the version directories that index (the dataset's
+        index.json) does not name (with the dataset lock held)"""
+        dataset_dir = os.path.join(self.directory, dataset)
+        keep = {index['version'], index.get('previous_version')}
+        for version in os.listdir(dataset_dir):
+            if (version not in keep) and os.path.isdir(os.path.join(dataset_dir, version)):
+                shutil.rmtree(os.path.join(dataset_dir, version), ignore_errors=True)
+
+    @contextlib.contextmanager
+    def _dataset_lock(self, dataset):
+        """Exclusive lock (between processes) on a dataset of the store"""
+        dataset_dir = os.path.join(self.directory, dataset)
+        os.makedirs(dataset_dir, exist_ok=True)
+        with open(os.path.join(dataset_dir, '.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _bundle(self, dataset, index, key_string):
+        """Frame of one region's file, through the LRU cache (None if unknown)"""
+        region = index['regions'].get(key_string)
+        if region is None:
+            return None
+        # (replace_region rewrites a region's file under the same name: the
+        #  fingerprint tells the versions apart)
+        cache_key = (dataset, index['version'], region['file'],
+                     region.get('fingerprint'))
+        with self._lock:
+            df = self._bundles.get(cache_key)
+            if df is not None:
+                self._bundles.move_to_end(cache_key)
+                return df
+        df = read_frame_npz(os.path.join(self.directory, dataset,
+                                         index['version'], region['file']))
+        with self._lock:
+            self._bundles[cache_key] = df
+            while len(self._bundles) > self.cache_size:
+                self._bundles.popitem(last=False)
+        return df
+
+
+def _date_string(date):
+    return None if pd.isnull(date) else pd.Timestamp(date).strftime("%Y-%m-%d")
+
+def _encode_key(key):
+    names = list(key) if isinstance(key, tuple) else [key]
+    return json.dumps([str(name) for name in names])
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+#
+# Local SQLite store of the per-region time series.
+#
+# Optional backend for the get_hr_* helpers (data_backend = 'sqlite' in
+# app.py): instead of slicing national frames held in every worker, a
+# helper runs an indexed range query for one region.  Each dataset
+# (mortality, cases, mobility, trends, weather, vaccination) is a table
+#
+#     series_<dataset> (region_id, date, <value columns>)
+#
+# with a composite index on (region_id, date).  The regions table maps
+# the key of a region in a dataset (e.g. (province, health_region), a
+# mobility sub-region or a trends geocode, stored as a json list) to its
+# region_id, and the datasets table records the columns of each dataset
+# and a signature of the source files it was ingested from, so that a
+# dataset is re-ingested only when its sources change.
+#
+# Dates are stored as 'YYYY-MM-DD' text.  The file is opened in WAL
+# mode, so queries keep reading the previous version of a dataset while
+# it is being re-ingested (in a single transaction).
+#
+import os
+import json
+import sqlite3
+import datetime
+import threading
+import numpy as np
+import pandas as pd
+
+_schema = """
+CREATE TABLE IF NOT EXISTS datasets (
+    name TEXT PRIMARY KEY,
+    signature TEXT,
+    key_columns TEXT NOT NULL,
+    date_column TEXT NOT NULL,
+    columns TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS regions (
+    region_id INTEGER PRIMARY KEY,
+    dataset TEXT NOT NULL,
+    key TEXT NOT NULL,
+    updated_at TEXT,
+    UNIQUE (dataset, key)
+);
+"""
+
+
+class SQLiteStore(object):
+    """Per-region time series in a local SQLite file.
+
+    Connections are opened per thread.  A region key is a tuple of
+    names for datasets with several key columns, otherwise a name.
+    """
+
+    def __init__(self, filename, timeout=60):
+        self.filename = filename
+        self.timeout = timeout
+        self._local = threading.local()
+        dirname = os.path.dirname(filename)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_schema)
+
+    #--- reading
+
+    def query(self, dataset, key, startdate=None, enddate=None):
+        """Date-sorted rows of one region, optionally in [startdate, enddate].
+
+        Returns a new DataFrame with the dataset's columns (the key
+        columns filled with the key), or None if the dataset has not
+        been ingested.  An unknown region gives an empty frame.
+        """
+        info = self.dataset_info(dataset)
+        if info is None:
+            return None
+        value_columns = [c for c in info['columns']
+                         if (c not in info['key_columns'])
+                         and (c != info['date_column'])]
+        sql = ("SELECT date" + "".join(", " + _quote(c) for c in value_columns)
+               + " FROM " + _table(dataset) + " WHERE region_id = "
+               + "(SELECT region_id FROM regions WHERE dataset = ? AND key = ?)")
+        params = [dataset, _encode_key(key)]
+        if startdate is not None:
+            sql += " AND date >= ?"
+            params.append(_date_str(startdate))
+        if enddate is not None:
+            sql += " AND date <= ?"
+            params.append(_date_str(enddate))
+        sql += " ORDER BY date, rowid"
+        rows = self._connection().execute(sql, params).fetchall()
+        df = pd.DataFrame.from_records(rows,
+                                       columns=[info['date_column']] + value_columns)
+        df[info['date_column']] = pd.to_datetime(df[info['date_column']],
+                                                 format="%Y-%m-%d")
+        key_names = [key] if (len(info['key_columns']) == 1) else list(key)
+        for col, name in zip(info['key_columns'], key_names):
+            df[col] = name
+        return df[info['columns']]
+
+    def dataset_info(self, dataset):
+        """Dict of the key/date/all columns and signature of a dataset (None if absent)"""
+        row = self._connection().execute(
+            "SELECT signature, key_columns, date_column, columns FROM datasets"
+            " WHERE name = ?", (dataset,)).fetchone()
+        if row is None:
+            return None
+        return {'signature': row[0],
+                'key_columns': json.loads(row[1]),
+                'date_column': row[2],
+                'columns': json.loads(row[3])}
+
+    def region_updated_at(self, dataset, key):
+        """When the rows of a region were last written (None if never)"""
+        row = self._connection().execute(
+            "SELECT updated_at FROM regions WHERE dataset = ? AND key = ?",
+            (dataset, _encode_key(key))).fetchone()
+        if (row is None) or (row[0] is None):
+            return None
+        return datetime.datetime.strptime(row[0], "%Y-%m-%d %H:%M:%S")
+
+    #--- writing
+
+    def ingest(self, dataset, df, key_columns, date_column, signature):
+        """Replace a whole dataset with the rows of df.
+
+        key_columns is a column name or a list of column names.  Nothing
+        is done (and False returned) if the dataset was already ingested
+        with the same signature.
+        """
+        if isinstance(key_columns, str):
+            key_columns = [key_columns]
+        conn = self._connection()
+        with _transaction(conn):
+            row = conn.execute("SELECT signature FROM datasets WHERE name = ?",
+                               (dataset,)).fetchone()
+            if (row is not None) and (row[0] == signature):
+                return False
+            conn.execute("DROP TABLE IF EXISTS " + _table(dataset))
+            conn.execute("DELETE FROM regions WHERE dataset = ?", (dataset,))
+            value_columns = self._create_table(conn, dataset, df,
+                                               key_columns, date_column)
+            #=== Region ids of the (non-null) keys
+            keys = df[key_columns].astype(object)
+            valid = keys.notnull().all(axis=1).to_numpy()
+            df = df[valid]
+            key_strings = [_encode_key(k) for k in
+                           keys[valid].itertuples(index=False, name=None)]
+            codes, uniques = pd.factorize(pd.Series(key_strings, dtype=object))
+            region_ids = []
+            for key_string in uniques:
+                cur = conn.execute("INSERT INTO regions (dataset, key) VALUES (?, ?)",
+                                   (dataset, key_string))
+                region_ids.append(cur.lastrowid)
+            #=== The rows
+            self._insert_rows(conn, dataset, np.asarray(region_ids)[codes],
+                              df, date_column, value_columns)
+            conn.execute("INSERT OR REPLACE INTO datasets VALUES (?, ?, ?, ?, ?)",
+                         (dataset, signature, json.dumps(key_columns),
+                          date_column, json.dumps([str(c) for c in df.columns])))
+        return True
+
+    def replace_region(self, dataset, key, df, key_columns, date_column):
+        """Replace the rows of one region (creating the dataset if needed).
+
+        Used for data fetched one region at a time (vaccination).  Columns
+        not yet in the table are added; the region's updated_at is set.
+        """
+        if isinstance(key_columns, str):
+            key_columns = [key_columns]
+        conn = self._connection()
+        key_string = _encode_key(key)
+        with _transaction(conn):
+            info = self.dataset_info(dataset)
+            if info is None:
+                value_columns = self._create_table(conn, dataset, df,
+                                                   key_columns, date_column)
+                columns = [str(c) for c in df.columns]
+                conn.execute("INSERT INTO datasets VALUES (?, ?, ?, ?, ?)",
+                             (dataset, None, json.dumps(key_columns),
+                              date_column, json.dumps(columns)))
+            else:
+                columns = list(info['columns'])
+                for col in df.columns:
+                    if col not in columns:
+                        conn.execute("ALTER TABLE " + _table(dataset) + " ADD COLUMN "
+                                     + _quote(col) + " " + _sql_type(df[col]))
+                        columns.append(str(col))
+                conn.execute("UPDATE datasets SET columns = ? WHERE name = ?",
+                             (json.dumps(columns), dataset))
+                value_columns = [c for c in df.columns
+                                 if (c not in key_columns) and (c != date_column)]
+            updated_at = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            row = conn.execute("SELECT region_id FROM regions WHERE dataset = ? AND key = ?",
+                               (dataset, key_string)).fetchone()
+            if row is None:
+                region_id = conn.execute(
+                    "INSERT INTO regions (dataset, key, updated_at) VALUES (?, ?, ?)",
+                    (dataset, key_string, updated_at)).lastrowid
+            else:
+                region_id = row[0]
+                conn.execute("UPDATE regions SET updated_at = ? WHERE region_id = ?",
+                             (updated_at, region_id))
+                conn.execute("DELETE FROM " + _table(dataset) + " WHERE region_id = ?",
+                             (region_id,))
+            self._insert_rows(conn, dataset, np.full(len(df), region_id),
+                              df, date_column, value_columns)
+
+    #--- helpers
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.filename, timeout=self.timeout,
+                                   isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def _create_table(self, conn, dataset, df, key_columns, date_column):
+        value_columns = [c for c in df.columns
+                         if (c not in key_columns) and (c != date_column)]
+        conn.execute("CREATE TABLE " + _table(dataset)
+                     + " (region_id INTEGER NOT NULL, date TEXT NOT NULL"
+                     + "".join(", " + _quote(c) + " " + _sql_type(df[c])
+                               for c in value_columns) + ")")
+        conn.execute("CREATE INDEX " + _quote("idx_" + dataset + "_region_date")
+                     + " ON " + _table(dataset) + " (region_id, date)")
+        return value_columns
+
+    def _insert_rows(self, conn, dataset, region_ids, df, date_column, value_columns):
+        dates = df[date_column]
+        if pd.api.types.is_datetime64_any_dtype(dates.dtype):
+            dates = dates.dt.strftime("%Y-%m-%d")
+        columns = [pd.Series(region_ids, dtype=object).tolist(),
+                   dates.astype(object).tolist()]
+        for col in value_columns:
+            values = df[col].astype(object)
+            columns.append(values.where(values.notnull(), None).tolist())
+        sql = ("INSERT INTO " + _table(dataset) + " (region_id, date"
+               + "".join(", " + _quote(c) for c in value_columns) + ") VALUES ("
+               + ", ".join(["?"] * len(columns)) + ")")
+        conn.executemany(sql, zip(*columns))
+
+
+class _transaction(object):
+    """BEGIN IMMEDIATE ... COMMIT (ROLLBACK on error) on an autocommit connection"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.conn.execute("ROLLBACK" if exc_type is not None else "COMMIT")
+        return False
+
+
+def _table(dataset):
+    return _quote("series_" + dataset)
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+def _encode_key(key):
+    names = list(key) if isinstance(key, tuple) else [key]
+    return json.dumps([str(name) for name in names])
+
+def _date_str(date):
+    return pd.Timestamp(date).strftime("%Y-%m-%d")
+
+def _sql_type(values):
+    """Column type of a Series (none for object columns, which may mix types)"""
+    if pd.api.types.is_integer_dtype(values.dtype) \
+       or pd.api.types.is_bool_dtype(values.dtype):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(values.dtype):
+        return "REAL"
+    if pd.api.types.is_object_dtype(values.dtype):
+        return ""
+    return "TEXT"
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+#
+# The corrections table applied to the national mortality frame gives
+# the rows that get_hr_mortality_df corrected for its region (the
+# Toronto data dump of October 2020), and leaves the other regions as
+# they were.
+#
+import numpy as np
+import pandas as pd
+import pytest
+from corrections import mortality_corrections, apply_corrections, corrections_record
+
+
+def make_mortality_frame(seed=0):
+    rng = np.random.RandomState(seed)
+    frames = []
+    for province, region in [('Ontario', 'Toronto'), ('Ontario', 'Peel'),
+                             ('Quebec', 'Montréal')]:
+        dates = pd.date_range("2020-03-08", "2020-10-31")
+        frames.append(pd.DataFrame({
+            'province': province,
+            'health_region': region,
+            'date_death_report': dates,
+            'deaths': rng.poisson(4.0, len(dates)),
+        }))
+    df = pd.concat(frames, ignore_index=True)
+    toronto = (df.health_region == 'Toronto').to_numpy()
+    df.loc[toronto & (df.date_death_report == "2020-10-02").to_numpy(), 'deaths'] = 80
+    df.loc[toronto & (df.date_death_report == "2020-10-03").to_numpy(), 'deaths'] = 37
+    return df
+
+def old_toronto_correction(df_mort_all, province_name, region_name):
+    """The region's rows as get_hr_mortality_df corrected them (.loc where
+    it used .at with an index, which newer pandas refuses)"""
+    first_mortality_date = df_mort_all.date_death_report.min()
+    dfp = df_mort_all[df_mort_all.province == province_name]
+    dfr = dfp[dfp.health_region == region_name].copy()
+    if (region_name == "Toronto"):
+        therowindex = dfr.index[dfr.date_death_report.between("2020-10-02", "2020-10-02")]
+        dfr.loc[therowindex, 'deaths'] = 2
+        therowindex = dfr.index[dfr.date_death_report.between("2020-10-03", "2020-10-03")]
+        dfr.loc[therowindex, 'deaths'] = 4
+        old_deaths = 111.0
+        dfr.deaths = dfr.deaths.astype('float64')
+        df_prior = dfr[dfr.date_death_report.between(first_mortality_date, "2020-10-01")]
+        total_deaths_prior = df_prior.deaths.sum()
+        for index, row in df_prior.iterrows():
+            dfr.at[index, 'deaths'] = \
+                dfr.at[index, 'deaths'] \
+                + old_deaths * (dfr.at[index, 'deaths'] / total_deaths_prior)
+    return dfr
+
+
+def test_toronto_correction_equals_old_code():
+    df = make_mortality_frame()
+    corrected = df.copy()
+    applied = apply_corrections(corrected, mortality_corrections,
+                                'date_death_report', 'deaths')
+    # the rows up to october 1st, and october 2nd and 3rd
+    ndays = len(pd.date_range("2020-03-08", "2020-10-03"))
+    assert applied == {'toronto-2020-10-data-dump': ndays}
+    for province, region in [('Ontario', 'Toronto'), ('Ontario', 'Peel'),
+                             ('Quebec', 'Montréal')]:
+        expected = old_toronto_correction(df, province, region)
+        pd.testing.assert_frame_equal(corrected.loc[expected.index], expected,
+                                      check_dtype=False, rtol=1e-12)
+    # the 111 deaths are moved to the earlier days
+    assert corrected.deaths.sum() == pytest.approx(df.deaths.sum() - (80 + 37) + (2 + 4) + 111)
+
+def test_no_matching_rows():
+    df = make_mortality_frame()
+    df = df[df.health_region != 'Toronto'].copy()
+    expected = df.copy()
+    assert apply_corrections(df, mortality_corrections,
+                             'date_death_report', 'deaths') == {}
+    pd.testing.assert_frame_equal(df, expected)
+
+def test_redistribute_over_zeros():
+    df = pd.DataFrame({'region': 'a',
+                       'date': pd.date_range("2020-09-28", periods=6),
+                       'deaths': [0, 0, 0, 0, 9, 1]})
+    corrections = [{'name': 'spread', 'key': {'region': 'a'},
+                    'set': {'2020-10-02': 1},
+                    'redistribute': {'amount': 8.0, 'startdate': "2020-09-29",
+                                     'enddate': "2020-10-01"}}]
+    assert apply_corrections(df, corrections, 'date', 'deaths') == {'spread': 4}
+    np.testing.assert_allclose(df.deaths, [0, 8/3., 8/3., 8/3., 1, 1])
+
+def test_corrections_record():
+    record = corrections_record(mortality_corrections)
+    assert list(record) == ['toronto-2020-10-data-dump']
+    changed = [dict(mortality_corrections[0], set={'2020-10-02': 3, '2020-10-03': 4})]
+    assert corrections_record(changed) != record
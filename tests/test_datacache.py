@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+#
+# The .npz snapshots of datacache.py give back the frame that was
+# written (dtypes, NaN and missing strings included), and a snapshot is
+# only used while the CSV it was made from is unchanged.
+#
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import datacache
+from datacache import read_csv_snapshot, write_frame_npz, read_frame_npz, \
+    get_snapshot_filenames
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(datacache, 'snapshot_dir', str(tmp_path / 'snapshots'))
+    return tmp_path / 'snapshots'
+
+def write_csv(filename, deaths):
+    with open(filename, 'w') as f:
+        f.write("province,date,deaths\n")
+        for i, d in enumerate(deaths):
+            f.write("Ontario,0" + str(i + 1) + "-03-2021," + str(d) + "\n")
+
+def no_csv_read(*args):
+    raise AssertionError("the csv was read again")
+
+
+def test_npz_round_trip(tmp_path):
+    df = pd.DataFrame({
+        'date': pd.to_datetime(["2021-03-01", "2021-03-02", "2021-03-03"]),
+        'deaths': np.array([1, 0, 4], dtype=np.int64),
+        'rate': [0.5, np.nan, 2.25],
+        'name': np.array(["Toronto", None, "Peel"], dtype=object),
+        'province': pd.Categorical(["Ontario", "Ontario", np.nan]),
+        'flag': [True, False, True],
+    })
+    npz_file = str(tmp_path / 'frame.npz')
+    assert write_frame_npz(df, npz_file)
+    new_df = read_frame_npz(npz_file)
+
+    assert list(new_df.columns) == list(df.columns)
+    assert new_df['date'].dtype == df['date'].dtype
+    assert (new_df['date'] == df['date']).all()
+    assert new_df['deaths'].dtype == np.int64
+    assert (new_df['deaths'] == df['deaths']).all()
+    np.testing.assert_array_equal(new_df['rate'].to_numpy(), df['rate'].to_numpy())
+    assert new_df['flag'].dtype == np.bool_
+    # string and categorical columns come back as string columns (object,
+    # or str with pandas >= 3, as read_csv gives them), NaN where missing
+    for col in ['name', 'province']:
+        assert pd.api.types.is_string_dtype(new_df[col].dtype)
+        assert new_df[col].isna().tolist() == df[col].isna().tolist()
+        assert new_df[col].dropna().tolist() == df[col].dropna().tolist()
+        assert all(isinstance(v, str) for v in new_df[col].dropna())
+
+def test_npz_refuses_object_columns(tmp_path):
+    df = pd.DataFrame({'a': np.array([1, "x"], dtype=object)})
+    npz_file = str(tmp_path / 'frame.npz')
+    assert not write_frame_npz(df, npz_file)
+    assert not os.path.exists(npz_file)
+
+
+def test_snapshot_used_while_csv_unchanged(tmp_path, snapshot_dir, monkeypatch):
+    filename = str(tmp_path / 'mortality.csv')
+    write_csv(filename, [1, 2, 3])
+    date_columns = {'date': '%d-%m-%Y'}
+    df = read_csv_snapshot(filename, date_columns)
+    snapshot_file, meta_file = get_snapshot_filenames(filename)
+    assert os.path.exists(snapshot_file) and os.path.exists(meta_file)
+
+    monkeypatch.setattr(datacache, '_read_csv', no_csv_read)
+    pd.testing.assert_frame_equal(read_csv_snapshot(filename, date_columns), df,
+                                  check_dtype=False)
+    # a touched (but unchanged) csv keeps its snapshot
+    st = os.stat(filename)
+    os.utime(filename, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    pd.testing.assert_frame_equal(read_csv_snapshot(filename, date_columns), df,
+                                  check_dtype=False)
+
+def test_snapshot_rebuilt_when_csv_changes(tmp_path, snapshot_dir):
+    filename = str(tmp_path / 'mortality.csv')
+    write_csv(filename, [1, 2, 3])
+    date_columns = {'date': '%d-%m-%Y'}
+    read_csv_snapshot(filename, date_columns)
+
+    # same size, other contents
+    write_csv(filename, [1, 2, 4])
+    df = read_csv_snapshot(filename, date_columns)
+    assert df['deaths'].tolist() == [1, 2, 4]
+    # the new snapshot is the one read next
+    snapshot_file = get_snapshot_filenames(filename)[0]
+    assert read_frame_npz(snapshot_file)['deaths'].tolist() == [1, 2, 4]
+
+    # other date columns (or formats) do not use the snapshot either
+    df = read_csv_snapshot(filename)
+    assert df['date'].tolist() == ["01-03-2021", "02-03-2021", "03-03-2021"]
+
+def test_bad_snapshot_falls_back_to_csv(tmp_path, snapshot_dir):
+    filename = str(tmp_path / 'mortality.csv')
+    write_csv(filename, [1, 2, 3])
+    read_csv_snapshot(filename)
+    snapshot_file = get_snapshot_filenames(filename)[0]
+    with open(snapshot_file, 'wb') as f:
+        f.write(b"not an npz file")
+    assert read_csv_snapshot(filename)['deaths'].tolist() == [1, 2, 3]
+    assert read_frame_npz(snapshot_file)['deaths'].tolist() == [1, 2, 3]
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+#
+# rows_between, rows_on and values_on select the rows that the boolean
+# masks of the app (df[df.date.between(a, b)]) selected from date-sorted
+# frames.
+#
+import numpy as np
+import pandas as pd
+import pytest
+from dateslice import rows_between, rows_on, values_on
+
+
+def make_frame():
+    # date-sorted, with days missing and a date on two rows
+    dates = pd.to_datetime(["2020-03-01", "2020-03-02", "2020-03-04",
+                            "2020-03-04", "2020-03-05", "2020-03-09",
+                            "2020-03-10"])
+    return pd.DataFrame({'date': dates,
+                         'deaths': [1.0, 0.0, 3.0, 4.0, np.nan, 2.0, 5.0]},
+                        index=np.arange(10, 17))
+
+windows = [("2020-03-01", "2020-03-10"), ("2020-03-02", "2020-03-04"),
+           ("2020-03-03", "2020-03-08"), ("2020-03-06", "2020-03-08"),
+           ("2020-02-01", "2020-02-20"), ("2020-03-11", "2020-04-01"),
+           ("2020-02-01", "2020-03-01"), ("2020-03-10", "2020-04-01"),
+           ("2020-03-05", "2020-03-04")]
+
+
+@pytest.mark.parametrize('startdate,enddate', windows)
+def test_rows_between(startdate, enddate):
+    df = make_frame()
+    expected = df[df.date.between(startdate, enddate)]
+    pd.testing.assert_frame_equal(rows_between(df, 'date', startdate, enddate),
+                                  expected)
+    # also with Timestamp and datetime64 bounds
+    pd.testing.assert_frame_equal(
+        rows_between(df, 'date', pd.Timestamp(startdate),
+                     np.datetime64(enddate)), expected)
+
+def test_rows_on():
+    df = make_frame()
+    for date in ["2020-03-01", "2020-03-03", "2020-03-04", "2020-03-10", "2020-04-01"]:
+        pd.testing.assert_frame_equal(rows_on(df, 'date', date),
+                                      df[df.date.between(date, date)])
+
+def test_empty_frame():
+    df = make_frame().iloc[:0]
+    assert len(rows_between(df, 'date', "2020-03-01", "2020-03-10")) == 0
+    assert len(rows_on(df, 'date', "2020-03-01")) == 0
+    with pytest.raises(IndexError):
+        values_on(df, 'date', 'deaths', pd.to_datetime(["2020-03-01"]))
+    assert np.isnan(values_on(df, 'date', 'deaths', pd.to_datetime(["2020-03-01"]),
+                              missing=np.nan)).all()
+
+def test_values_on():
+    df = make_frame()
+    dates = pd.to_datetime(["2020-03-01", "2020-03-04", "2020-03-05", "2020-03-10"])
+    # the value of the first row on each date, as
+    # df[df.date.between(day, day)]['deaths'].to_list()[0] gave it
+    expected = [df[df.date.between(day, day)]['deaths'].to_list()[0] for day in dates]
+    np.testing.assert_array_equal(values_on(df, 'date', 'deaths', dates), expected)
+    # a date without rows
+    dates = pd.to_datetime(["2020-03-02", "2020-03-03", "2020-03-11"])
+    with pytest.raises(IndexError):
+        values_on(df, 'date', 'deaths', dates)
+    np.testing.assert_array_equal(
+        values_on(df, 'date', 'deaths', dates, missing=-1.0), [0.0, -1.0, -1.0])
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+#
+# The R(t) and 7-day cases arrays of the app (regionrates.py): computing
+# them from a later day gives the same values as over the whole series,
+# and an incremental CubeDerivation.update after a reload gives the same
+# array as a full build() of the new snapshot.
+#
+import numpy as np
+import pandas as pd
+import pytest
+from datastore import DataSnapshot
+from dataversion import DataVersions
+from derivation import derive
+from regioncube import RegionCube
+from regions import RegionIndex
+from regionrates import Rt_lookback_days, compute_Rt, make_Rt_derivation, \
+    compute_cases_7day, cases_7day_derivation
+
+first_date = pd.Timestamp("2020-01-01")
+
+#=== The options of the app
+Rt_serial_interval = 5.3
+Rt_make_D14_nonzero_offset = 0.5/14.0
+
+Rt_derivation = make_Rt_derivation(Rt_serial_interval, Rt_make_D14_nonzero_offset)
+
+
+def make_frame(ndays_by_region, seed=0):
+    rng = np.random.RandomState(seed)
+    frames = []
+    for region, ndays in ndays_by_region.items():
+        frames.append(pd.DataFrame({
+            'region': region,
+            'date': pd.date_range(first_date, periods=ndays),
+            'deaths': rng.poisson(5.0, ndays).astype(np.float64),
+            'cases': rng.poisson(50.0, ndays).astype(np.float64),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+def make_snapshot(df):
+    index = RegionIndex(df, 'region', 'date')
+    data_versions = DataVersions()
+    data_versions.add_index('mortality', index, ['deaths'])
+    data_versions.add_index('cases', index, ['cases'])
+    return DataSnapshot(mort_cube=RegionCube(index, ['deaths'], first_date),
+                        cases_cube=RegionCube(index, ['cases'], first_date),
+                        data_versions=data_versions)
+
+def assert_same(values, expected):
+    np.testing.assert_array_equal(np.isnan(values), np.isnan(expected))
+    finite = np.isfinite(expected)
+    np.testing.assert_allclose(values[finite], expected[finite], rtol=1e-12)
+
+
+@pytest.mark.parametrize('smooth_lambda14_first', [True, False])
+def test_Rt_lookback(smooth_lambda14_first):
+    cube = make_snapshot(make_frame({'a': 90, 'b': 90, 'c': 70})).mort_cube
+    rows = np.arange(3)
+    full = compute_Rt(cube, rows, 0, Rt_serial_interval,
+                      Rt_make_D14_nonzero_offset, smooth_lambda14_first)
+    for start in [1, Rt_lookback_days, Rt_lookback_days + 1, 60]:
+        assert_same(compute_Rt(cube, rows, start, Rt_serial_interval,
+                               Rt_make_D14_nonzero_offset, smooth_lambda14_first),
+                    full[:, start:])
+
+def test_Rt_of_one_region():
+    df = make_frame({'a': 60, 'b': 60})
+    cube = make_snapshot(df).mort_cube
+    one_region = make_snapshot(df[df.region == 'b']).mort_cube
+    assert_same(Rt_derivation.compute(one_region, np.array([0]), 0)[0],
+                Rt_derivation.build(make_snapshot(df))[cube.row('b')])
+
+def test_cases_7day_equals_pandas():
+    df = make_frame({'a': 40, 'b': 30})
+    cube = make_snapshot(df).cases_cube
+    values = compute_cases_7day(cube, np.arange(2), 0)
+    for key in ['a', 'b']:
+        expected = df[df.region == key].cases.rolling(window=7).mean().to_numpy()
+        cube_values = values[cube.row(key), :len(expected)]
+        assert_same(cube_values, expected)
+    assert_same(compute_cases_7day(cube, np.arange(2), 10), values[:, 10:])
+
+
+def check_update_equals_build(df, new_df):
+    previous = make_snapshot(df)
+    data = make_snapshot(new_df)
+    for name, derivation in [('Rt_cube', Rt_derivation),
+                             ('cases_7day', cases_7day_derivation)]:
+        previous.derived(name, lambda data: derive(data, name, derivation))
+        updated = derive(data, name, derivation, previous)
+        assert_same(updated, derivation.build(data))
+
+def test_appended_day():
+    df = make_frame({'a': 60, 'b': 60, 'c': 45})
+    new_day = pd.DataFrame({'region': ['a', 'b'],
+                            'date': [first_date + pd.Timedelta(days=60)] * 2,
+                            'deaths': [7.0, 2.0], 'cases': [40.0, 61.0]})
+    check_update_equals_build(df, pd.concat([df, new_day], ignore_index=True))
+
+def test_edit_in_the_middle():
+    df = make_frame({'a': 60, 'b': 60, 'c': 45})
+    new_df = df.copy()
+    edited = (new_df.region == 'b') & (new_df.date == "2020-01-25")
+    new_df.loc[edited, 'deaths'] = 40.0
+    new_df.loc[edited, 'cases'] = 400.0
+    check_update_equals_build(df, new_df)
+
+def test_new_region():
+    df = make_frame({'a': 60, 'b': 60})
+    new_df = pd.concat([df, make_frame({'c': 50}, seed=1)], ignore_index=True)
+    check_update_equals_build(df, new_df)
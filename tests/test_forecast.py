@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+#
+# simulate_deaths gives the deaths and lambda of the per-day loop it
+# replaced, which summed the mortality frame again on every day.
+#
+import datetime
+import math
+import numpy as np
+import pandas as pd
+import pytest
+from forecast import simulate_deaths
+
+annual_death = 9000.0
+C_deathA = -120.0
+C_deathB = -30.0
+inv_tauI = 0.2
+
+
+def old_forecast_loop(df_mort_new, start_index, growth_without_mortality_effect,
+                      vax_rate_term, lambda_errors):
+    """The loop of get_forecasted_mortality before the kernel, with the
+    drivers given per forecast day"""
+    two_weeks = datetime.timedelta(days=14)
+    two_months = datetime.timedelta(days=60)
+    df_mort_new = df_mort_new.copy()
+    df_mort_new['lambda'] = 0.0
+    for index, row in df_mort_new.iterrows():
+        if (index > start_index):
+            j = index - start_index - 1
+            date_in_forecast = row.date
+            total_deaths = \
+                df_mort_new[df_mort_new.date < date_in_forecast]['deaths'].sum()
+            xHerd = total_deaths / annual_death
+            total_deaths_prior_to_two_months_ago = \
+                df_mort_new[df_mort_new.date
+                            < (date_in_forecast - two_months)]['deaths'].sum()
+            xHerd2 = total_deaths_prior_to_two_months_ago / annual_death
+            sqrt_mortality_effect = \
+                math.exp(0.5 * (C_deathA * (xHerd - xHerd2) + C_deathB * xHerd2))
+            lambda_val = (
+                growth_without_mortality_effect[j] * sqrt_mortality_effect
+                - inv_tauI
+                + vax_rate_term[j]
+            )
+            deaths_past_two_weeks = \
+                df_mort_new[df_mort_new.date
+                            > (date_in_forecast - two_weeks)]['deaths'].sum()
+            sigma = math.sqrt(0.093 / (14.0 + deaths_past_two_weeks))
+            lambda_val += sigma*lambda_errors[j]
+            df_mort_new.at[index, 'lambda'] = lambda_val
+            df_mort_new.at[index, 'deaths'] = \
+                math.exp(lambda_val) * df_mort_new.at[index-1, 'deaths']
+    return df_mort_new
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_simulate_deaths_equals_old_loop(seed):
+    rng = np.random.RandomState(seed)
+    ndays = 150
+    start_index = 90
+    deaths = rng.poisson(8.0, ndays).astype(np.float64)
+    # days without data before the start, zeros after it
+    deaths[rng.choice(start_index, 10, replace=False)] = np.nan
+    deaths[start_index] = 7.5
+    deaths[start_index + 1:] = 0.0
+    df_mort_new = pd.DataFrame({
+        'date': pd.date_range("2020-10-01", periods=ndays),
+        'deaths': deaths})
+    nforecast = ndays - start_index - 1
+    growth_without_mortality_effect = 0.2 + 0.02 * rng.standard_normal(nforecast)
+    vax_rate_term = -0.01 * rng.random_sample(nforecast)
+    lambda_errors = rng.standard_normal(nforecast)
+
+    new_deaths, new_lambdas = simulate_deaths(
+        df_mort_new['deaths'].to_numpy(), start_index,
+        growth_without_mortality_effect, inv_tauI, vax_rate_term,
+        lambda_errors, annual_death, C_deathA, C_deathB)
+    old = old_forecast_loop(df_mort_new, start_index,
+                            growth_without_mortality_effect, vax_rate_term,
+                            lambda_errors)
+
+    np.testing.assert_array_equal(np.isnan(new_deaths), old['deaths'].isna())
+    np.testing.assert_allclose(new_deaths[~np.isnan(new_deaths)],
+                               old['deaths'].dropna(), rtol=1e-12)
+    np.testing.assert_allclose(new_lambdas, old['lambda'], rtol=1e-12, atol=1e-15)
+    # the frame passed in is left unchanged
+    assert (df_mort_new['deaths'].to_numpy()[start_index + 1:] == 0).all()
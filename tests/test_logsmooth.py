@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+#
+# LogSmoothedMortality, computed once on a region's whole series, gives
+# for every forecast start date the initial value, date and frame that
+# get_logsmoothed_initial_mortality computed on the series cut at that
+# date.
+#
+import math
+import numpy as np
+import pandas as pd
+import pytest
+from logsmooth import LogSmoothedMortality
+
+
+def old_logsmoothed_initial_mortality(the_date, df):
+    """get_logsmoothed_initial_mortality before LogSmoothedMortality (df
+    is the mortality [date, deaths] up to the_date)"""
+    dfnew = df[['date', 'deaths']].copy()
+    dfnew['deaths'] = dfnew['deaths'].rolling(window=7).mean()
+    dfnew['logdeaths'] = 0.0
+    for index, row in dfnew.iterrows():
+        if row.deaths == 0.0:
+            dfnew.at[index, 'logdeaths'] = np.nan
+        else:
+            dfnew.at[index, 'logdeaths'] = np.log(row.deaths)
+    dfnew['logdeaths'] = \
+        dfnew['logdeaths'].rolling(window=15, center=True).mean()
+    try:
+        dfnew['logdeaths'] = \
+            dfnew['logdeaths'].interpolate(method='polynomial', order=2)
+        dfnew['deaths'] = np.exp(dfnew['logdeaths'])
+        the_date_ind = \
+            pd.to_numeric(
+                dfnew.index[dfnew.date.between(the_date, the_date)]
+            )[0]
+        the_val = dfnew.at[the_date_ind, 'deaths']
+        the_new_date_ind = dfnew['deaths'].last_valid_index()
+    except Exception:
+        the_val = np.nan
+        the_new_date_ind = None
+        dfnew = None
+    if math.isnan(the_val):
+        if the_new_date_ind is None:
+            return [-1, None, None]
+        else:
+            the_new_date_str = \
+                dfnew.date.dt.strftime("%Y-%m-%d").loc[the_new_date_ind]
+            return [dfnew.at[the_new_date_ind, 'deaths'],
+                    the_new_date_str,
+                    dfnew]
+    else:
+        return [-1, None, None]
+
+def make_mortality(ndays, seed):
+    rng = np.random.RandomState(seed)
+    deaths = rng.poisson(1.5, ndays).astype(np.float64)
+    # weeks without deaths (gaps in the log)
+    deaths[30:45] = 0.0
+    deaths[80:88] = 0.0
+    return pd.DataFrame({'date': pd.date_range("2020-03-01", periods=ndays),
+                         'deaths': deaths})
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_equals_old_code(seed):
+    df = make_mortality(120, seed)
+    logsmoothed = LogSmoothedMortality(df['date'].to_numpy(), df['deaths'].to_numpy())
+    for day in [0, 10, 21, 22, 23, 40, 50, 55, 60, 89, 95, 119]:
+        the_date = df['date'].iloc[day].strftime("%Y-%m-%d")
+        old_val, old_date, old_frame = \
+            old_logsmoothed_initial_mortality(the_date, df.iloc[:day + 1])
+        initial = logsmoothed.initial_value(the_date)
+        frame = logsmoothed.frame(the_date)
+        if old_date is None:
+            assert (initial is None) and (frame is None)
+            continue
+        assert initial[1] == old_date
+        assert initial[0] == pytest.approx(old_val, rel=1e-12)
+        pd.testing.assert_frame_equal(frame, old_frame, check_dtype=False,
+                                      rtol=1e-9)
+
+def test_last_defined():
+    df = make_mortality(120, 0)
+    df['deaths'] = 2.0
+    df.loc[50:64, 'deaths'] = 0.0
+    logsmoothed = LogSmoothedMortality(df['date'].to_numpy(), df['deaths'].to_numpy())
+    date = lambda day: df['date'].iloc[day].strftime("%Y-%m-%d")
+    # the first value is defined on day 13 (7-day, then centered 15-day
+    # mean), and 3 values are needed for the interpolation: day 15, the
+    # last defined value of a start on day 22 (7 days before)
+    assert logsmoothed.initial_value(date(21)) is None
+    assert logsmoothed.initial_value(date(22)) == (pytest.approx(2.0), date(15))
+    assert logsmoothed.initial_value(date(40)) == (pytest.approx(2.0), date(33))
+    # the log is undefined while the 7-day mean is zero (days 56 to 64),
+    # and the centered mean from 7 days before to 7 days after (days 49
+    # to 71): the last defined value before the gap is used
+    assert logsmoothed.initial_value(date(55))[1] == date(48)
+    assert logsmoothed.initial_value(date(78))[1] == date(48)
+    assert logsmoothed.initial_value(date(79))[1] == date(72)
+    # a start date outside of the series
+    assert logsmoothed.initial_value("2019-12-31") is None
+    assert logsmoothed.frame("2019-12-31") is None
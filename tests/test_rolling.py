@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+#
+# The rolling-window operators of rolling.py give the pandas .rolling()
+# results and the date-window averages that the app computed before,
+# with missing values and series shorter than the window.
+#
+import numpy as np
+import pandas as pd
+import pytest
+from rolling import window_mean, trailing_mean, centered_mean, trailing_sum, lagged
+
+
+def make_series(ndays, seed=0, nmissing=10):
+    rng = np.random.RandomState(seed)
+    x = rng.normal(5.0, 3.0, ndays)
+    x[rng.choice(ndays, min(nmissing, ndays), replace=False)] = np.nan
+    return x
+
+def assert_same(values, expected):
+    expected = np.asarray(expected, dtype=np.float64)
+    np.testing.assert_array_equal(np.isnan(values), np.isnan(expected))
+    finite = np.isfinite(expected)
+    np.testing.assert_allclose(values[finite], expected[finite], rtol=1e-9, atol=1e-12)
+
+
+@pytest.mark.parametrize('ndays', [3, 14, 60])
+@pytest.mark.parametrize('window', [1, 7, 14, 15])
+def test_equals_pandas_rolling(ndays, window):
+    x = make_series(ndays)
+    s = pd.Series(x)
+    assert_same(trailing_mean(x, window), s.rolling(window).mean())
+    assert_same(trailing_sum(x, window), s.rolling(window).sum())
+    assert_same(centered_mean(x, window), s.rolling(window, center=True).mean())
+    for min_periods in [1, 3]:
+        if (min_periods > window):
+            continue
+        assert_same(trailing_mean(x, window, min_periods),
+                    s.rolling(window, min_periods=min_periods).mean())
+        assert_same(trailing_sum(x, window, min_periods),
+                    s.rolling(window, min_periods=min_periods).sum())
+        assert_same(centered_mean(x, window, min_periods),
+                    s.rolling(window, min_periods=min_periods, center=True).mean())
+
+def test_regions_axis():
+    # a [region, day] array gives the values of each region's series
+    x = np.stack([make_series(40, seed) for seed in range(3)])
+    for mean, expected in [(trailing_mean(x, 7),
+                            lambda s: s.rolling(7).mean()),
+                           (centered_mean(x, 15),
+                            lambda s: s.rolling(15, center=True).mean())]:
+        for row in range(3):
+            assert_same(mean[row], expected(pd.Series(x[row])))
+
+def test_all_missing():
+    x = np.full(20, np.nan)
+    assert np.isnan(trailing_mean(x, 7)).all()
+    assert np.isnan(window_mean(x, -3, 3)).all()
+    assert trailing_mean(np.zeros(0), 7).shape == (0,)
+
+def test_weather_window():
+    # get_weather_avg_for_day(df_weather, day, 14, 21): the mean of the
+    # temperatures 28 to 14 days before the day (15 days, both ends
+    # included, fewer at the start of the series, NaN for missing days)
+    df_weather = pd.DataFrame({'date': pd.date_range("2020-01-01", periods=80),
+                               'temp_mean': make_series(80, nmissing=20)})
+    df_weather.loc[30:48, 'temp_mean'] = np.nan
+    expected = []
+    for day in df_weather.date:
+        window_start = day - pd.Timedelta(days=28)
+        window_end = day - pd.Timedelta(days=14)
+        df = df_weather[df_weather.date.between(window_start, window_end)]
+        expected.append(df['temp_mean'].mean())
+    assert_same(window_mean(df_weather['temp_mean'].to_numpy(), -28, -14), expected)
+
+def test_lagged():
+    x = make_series(30)
+    s = pd.Series(x)
+    for lag in [0, 1, 14, 29, 30, 45, -3, -30]:
+        assert_same(lagged(x, lag), s.shift(lag))
+    x = np.stack([x, 2 * x])
+    assert_same(lagged(x, 7)[1], 2 * s.shift(7))
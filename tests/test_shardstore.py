@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+#
+# ShardStore gives the rows that the app selected from the national
+# frame, switches to a new version of a dataset when it is re-ingested
+# (removing the versions no index names), and keeps the regions written
+# by concurrent replace_region calls.
+#
+import os
+import multiprocessing
+import numpy as np
+import pandas as pd
+import pytest
+from shardstore import ShardStore
+
+
+def make_mortality_frame(seed=0):
+    rng = np.random.RandomState(seed)
+    frames = []
+    for province, region, ndays in [('Ontario', 'Toronto', 50),
+                                    ('Ontario', 'Peel', 40),
+                                    ('Quebec', 'Montréal', 45)]:
+        frames.append(pd.DataFrame({
+            'province': province,
+            'health_region': region,
+            'date_death_report': pd.date_range("2020-03-01", periods=ndays),
+            'deaths': rng.poisson(3.0, ndays),
+            'cumulative_deaths': rng.poisson(30.0, ndays).astype(np.float64),
+        }))
+    df = pd.concat(frames, ignore_index=True)
+    df.loc[[5, 60], 'cumulative_deaths'] = np.nan
+    # (the rows of the csv files are not sorted by date)
+    return df.sample(frac=1.0, random_state=seed)
+
+def version_dirs(directory, dataset):
+    dataset_dir = os.path.join(directory, dataset)
+    return sorted(name for name in os.listdir(dataset_dir)
+                  if os.path.isdir(os.path.join(dataset_dir, name)))
+
+key_columns = ['province', 'health_region']
+
+
+def test_ingest_and_query(tmp_path):
+    store = ShardStore(str(tmp_path / 'shards'))
+    df = make_mortality_frame()
+    assert store.query('mortality', ('Ontario', 'Toronto')) is None
+    assert store.ingest('mortality', df, key_columns, 'date_death_report', 'v1')
+    for key in [('Ontario', 'Toronto'), ('Quebec', 'Montréal')]:
+        selected = df[(df.province == key[0]) & (df.health_region == key[1])] \
+            .sort_values('date_death_report')
+        pd.testing.assert_frame_equal(store.query('mortality', key),
+                                      selected.reset_index(drop=True),
+                                      check_dtype=False)
+        for startdate, enddate in [("2020-03-10", "2020-03-20"),
+                                   ("2020-03-10", None), (None, "2020-03-05"),
+                                   ("2020-04-10", "2020-05-10")]:
+            mask = np.ones(len(selected), dtype=bool)
+            if startdate is not None:
+                mask &= (selected.date_death_report >= startdate).to_numpy()
+            if enddate is not None:
+                mask &= (selected.date_death_report <= enddate).to_numpy()
+            pd.testing.assert_frame_equal(
+                store.query('mortality', key, startdate, enddate),
+                selected[mask].reset_index(drop=True), check_dtype=False)
+    assert len(store.query('mortality', ('Ontario', 'Nowhere'))) == 0
+    assert store.date_range('mortality') == (pd.Timestamp("2020-03-01"),
+                                             pd.Timestamp("2020-04-19"))
+    fingerprints = store.region_fingerprints('mortality')
+    assert sorted(fingerprints) == [('Ontario', 'Peel'), ('Ontario', 'Toronto'),
+                                    ('Quebec', 'Montréal')]
+    # a new store on the same directory reads what was written
+    other = ShardStore(str(tmp_path / 'shards'))
+    assert other.region_fingerprints('mortality') == fingerprints
+    pd.testing.assert_frame_equal(other.query('mortality', ('Ontario', 'Peel')),
+                                  store.query('mortality', ('Ontario', 'Peel')))
+
+def test_new_version(tmp_path):
+    directory = str(tmp_path / 'shards')
+    store = ShardStore(directory)
+    reader = ShardStore(directory)
+    df = make_mortality_frame()
+    store.ingest('mortality', df, key_columns, 'date_death_report', 'v1')
+    peel = reader.query('mortality', ('Ontario', 'Peel'))
+    fingerprints = reader.region_fingerprints('mortality')
+    first_version = version_dirs(directory, 'mortality')
+    # same signature: nothing is written
+    assert not store.ingest('mortality', make_mortality_frame(seed=1),
+                            key_columns, 'date_death_report', 'v1')
+    assert version_dirs(directory, 'mortality') == first_version
+
+    new_df = make_mortality_frame(seed=1)
+    assert store.ingest('mortality', new_df, key_columns, 'date_death_report', 'v2')
+    # the reader switches to the new version (the previous one is kept)
+    new_peel = reader.query('mortality', ('Ontario', 'Peel'))
+    assert not new_peel.equals(peel)
+    assert (new_peel.deaths.tolist() == new_df[new_df.health_region == 'Peel']
+            .sort_values('date_death_report').deaths.tolist())
+    assert len(version_dirs(directory, 'mortality')) == 2
+    assert reader.region_fingerprints('mortality')[('Ontario', 'Toronto')] \
+        != fingerprints[('Ontario', 'Toronto')]
+
+    # the version before the previous one is removed
+    store.ingest('mortality', make_mortality_frame(seed=2), key_columns,
+                 'date_death_report', 'v3')
+    versions = version_dirs(directory, 'mortality')
+    assert len(versions) == 2
+    assert first_version[0] not in versions
+    index = reader._index('mortality')
+    assert set(versions) == {index['version'], index['previous_version']}
+
+
+def test_replace_region(tmp_path):
+    store = ShardStore(str(tmp_path / 'shards'))
+    dates = pd.date_range("2021-01-01", periods=3)
+    first = pd.DataFrame({'province': 'ON', 'date': dates,
+                          'total_vaccinations': [10.0, 20.0, 30.0]})
+    assert store.replace_region('vaccination', 'ON', first, 'province', 'date')
+    assert store.region_updated_at('vaccination', 'ON') is not None
+    assert store.region_updated_at('vaccination', 'QC') is None
+    pd.testing.assert_frame_equal(store.query('vaccination', 'ON'), first)
+
+    second = pd.DataFrame({'province': 'QC', 'date': dates,
+                           'total_vaccinations': [1.0, 2.0, 3.0],
+                           'total_vaccinated': [0.0, 1.0, 1.0]})
+    store.replace_region('vaccination', 'QC', second, 'province', 'date')
+    assert store.dataset_info('vaccination')['columns'] == \
+        ['province', 'date', 'total_vaccinations', 'total_vaccinated']
+    pd.testing.assert_frame_equal(store.query('vaccination', 'QC'), second)
+    # the regions written before have no value in the new column
+    on = store.query('vaccination', 'ON')
+    assert on.total_vaccinations.tolist() == [10.0, 20.0, 30.0]
+    assert on.total_vaccinated.isna().all()
+
+    # a new fetch of a region replaces the rows read before
+    store.replace_region('vaccination', 'ON', second.assign(province='ON').iloc[1:],
+                         'province', 'date')
+    assert store.query('vaccination', 'ON').total_vaccinations.tolist() == [2.0, 3.0]
+    assert len(store.query('vaccination', 'QC')) == 3
+
+
+def replace_regions(directory, worker, nregions):
+    store = ShardStore(directory)
+    for i in range(nregions):
+        key = 'r' + str(worker) + '_' + str(i)
+        store.replace_region('vaccination', key,
+                             pd.DataFrame({'region': [key], 'date': ["2021-01-01"],
+                                           'total_vaccinations': [float(i)]}),
+                             'region', 'date')
+
+def test_concurrent_replace_region(tmp_path):
+    directory = str(tmp_path / 'shards')
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=replace_regions, args=(directory, worker, 10))
+               for worker in range(4)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+    assert all(process.exitcode == 0 for process in workers)
+    store = ShardStore(directory)
+    assert len(store.region_fingerprints('vaccination')) == 40
+    assert store.query('vaccination', 'r3_7').total_vaccinations.tolist() == [7.0]
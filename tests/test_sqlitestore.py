@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+#
+# SQLiteStore.query gives the rows of one region that the app selected
+# from the national frame, a dataset is only re-ingested when its
+# signature changes, and replace_region adds the columns it has not
+# seen yet.
+#
+import numpy as np
+import pandas as pd
+import pytest
+from sqlitestore import SQLiteStore
+
+
+def make_mortality_frame(seed=0):
+    rng = np.random.RandomState(seed)
+    frames = []
+    for province, region, ndays in [('Ontario', 'Toronto', 50),
+                                    ('Ontario', 'Peel', 40),
+                                    ('Quebec', 'Montréal', 45)]:
+        frames.append(pd.DataFrame({
+            'province': province,
+            'health_region': region,
+            'date_death_report': pd.date_range("2020-03-01", periods=ndays),
+            'deaths': rng.poisson(3.0, ndays),
+            'cumulative_deaths': rng.poisson(30.0, ndays).astype(np.float64),
+        }))
+    df = pd.concat(frames, ignore_index=True)
+    df.loc[[5, 60], 'cumulative_deaths'] = np.nan
+    return df
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteStore(str(tmp_path / 'series.sqlite'))
+
+
+def test_range_query(store):
+    df = make_mortality_frame()
+    key_columns = ['province', 'health_region']
+    assert store.ingest('mortality', df, key_columns, 'date_death_report', 'v1')
+    for key in [('Ontario', 'Toronto'), ('Quebec', 'Montréal')]:
+        selected = df[(df.province == key[0]) & (df.health_region == key[1])]
+        pd.testing.assert_frame_equal(store.query('mortality', key),
+                                      selected.reset_index(drop=True),
+                                      check_dtype=False)
+        for startdate, enddate in [("2020-03-10", "2020-03-20"),
+                                   ("2020-03-10", None), (None, "2020-03-05"),
+                                   ("2020-04-10", "2020-05-10")]:
+            mask = np.ones(len(selected), dtype=bool)
+            if startdate is not None:
+                mask &= (selected.date_death_report >= startdate).to_numpy()
+            if enddate is not None:
+                mask &= (selected.date_death_report <= enddate).to_numpy()
+            pd.testing.assert_frame_equal(
+                store.query('mortality', key, startdate, enddate),
+                selected[mask].reset_index(drop=True), check_dtype=False)
+    assert len(store.query('mortality', ('Ontario', 'Nowhere'))) == 0
+    assert store.query('cases', ('Ontario', 'Toronto')) is None
+
+def test_ingest_only_when_signature_changes(store):
+    df = make_mortality_frame()
+    key_columns = ['province', 'health_region']
+    assert store.ingest('mortality', df, key_columns, 'date_death_report', 'v1')
+    new_df = make_mortality_frame(seed=1)
+    # same signature: the rows are kept
+    assert not store.ingest('mortality', new_df, key_columns, 'date_death_report', 'v1')
+    assert (store.query('mortality', ('Ontario', 'Peel')).deaths.tolist()
+            == df[df.health_region == 'Peel'].deaths.tolist())
+    # new signature: the dataset is replaced
+    assert store.ingest('mortality', new_df, key_columns, 'date_death_report', 'v2')
+    assert (store.query('mortality', ('Ontario', 'Peel')).deaths.tolist()
+            == new_df[new_df.health_region == 'Peel'].deaths.tolist())
+    assert store.dataset_info('mortality')['signature'] == 'v2'
+
+def test_replace_region_adds_columns(store):
+    dates = pd.date_range("2021-01-01", periods=3)
+    first = pd.DataFrame({'province': 'ON', 'date': dates,
+                          'total_vaccinations': [10.0, 20.0, 30.0]})
+    store.replace_region('vaccination', 'ON', first, 'province', 'date')
+    assert store.region_updated_at('vaccination', 'ON') is not None
+    assert store.region_updated_at('vaccination', 'QC') is None
+
+    # a later fetch with a new column
+    second = pd.DataFrame({'province': 'QC', 'date': dates,
+                           'total_vaccinations': [1.0, 2.0, 3.0],
+                           'total_vaccinated': [0.0, 1.0, 1.0]})
+    store.replace_region('vaccination', 'QC', second, 'province', 'date')
+    assert store.dataset_info('vaccination')['columns'] == \
+        ['province', 'date', 'total_vaccinations', 'total_vaccinated']
+    pd.testing.assert_frame_equal(store.query('vaccination', 'QC'), second,
+                                  check_dtype=False)
+    # the rows written before have no value in the new column
+    on = store.query('vaccination', 'ON')
+    assert on.total_vaccinations.tolist() == [10.0, 20.0, 30.0]
+    assert on.total_vaccinated.isna().all()
+
+    # replacing a region drops its old rows
+    store.replace_region('vaccination', 'ON', second.assign(province='ON').iloc[1:],
+                         'province', 'date')
+    assert store.query('vaccination', 'ON').total_vaccinated.tolist() == [1.0, 1.0]
+    assert len(store.query('vaccination', 'QC')) == 3
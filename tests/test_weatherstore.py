@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+#
+# A weather store built from region files gives back, for each region,
+# what get_hr_weather_data read from the region's csv file: temp_mean
+# with its gaps interpolated, the other fields as they are, and the date
+# of the last day of station data.
+#
+import numpy as np
+import pandas as pd
+import pytest
+from weatherstore import WeatherStore, build_weather_store, weather_store_fields
+
+ndays = 40
+
+
+def write_weather_file(weather_dir, region_key, seed, ndata_days):
+    rng = np.random.RandomState(seed)
+    df = pd.DataFrame({'date': pd.date_range("2020-01-01", periods=ndays)
+                               .strftime("%Y-%m-%d")})
+    for field in weather_store_fields:
+        df[field] = np.round(rng.normal(0.0, 10.0, ndays), 1)
+    # gaps in the station data, and no station after ndata_days
+    df.loc[[3, 4, 11], 'temp_mean'] = np.nan
+    df.loc[[5], 'temp_max'] = np.nan
+    df['climate_id'] = 3033875.0
+    df.loc[ndata_days:, 'climate_id'] = np.nan
+    df.to_csv(str(weather_dir / (region_key + ".csv")), index=False)
+
+def old_weather_data(filename):
+    """The weather of one region as get_hr_weather_data read it"""
+    df_weather = pd.read_csv(filename)
+    last_weather_data_date_ind = df_weather['climate_id'].last_valid_index()
+    last_weather_data_date = df_weather.at[last_weather_data_date_ind, 'date']
+    df_weather['temp_mean'] = df_weather['temp_mean'].interpolate(method='polynomial', order=2)
+    df_weather['date'] = pd.to_datetime(df_weather['date'])
+    return df_weather, last_weather_data_date
+
+
+def test_build_and_read(tmp_path):
+    weather_dir = tmp_path / 'weather'
+    weather_dir.mkdir()
+    regions = {'ON_3595': 30, 'AB_4831': 25, 'QC_2406': 40}
+    for seed, (region_key, ndata_days) in enumerate(regions.items()):
+        write_weather_file(weather_dir, region_key, seed, ndata_days)
+    filename = str(tmp_path / 'weather_store.bin')
+    build_weather_store(str(weather_dir), filename)
+
+    store = WeatherStore(filename)
+    assert store.regions == sorted(regions)
+    assert store.ndays == ndays
+    assert 'ON_3595' in store and 'ON_9999' not in store
+    for region_key in regions:
+        df, last_date = old_weather_data(str(weather_dir / (region_key + ".csv")))
+        assert store.last_data_date(region_key) == last_date
+        for field in weather_store_fields:
+            np.testing.assert_array_equal(store.values(region_key, field),
+                                          df[field].to_numpy())
+        pd.testing.assert_frame_equal(store.frame(region_key),
+                                      df[['date', 'temp_mean']],
+                                      check_freq=False)
+
+def test_dates_must_match(tmp_path):
+    weather_dir = tmp_path / 'weather'
+    weather_dir.mkdir()
+    write_weather_file(weather_dir, 'AB_4831', 0, 30)
+    write_weather_file(weather_dir, 'ON_3595', 1, 30)
+    df = pd.read_csv(str(weather_dir / 'ON_3595.csv'))
+    df.iloc[:-1].to_csv(str(weather_dir / 'ON_3595.csv'), index=False)
+    with pytest.raises(ValueError):
+        build_weather_store(str(weather_dir), str(tmp_path / 'weather_store.bin'))
+
+def test_not_a_store(tmp_path):
+    filename = tmp_path / 'weather_store.bin'
+    filename.write_bytes(b"0123456789" * 10)
+    with pytest.raises(ValueError):
+        WeatherStore(str(filename))
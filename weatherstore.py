@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+#
+# All the health region temperature files packed into one binary file.
+#
+# get_hr_weather_data used to open and parse a per-region CSV file (and
+# run a polynomial interpolation over its gaps) on every call.  Here a
+# build step (data/update-scripts/build_weather_store.py, run after the
+# weather files are regenerated) packs every {prov_id}_{hr_uid}.csv file
+# of the weather directory into a single float64 array of shape
+# [region, day, field], with temp_mean already interpolated.  The app
+# memory-maps that file, so a lookup is a slice of the array, and all
+# the worker processes share the same pages through the page cache.
+#
+# File layout:
+#
+#     magic (8 bytes) | header length (uint32, little-endian) | json header
+#     | padding to a multiple of 64 bytes | array ('<f8', C order)
+#
+# The header records the regions (file names without .csv), the fields,
+# the first date and number of days, and the last day with actual
+# (station) data of each region.
+#
+import os
+import glob
+import json
+import struct
+import numpy as np
+import pandas as pd
+
+weather_store_magic = b'MLCWTHR1'
+#=== Bump this if the layout of the file changes
+weather_store_format_version = 1
+#=== Numeric columns of the weather files that are stored
+weather_store_fields = ['temp_mean', 'temp_min', 'temp_max',
+                        'temp_mean_avg', 'temp_min_avg', 'temp_max_avg']
+#=== Columns with gaps filled in by interpolation (as done by the app)
+weather_store_interpolated_fields = ['temp_mean']
+
+_header_size_format = '<I'
+_data_alignment = 64
+
+
+class WeatherStore(object):
+    """Read-only, memory-mapped view of a weather store file.
+
+    Regions are given by their weather file key, "{prov_id}_{hr_uid}".
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            header, data_offset = _read_header(f)
+        if (header.get('format_version') != weather_store_format_version):
+            raise ValueError("unsupported weather store version in " + filename)
+        self.fields = header['fields']
+        self.regions = header['regions']
+        self.first_date = pd.Timestamp(header['first_date'])
+        self.ndays = header['ndays']
+        self.last_data_day = header['last_data_day']
+        self._region_rows = {key: i for i, key in enumerate(self.regions)}
+        self._field_cols = {field: i for i, field in enumerate(self.fields)}
+        self.data = np.memmap(filename, dtype='<f8', mode='r',
+                              offset=data_offset,
+                              shape=(len(self.regions), self.ndays,
+                                     len(self.fields)))
+        self.dates = pd.date_range(self.first_date, periods=self.ndays)
+
+    def __contains__(self, region_key):
+        return region_key in self._region_rows
+
+    def values(self, region_key, field):
+        """[day] array of a field for one region (read-only view)"""
+        return self.data[self._region_rows[region_key], :,
+                         self._field_cols[field]]
+
+    def last_data_date(self, region_key):
+        """Date string (YYYY-MM-DD) of the last day with actual data (None if none)"""
+        day = self.last_data_day[self._region_rows[region_key]]
+        if (day < 0):
+            return None
+        return (self.first_date + pd.Timedelta(days=day)).strftime("%Y-%m-%d")
+
+    def frame(self, region_key, fields=('temp_mean',)):
+        """DataFrame [date, fields...] of one region (a copy)"""
+        data = {'date': self.dates}
+        for field in fields:
+            data[field] = np.array(self.values(region_key, field))
+        return pd.DataFrame(data, columns=['date'] + list(fields))
+
+
+def build_weather_store(weather_dir, filename):
+    """Pack all the region files of weather_dir into one store file.
+
+    All the files must cover the same dates.  The file is written to a
+    temporary name and then moved into place, so that running apps keep
+    their (still valid) mapping of the old file.
+    """
+    regions = []
+    last_data_day = []
+    arrays = []
+    dates = None
+    for region_key, df in read_weather_files(weather_dir):
+        if dates is None:
+            dates = df['date'].tolist()
+        elif (df['date'].tolist() != dates):
+            raise ValueError("dates of " + region_key + " differ from "
+                             + regions[0])
+        last_valid = df['climate_id'].last_valid_index()
+        regions.append(region_key)
+        last_data_day.append(-1 if last_valid is None else int(last_valid))
+        arrays.append(df[weather_store_fields].to_numpy(dtype=np.float64))
+    first_date = pd.Timestamp(dates[0])
+    if ( list(pd.to_datetime(dates))
+         != list(pd.date_range(first_date, periods=len(dates))) ):
+        raise ValueError("weather files must have one row per consecutive day")
+    header = {
+        'format_version': weather_store_format_version,
+        'fields': weather_store_fields,
+        'interpolated_fields': weather_store_interpolated_fields,
+        'regions': regions,
+        'first_date': first_date.strftime("%Y-%m-%d"),
+        'ndays': len(dates),
+        'last_data_day': last_data_day,
+    }
+    data = np.ascontiguousarray(np.stack(arrays), dtype='<f8')
+    tmp_file = filename + ".tmp." + str(os.getpid())
+    with open(tmp_file, 'wb') as f:
+        _write_header(f, header)
+        f.write(data.tobytes())
+    os.replace(tmp_file, filename)
+    return header
+
+def read_weather_files(weather_dir):
+    """Yield (region key, DataFrame) for each weather file of weather_dir,
+    in file name order, with the gaps of the interpolated fields filled"""
+    weather_files = sorted(glob.glob(os.path.join(weather_dir, '*.csv')))
+    if not weather_files:
+        raise ValueError("no weather files found in " + weather_dir)
+    for weather_file in weather_files:
+        df = pd.read_csv(weather_file)
+        for field in weather_store_interpolated_fields:
+            df[field] = df[field].interpolate(method='polynomial', order=2)
+        yield os.path.splitext(os.path.basename(weather_file))[0], df
+
+#--- helpers
+
+def _write_header(f, header):
+    header_bytes = json.dumps(header).encode('utf-8')
+    prefix_size = len(weather_store_magic) + struct.calcsize(_header_size_format)
+    padding = -(prefix_size + len(header_bytes)) % _data_alignment
+    header_bytes += b' ' * padding
+    f.write(weather_store_magic)
+    f.write(struct.pack(_header_size_format, len(header_bytes)))
+    f.write(header_bytes)
+
+def _read_header(f):
+    magic = f.read(len(weather_store_magic))
+    if (magic != weather_store_magic):
+        raise ValueError("not a weather store file")
+    size_bytes = f.read(struct.calcsize(_header_size_format))
+    header_size = struct.unpack(_header_size_format, size_bytes)[0]
+    header = json.loads(f.read(header_size).decode('utf-8'))
+    data_offset = len(magic) + len(size_bytes) + header_size
+    return header, data_offset